@@ -0,0 +1,107 @@
+"""
+Cold start benchmark for the production server.
+
+Starts server.py in a subprocess and reports how long it takes until the first request is
+answered, the latency of that first request, and the median latency of the requests after it.
+With warm-up in the lifespan the first request should cost about as much as the following ones;
+--no-wait sends it as soon as the port accepts connections instead of waiting for /ready.
+
+    python -m benchmarks.cold_start [--workers 2] [--path /api/stations/] [--runs 5]
+
+The server uses the database settings of the environment (STORAGE_BACKEND, DB_* variables).
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str):
+    """Return (status, seconds), or (None, seconds) when the server is not accepting connections yet"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError):
+        status = None
+    return status, time.perf_counter() - started
+
+
+def measure(workers: int, path: str, wait_ready: bool, requests: int, timeout: float) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "server.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        probe = base + ("/ready" if wait_ready else path)
+        while True:
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f"server did not answer {probe} within {timeout}s")
+            status, _ = _get(probe)
+            if status == 200 or (status is not None and not wait_ready):
+                break
+            time.sleep(0.01)
+        ready_at = time.perf_counter() - started
+
+        status, first = _get(base + path)
+        answered_at = time.perf_counter() - started
+        following = [_get(base + path)[1] for _ in range(requests)]
+        return {
+            "ready": ready_at,
+            "first_answer": answered_at,
+            "first_latency": first,
+            "median_latency": statistics.median(following),
+            "status": status,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--path", default="/api/stations/")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=20, help="Requests timed after the first one.")
+    parser.add_argument("--no-wait", action="store_true", help="Do not wait for /ready before the first request.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    print(f"{'run':>3} {'ready s':>8} {'first answer s':>15} {'first ms':>9} {'median ms':>10} {'status':>6}")
+    results = []
+    for run in range(1, args.runs + 1):
+        result = measure(args.workers, args.path, not args.no_wait, args.requests, args.timeout)
+        results.append(result)
+        print(
+            f"{run:>3} {result['ready']:>8.2f} {result['first_answer']:>15.2f} "
+            f"{result['first_latency'] * 1000:>9.1f} {result['median_latency'] * 1000:>10.1f} {result['status']:>6}"
+        )
+    print(
+        f"median time to first answer {statistics.median(r['first_answer'] for r in results):.2f}s, "
+        f"first request {statistics.median(r['first_latency'] for r in results) * 1000:.1f}ms, "
+        f"later requests {statistics.median(r['median_latency'] for r in results) * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
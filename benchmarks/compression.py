@@ -0,0 +1,81 @@
+"""
+Compression benchmark for typical sensors_data pages.
+
+Builds station data pages shaped like the rows returned by the station data endpoint and
+reports, for each installed encoding and level, the compressed size, the ratio and the CPU time
+spent compressing, both for whole bodies and for bodies streamed in 4 KiB chunks.
+
+    python -m benchmarks.compression [--rows 50 500 5000] [--repeat 20]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, ".")
+
+from middleware.compression import COMPRESSORS  # noqa: E402
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 11], "zstd": [1, 3, 19]}
+UNITS = {"temperature": "Celsius", "humidity": "%", "wind": "m/s"}
+RANGES = {"temperature": (20.0, 35.0), "humidity": (30.0, 90.0), "wind": (0.0, 15.0)}
+
+
+def build_page(rows: int) -> bytes:
+    """A page of readings from three sensors of one station, one reading per minute"""
+    random.seed(rows)
+    sensors = {sensor_type: f"{random.getrandbits(128):032x}" for sensor_type in UNITS}
+    start = datetime(2024, 10, 1)
+    page = []
+    for i in range(rows):
+        sensor_type = list(UNITS)[i % 3]
+        low, high = RANGES[sensor_type]
+        page.append({
+            "sensor_id": sensors[sensor_type],
+            "station_code": 1,
+            "date": (start + timedelta(minutes=i // 3)).isoformat(),
+            "type": sensor_type,
+            "measurement": round(random.uniform(low, high), 2),
+            "unit": UNITS[sensor_type],
+        })
+    return json.dumps(page).encode()
+
+
+def measure(encoding: str, level: int, body: bytes, repeat: int, chunk_size: int = None):
+    """Return (compressed size, CPU milliseconds per body)"""
+    size = 0
+    started = time.process_time()
+    for _ in range(repeat):
+        compressor = COMPRESSORS[encoding](level)
+        if chunk_size:
+            parts = [compressor.compress(body[i:i + chunk_size]) for i in range(0, len(body), chunk_size)]
+            parts.append(compressor.finish())
+            size = sum(len(part) for part in parts)
+        else:
+            size = len(compressor.compress(body) + compressor.finish())
+    return size, (time.process_time() - started) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'encoding':>8} {'level':>5} {'mode':>8} {'bytes':>10} {'ratio':>7} {'cpu ms':>8} {'MB/s':>8}")
+    for rows in args.rows:
+        body = build_page(rows)
+        print(f"{rows:>6} {'identity':>8} {'-':>5} {'-':>8} {len(body):>10} {1.0:>7.1f} {0.0:>8.3f} {'-':>8}")
+        for encoding in COMPRESSORS:
+            for level in LEVELS[encoding]:
+                for mode, chunk_size in (("whole", None), ("stream", 4096)):
+                    size, cpu_ms = measure(encoding, level, body, args.repeat, chunk_size)
+                    throughput = len(body) / 1e6 / (cpu_ms / 1000) if cpu_ms else float("inf")
+                    print(f"{rows:>6} {encoding:>8} {level:>5} {mode:>8} {size:>10} "
+                          f"{len(body) / size:>7.1f} {cpu_ms:>8.3f} {throughput:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
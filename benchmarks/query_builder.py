@@ -0,0 +1,117 @@
+"""
+Query builder benchmark for the paginated station data and station list paths.
+
+Compares the statement assembly of the previous string builders with the interned query shapes,
+and with --database the time to build and run each path's query against MySQL, before and after.
+The station list is served from the station catalog, so its query only runs on catalog reloads.
+
+    python -m benchmarks.query_builder [--iterations 100000] [--database] [--runs 2000]
+
+--database needs a MySQL server with the schema and sample data, configured with the DB_* variables.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from types import SimpleNamespace
+import utils.stations as stations_utils
+
+
+def legacy_paginated_query(station_code: int, request):
+    """build_paginated_query before the query builder"""
+    query = """SELECT * FROM sensors_data WHERE station_code = %s"""
+    params = [station_code]
+    if request.date_from:
+        query += " AND date >= %s"
+        params.append(request.date_from)
+    if request.date_to:
+        query += " AND date <= %s"
+        params.append(request.date_to)
+    if request.type:
+        query += " AND type = %s"
+        params.append(request.type)
+    query += f" ORDER BY {request.sort}"
+    query += " LIMIT %s OFFSET %s"
+    params.extend([request.limit, (request.page - 1) * request.limit])
+    return query, params
+
+
+def legacy_stations_query(city: str, page: int, limit: int, sort: str, sort_order: str):
+    """build_stations_query before the query builder"""
+    filter_condition = ""
+    params = []
+    if city:
+        filter_condition = "WHERE city = %s"
+        params.append(city)
+    params.extend([limit, (page - 1) * limit])
+    final_query = f"""
+        SELECT * FROM stations {filter_condition}
+        ORDER BY {sort} {sort_order}
+        LIMIT %s OFFSET %s;
+    """
+    return final_query, params
+
+
+def _request(**overrides):
+    values = {"date_from": "2024-01-01", "date_to": "2024-01-31", "type": "temperature", "sort": "date", "page": 2, "limit": 50}
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+PATHS = {
+    "paginated": (
+        lambda: legacy_paginated_query(1, _request()),
+        lambda: stations_utils.build_paginated_query(1, _request()),
+    ),
+    "station list": (
+        lambda: legacy_stations_query("Milan", 1, 50, "installation_date", "DESC"),
+        lambda: stations_utils.build_stations_query("Milan", 1, 50, "installation_date", "DESC"),
+    ),
+}
+
+def _per_call(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def measure_build(iterations: int):
+    for path, (before, after) in PATHS.items():
+        before_us = _per_call(before, iterations) * 1e6
+        after_us = _per_call(after, iterations) * 1e6
+        print(f"{path:>13} build: before {before_us:6.2f} us  after {after_us:6.2f} us")
+
+
+async def measure_database(runs: int):
+    import database.database as database
+
+    async with database.SQLConnection(read_only=True) as db:
+        for path, builders in PATHS.items():
+            timings = []
+            for build in builders:
+                await db.execute_query(*build())
+                samples = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    await db.execute_query(*build())
+                    samples.append(time.perf_counter() - started)
+                timings.append(statistics.median(samples) * 1e6)
+            print(f"{path:>13} execute: before {timings[0]:8.1f} us  after {timings[1]:8.1f} us (median)")
+    await database.close_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--database", action="store_true", help="also time execution against MySQL")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    measure_build(args.iterations)
+    if args.database:
+        asyncio.run(measure_database(args.runs))
+
+
+if __name__ == "__main__":
+    main()
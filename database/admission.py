@@ -0,0 +1,105 @@
+import os
+import math
+import asyncio
+from fastapi import HTTPException
+
+
+def _budget_setting(workload: str, setting: str, default):
+    return type(default)(os.getenv(f"ADMISSION_{workload.upper()}_{setting}", default))
+
+
+class WorkloadBudget:
+    def __init__(self, name: str, concurrency: int, max_queue: int, timeout: float):
+        """
+        Concurrency budget for one class of database work, with a bounded wait queue.
+        Requests that find the queue full, or that wait longer than the timeout, are rejected.
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.service_time = 0.05  # Moving average of how long admitted work holds its slot
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue is expected to drain, at least one"""
+        return max(1, math.ceil(self.service_time * (self.waiting + 1) / self.concurrency))
+
+    def _reject(self, reason: str):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy: {self.name} {reason}, please retry later.",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    async def acquire(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                self._reject("queue is full")
+            self.waiting += 1
+            try:
+                # The acquire runs in this task: a timeout that fires as a slot is handed over
+                # cancels the acquire itself, and the semaphore passes the slot on. wait_for
+                # wraps it in a second task, whose outcome can be lost when the two coincide.
+                async with asyncio.timeout(self.timeout):
+                    await self._semaphore.acquire()
+            except TimeoutError:
+                self.timed_out += 1
+                self._reject("queue wait timed out")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self, held_for: float):
+        self.in_flight -= 1
+        self.service_time = 0.9 * self.service_time + 0.1 * held_for
+        self._semaphore.release()
+
+    def metrics(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_service_time_ms": round(self.service_time * 1000, 2),
+        }
+
+
+# The budgets share the connection pools, so their concurrency should add up to no more
+# than DB_POOL_MAX_SIZE; otherwise one workload can starve the others of connections.
+budgets = {
+    "ingest": WorkloadBudget(
+        "ingest",
+        _budget_setting("ingest", "CONCURRENCY", 4),
+        _budget_setting("ingest", "QUEUE", 100),
+        _budget_setting("ingest", "TIMEOUT", 5.0),
+    ),
+    "read": WorkloadBudget(
+        "read",
+        _budget_setting("read", "CONCURRENCY", 4),
+        _budget_setting("read", "QUEUE", 50),
+        _budget_setting("read", "TIMEOUT", 1.0),
+    ),
+    "bulk": WorkloadBudget(
+        "bulk",
+        _budget_setting("bulk", "CONCURRENCY", 2),
+        _budget_setting("bulk", "QUEUE", 10),
+        _budget_setting("bulk", "TIMEOUT", 30.0),
+    ),
+}
+
+
+def metrics() -> dict:
+    return {name: budget.metrics() for name, budget in budgets.items()}
@@ -0,0 +1,145 @@
+from abc import ABC, abstractmethod
+from typing import Optional, List
+
+
+class IntegrityError(Exception):
+    """Raised by a backend when a write violates a unique or foreign key constraint"""
+
+
+class StorageBackend(ABC):
+    """
+    Interface implemented by every storage engine. A backend missing one of the abstract methods
+    fails when it is created.
+    Query arguments are validated by the services before they reach a backend.
+    """
+
+    # Sensor readings
+
+    @abstractmethod
+    async def insert_reading(self, reading: dict):
+        """Insert one sensor reading"""
+
+    @abstractmethod
+    async def insert_readings(self, station_code: int, readings: List[dict]) -> List[bool]:
+        """Insert a batch of readings for a station, returning whether each row was stored"""
+
+    @abstractmethod
+    async def get_station_data(self, station_code: int, request) -> List[dict]:
+        """Page through a station's readings, filtered by date range and type"""
+
+    @abstractmethod
+    async def get_station_data_summary(self, station_code: int) -> List[dict]:
+        """Average measurement per type for a station"""
+
+    @abstractmethod
+    async def count_readings(self, request) -> int:
+        """Number of readings matched by an export request"""
+
+    @abstractmethod
+    async def stream_readings(self, request, batch_size: int):
+        """Yield the readings matched by an export request in batches, ordered by station and date"""
+
+    @abstractmethod
+    async def get_first_reading_date(self, since, station_codes: List[int]):
+        """Date of the oldest stored reading of the stations from since on, None when there is none"""
+
+    @abstractmethod
+    async def find_reading_gaps(self, station_code: Optional[int], date_from, date_to, max_delay_seconds: int, workload: str = "read") -> dict:
+        """
+        Find the gaps longer than max_delay_seconds between consecutive readings of each sensor,
+        in the database. Returns the 'sensors', the 'gaps' and each sensor's reading 'coverage'.
+        """
+
+    # Quantile sketches
+
+    @abstractmethod
+    async def get_sketches(self, station_code: int, types: Optional[List[str]], bucket_from, bucket_to) -> List[dict]:
+        """Stored sketches (type, bucket_start, sketch) of a station's buckets between two bucket starts"""
+
+    @abstractmethod
+    async def merge_sketches(self, sketches: List[tuple], merge):
+        """
+        Add (station_code, type, bucket_start, readings, sketch) updates to the stored sketches,
+        combining an update with an existing sketch through merge(stored, update).
+        """
+
+    @abstractmethod
+    async def replace_sketches(self, sketches: List[tuple]):
+        """Store (station_code, type, bucket_start, readings, sketch) rows in place of the stored ones"""
+
+    # Coverage of the precomputed aggregates
+
+    @abstractmethod
+    async def get_coverage(self, name: str):
+        """Start of the period an aggregate covers completely, None when nothing is covered"""
+
+    @abstractmethod
+    async def extend_coverage(self, name: str, covered_from):
+        """Record that an aggregate covers every reading from covered_from on, if that is earlier"""
+
+    # Map grid aggregates
+
+    @abstractmethod
+    async def get_grid_aggregates(self, zoom: int, request, bucket_from, bucket_to) -> List[dict]:
+        """Per-bucket aggregates of the grid cells of a zoom level overlapping the request's bounding box"""
+
+    @abstractmethod
+    async def add_grid_aggregates(self, aggregates: List[tuple]):
+        """
+        Add (zoom, x, y, type, bucket_start, readings, total, min, max) increments to the stored
+        aggregates of each cell, type and bucket.
+        """
+
+    @abstractmethod
+    async def get_grid_cells(self) -> List[tuple]:
+        """(zoom, x, y) of every cell with stored aggregates"""
+
+    @abstractmethod
+    async def clear_grid_cells(self, cells: List[tuple], bucket_from, bucket_to):
+        """Delete the aggregates of (zoom, x, y) cells for the buckets from bucket_from up to bucket_to"""
+
+    @abstractmethod
+    async def schedule_grid_rebuild(self, cells: List[tuple], rebuild_until):
+        """Record that (zoom, x, y) cells must be rebuilt up to rebuild_until"""
+
+    @abstractmethod
+    async def get_grid_rebuilds(self) -> List[dict]:
+        """The scheduled rebuilds: zoom, x, y and rebuild_until of each cell"""
+
+    @abstractmethod
+    async def finish_grid_rebuild(self, cells: List[tuple], rebuild_until):
+        """Remove the rebuilds of (zoom, x, y) cells up to rebuild_until, keeping those scheduled later"""
+
+    # Forecasts
+
+    @abstractmethod
+    async def insert_forecasts(self, date: str, station_code: int, forecasts: List[tuple]):
+        """Insert (type, value, unit) forecasts for a station and date"""
+
+    @abstractmethod
+    async def get_forecast(self, station_code: int, date) -> List[dict]:
+        """Forecasts of every type for a station on a date"""
+
+    # Station catalog
+
+    @abstractmethod
+    async def get_stations(self, city: Optional[str], page: int, limit: int, sort: str, sort_order: str) -> List[dict]:
+        """Stations, optionally filtered by city, sorted and paginated"""
+
+    @abstractmethod
+    async def create_station(self, station):
+        """Insert a station, raising IntegrityError when its city is taken"""
+
+    @abstractmethod
+    async def update_station(self, code: int, fields_to_update: dict):
+        """Update the given fields of a station"""
+
+    @abstractmethod
+    async def delete_station(self, code: int):
+        """Delete a station, raising IntegrityError while sensors, readings or forecasts reference it"""
+
+    async def warm_up(self):
+        """Open connections ahead of the first request"""
+
+    async def close(self):
+        """Release connections and files held by the backend"""
@@ -0,0 +1,310 @@
+import os
+import time
+import asyncio
+import functools
+from typing import Optional, List
+import database.admission as admission
+import database.queries.sensors as sensors_queries
+import database.queries.stations as stations_queries
+import database.queries.quantiles as quantiles_queries
+import database.queries.grid as grid_queries
+import database.queries.coverage as coverage_queries
+from database.backends.base import StorageBackend, IntegrityError
+import utils.stations as stations_utils
+import utils.exports as exports_utils
+import utils.gaps as gaps_utils
+import utils.quantiles as quantiles_utils
+import utils.grid as grid_utils
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", os.path.join("data", "meteo.duckdb"))
+DUCKDB_SETUP_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "duckdb")
+
+
+@functools.lru_cache(maxsize=256)
+def _translate(query: str) -> str:
+    """
+    The query builders emit MySQL placeholders; the shapes they generate are otherwise plain SQL
+    that DuckDB runs unchanged, so only the parameter style needs converting. There is one text per
+    query shape, so each is converted once.
+    """
+    return query.replace("%s", "?")
+
+
+class DuckDBBackend(StorageBackend):
+    """
+    Embedded columnar storage in a local DuckDB file, for analytical reads and for running the
+    service and its load tests without a MySQL server. A new file is created with the schema
+    and the sample stations and sensors.
+    """
+
+    def __init__(self, path: str = DUCKDB_PATH):
+        import duckdb
+
+        self.duckdb = duckdb
+        is_new = path == ":memory:" or not os.path.exists(path)
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = duckdb.connect(path)
+        if is_new:
+            for setup_file in sorted(os.listdir(DUCKDB_SETUP_DIR)):
+                with open(os.path.join(DUCKDB_SETUP_DIR, setup_file)) as f:
+                    self.connection.execute(f.read())
+
+    def _fetch(self, query: str, params=None) -> List[dict]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(_translate(query), params)
+            if cursor.description is None:
+                return []
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except self.duckdb.ConstraintException as e:
+            raise IntegrityError(str(e))
+        finally:
+            cursor.close()
+
+    async def _run(self, workload: str, fn, *args):
+        """Run blocking DuckDB work in a thread, within the workload's admission budget"""
+        budget = admission.budgets[workload]
+        await budget.acquire()
+        started = time.monotonic()
+        try:
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            budget.release(time.monotonic() - started)
+
+    async def insert_reading(self, reading: dict):
+        await self._run("ingest", self._fetch, sensors_queries.CREATE_SENSOR_DATA, (
+            reading["sensor_id"],
+            reading["station_code"],
+            reading["date"],
+            reading["type"],
+            reading["measurement"],
+            reading["unit"]
+        ))
+
+    def _insert_batch(self, station_code: int, readings: List[dict]) -> List[bool]:
+        rows = [
+            (r["sensor_id"], station_code, r["date"], r["type"], r["measurement"], r["unit"])
+            for r in readings
+        ]
+        query = _translate(stations_queries.CREATE_BATCH_SENSOR_DATA)
+        cursor = self.connection.cursor()
+        try:
+            # Insert the whole batch at once, and only go row by row to find the failing rows
+            try:
+                cursor.execute("BEGIN TRANSACTION")
+                cursor.executemany(query, rows)
+                cursor.execute("COMMIT")
+                return [True] * len(rows)
+            except self.duckdb.Error:
+                cursor.execute("ROLLBACK")
+
+            stored = []
+            for row in rows:
+                try:
+                    cursor.execute(query, row)
+                    stored.append(True)
+                except self.duckdb.Error as e:
+                    print(f"Error inserting sensor data: {e}. Sensor data: {row}")
+                    stored.append(False)
+            return stored
+        finally:
+            cursor.close()
+
+    async def insert_readings(self, station_code: int, readings: List[dict]) -> List[bool]:
+        return await self._run("ingest", self._insert_batch, station_code, readings)
+
+    async def get_station_data(self, station_code: int, request) -> List[dict]:
+        query, params = stations_utils.build_paginated_query(station_code, request)
+        return await self._run("read", self._fetch, query, params)
+
+    async def get_station_data_summary(self, station_code: int) -> List[dict]:
+        return await self._run("read", self._fetch, stations_queries.GET_STATION_DATA_SUMMARY, (station_code,))
+
+    async def count_readings(self, request) -> int:
+        count_query, _, params = exports_utils.build_export_queries(request)
+        return (await self._run("bulk", self._fetch, count_query, params))[0]["total"]
+
+    async def stream_readings(self, request, batch_size: int):
+        _, data_query, params = exports_utils.build_export_queries(request)
+        budget = admission.budgets["bulk"]
+        await budget.acquire()
+        started = time.monotonic()
+        cursor = self.connection.cursor()
+        try:
+            await asyncio.to_thread(cursor.execute, _translate(data_query), params)
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            cursor.close()
+            budget.release(time.monotonic() - started)
+
+    async def get_first_reading_date(self, since, station_codes: List[int]):
+        if not station_codes:
+            return None
+        query = sensors_queries.GET_FIRST_READING_DATES.format(station_placeholders=", ".join(["%s"] * len(station_codes)))
+        rows = await self._run("read", self._fetch, query, (*station_codes, since))
+        return min((row["first_date"] for row in rows), default=None)
+
+    def _find_reading_gaps(self, station_code: Optional[int], date_from, date_to, max_delay_seconds: int) -> dict:
+        result = {"sensors": self._fetch(*gaps_utils.build_sensors_query(station_code)), "gaps": [], "coverage": []}
+        for sensor_ids in gaps_utils.sensor_batches(result["sensors"]):
+            queries = gaps_utils.build_gap_queries(sensor_ids, date_from, date_to, max_delay_seconds)
+            for name, (query, params) in queries.items():
+                result[name].extend(self._fetch(query, params))
+        return result
+
+    async def find_reading_gaps(self, station_code: Optional[int], date_from, date_to, max_delay_seconds: int, workload: str = "read") -> dict:
+        return await self._run(workload, self._find_reading_gaps, station_code, date_from, date_to, max_delay_seconds)
+
+    async def get_sketches(self, station_code: int, types: Optional[List[str]], bucket_from, bucket_to) -> List[dict]:
+        query, params = quantiles_utils.build_sketches_query(station_code, types, bucket_from, bucket_to)
+        return await self._run("read", self._fetch, query, params)
+
+    def _merge_sketches(self, sketches: List[tuple], merge):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("BEGIN TRANSACTION")
+            for station_code, sketch_type, bucket_start, readings, sketch in sketches:
+                key = (station_code, sketch_type, bucket_start)
+                stored = cursor.execute(_translate(quantiles_queries.GET_SKETCH), key).fetchone()
+                if stored:
+                    cursor.execute(
+                        _translate(quantiles_queries.UPDATE_SKETCH),
+                        (readings, merge(stored[0], sketch), *key)
+                    )
+                else:
+                    cursor.execute(_translate(quantiles_queries.INSERT_SKETCH), (*key, readings, sketch))
+            cursor.execute("COMMIT")
+        except self.duckdb.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.close()
+
+    async def merge_sketches(self, sketches: List[tuple], merge):
+        await self._run("ingest", self._merge_sketches, sketches, merge)
+
+    def _replace_sketches(self, sketches: List[tuple]):
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(_translate(quantiles_queries.REPLACE_SKETCH_DUCKDB), sketches)
+        finally:
+            cursor.close()
+
+    async def replace_sketches(self, sketches: List[tuple]):
+        await self._run("bulk", self._replace_sketches, sketches)
+
+    async def get_coverage(self, name: str):
+        rows = await self._run("read", self._fetch, coverage_queries.GET_COVERAGE, (name,))
+        return rows[0]["covered_from"] if rows else None
+
+    async def extend_coverage(self, name: str, covered_from):
+        await self._run("ingest", self._fetch, coverage_queries.EXTEND_COVERAGE_DUCKDB, (name, covered_from))
+
+    async def get_grid_aggregates(self, zoom: int, request, bucket_from, bucket_to) -> List[dict]:
+        query, params = grid_utils.build_grid_query(zoom, request, bucket_from, bucket_to)
+        return await self._run("read", self._fetch, query, params)
+
+    def _add_grid_aggregates(self, aggregates: List[tuple]):
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(_translate(grid_queries.UPSERT_GRID_AGGREGATE_DUCKDB), aggregates)
+        finally:
+            cursor.close()
+
+    async def add_grid_aggregates(self, aggregates: List[tuple]):
+        await self._run("ingest", self._add_grid_aggregates, aggregates)
+
+    async def get_grid_cells(self) -> List[tuple]:
+        rows = await self._run("bulk", self._fetch, grid_queries.GET_GRID_CELLS)
+        return [(row["zoom"], row["x"], row["y"]) for row in rows]
+
+    def _clear_grid_cells(self, cells: List[tuple], bucket_from, bucket_to):
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(
+                _translate(grid_queries.DELETE_GRID_CELL),
+                [(zoom, x, y, bucket_from, bucket_to) for zoom, x, y in cells]
+            )
+        finally:
+            cursor.close()
+
+    async def clear_grid_cells(self, cells: List[tuple], bucket_from, bucket_to):
+        await self._run("bulk", self._clear_grid_cells, cells, bucket_from, bucket_to)
+
+    def _execute_for_cells(self, query: str, cells: List[tuple], value):
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(_translate(query), [(zoom, x, y, value) for zoom, x, y in cells])
+        finally:
+            cursor.close()
+
+    async def schedule_grid_rebuild(self, cells: List[tuple], rebuild_until):
+        await self._run("ingest", self._execute_for_cells, grid_queries.SCHEDULE_GRID_REBUILD_DUCKDB, cells, rebuild_until)
+
+    async def get_grid_rebuilds(self) -> List[dict]:
+        return await self._run("read", self._fetch, grid_queries.GET_GRID_REBUILDS)
+
+    async def finish_grid_rebuild(self, cells: List[tuple], rebuild_until):
+        await self._run("ingest", self._execute_for_cells, grid_queries.DELETE_GRID_REBUILD, cells, rebuild_until)
+
+    def _insert_forecasts(self, date: str, station_code: int, forecasts: List[tuple]):
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(
+                _translate(stations_queries.CREATE_FORECAST),
+                [(date, station_code, forecast_type, value, unit) for forecast_type, value, unit in forecasts]
+            )
+        except self.duckdb.ConstraintException as e:
+            raise IntegrityError(str(e))
+        finally:
+            cursor.close()
+
+    async def insert_forecasts(self, date: str, station_code: int, forecasts: List[tuple]):
+        await self._run("ingest", self._insert_forecasts, date, station_code, forecasts)
+
+    async def get_forecast(self, station_code: int, date) -> List[dict]:
+        return await self._run("read", self._fetch, stations_queries.GET_FORECAST, (station_code, date))
+
+    async def get_stations(self, city: Optional[str], page: int, limit: int, sort: str, sort_order: str) -> List[dict]:
+        query, params = stations_utils.build_stations_query(city, page, limit, sort, sort_order)
+        return await self._run("read", self._fetch, query, params)
+
+    async def create_station(self, station):
+        await self._run("ingest", self._fetch, stations_queries.INSERT_STATION, (
+            station.city, station.latitude, station.longitude, station.installation_date
+        ))
+
+    async def update_station(self, code: int, fields_to_update: dict):
+        query, params = stations_utils.update_station_in_db(code, fields_to_update)
+        await self._run("ingest", self._fetch, query, params)
+
+    def _delete_station(self, code: int):
+        # The schema has no foreign keys to stations (see duckdb/a_setup.sql), so the delete is
+        # restricted here, in the same transaction
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("BEGIN TRANSACTION")
+            referenced = cursor.execute(_translate(stations_queries.STATION_REFERENCES), (code, code, code)).fetchone()[0]
+            if not referenced:
+                cursor.execute(_translate(stations_queries.DELETE_STATION), (code,))
+            cursor.execute("COMMIT")
+        except self.duckdb.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.close()
+        if referenced:
+            raise IntegrityError(f"Station {code} is still referenced by sensors, readings or forecasts")
+
+    async def delete_station(self, code: int):
+        await self._run("ingest", self._delete_station, code)
+
+    async def close(self):
+        self.connection.close()
@@ -0,0 +1,208 @@
+from typing import Optional, List
+import aiomysql
+import database.database as database
+import database.queries.sensors as sensors_queries
+import database.queries.stations as stations_queries
+import database.queries.quantiles as quantiles_queries
+import database.queries.grid as grid_queries
+import database.queries.coverage as coverage_queries
+from database.backends.base import StorageBackend, IntegrityError
+import utils.stations as stations_utils
+import utils.exports as exports_utils
+import utils.gaps as gaps_utils
+import utils.quantiles as quantiles_utils
+import utils.grid as grid_utils
+
+
+class MySQLBackend(StorageBackend):
+    """
+    Storage on the MySQL primary and its replicas, through the pooled SQLConnection.
+    """
+
+    async def insert_reading(self, reading: dict):
+        async with database.SQLConnection() as db:
+            await db.execute_query(
+                sensors_queries.CREATE_SENSOR_DATA,
+                (
+                    reading["sensor_id"],
+                    reading["station_code"],
+                    reading["date"],
+                    reading["type"],
+                    reading["measurement"],
+                    reading["unit"]
+                )
+            )
+
+    async def insert_readings(self, station_code: int, readings: List[dict]) -> List[bool]:
+        stored = []
+        async with database.SQLConnection() as db:
+            for reading in readings:
+                try:
+                    await db.execute_query(
+                        stations_queries.CREATE_BATCH_SENSOR_DATA,
+                        (
+                            reading["sensor_id"],
+                            station_code,
+                            reading["date"],
+                            reading["type"],
+                            reading["measurement"],
+                            reading["unit"]
+                        )
+                    )
+                    stored.append(True)
+                except Exception as e:
+                    print(f"Error inserting sensor data: {e}. Sensor data: {reading}")
+                    stored.append(False)
+        return stored
+
+    async def get_station_data(self, station_code: int, request) -> List[dict]:
+        query, params = stations_utils.build_paginated_query(station_code, request)
+        async with database.SQLConnection(read_only=True) as db:
+            return await db.execute_query(query, params)
+
+    async def get_station_data_summary(self, station_code: int) -> List[dict]:
+        async with database.SQLConnection(read_only=True) as db:
+            return await db.execute_query(stations_queries.GET_STATION_DATA_SUMMARY, (station_code,))
+
+    async def count_readings(self, request) -> int:
+        count_query, _, params = exports_utils.build_export_queries(request)
+        async with database.SQLConnection(read_only=True, workload="bulk") as db:
+            return (await db.execute_query(count_query, params))[0]["total"]
+
+    async def stream_readings(self, request, batch_size: int):
+        _, data_query, params = exports_utils.build_export_queries(request)
+        async with database.SQLConnection(read_only=True, workload="bulk") as db:
+            async for rows in db.stream_query(data_query, params, batch_size=batch_size):
+                yield rows
+
+    async def get_first_reading_date(self, since, station_codes: List[int]):
+        if not station_codes:
+            return None
+        query = sensors_queries.GET_FIRST_READING_DATES.format(station_placeholders=", ".join(["%s"] * len(station_codes)))
+        async with database.SQLConnection(read_only=True) as db:
+            rows = await db.execute_query(query, (*station_codes, since))
+        return min((row["first_date"] for row in rows), default=None)
+
+    async def find_reading_gaps(self, station_code: Optional[int], date_from, date_to, max_delay_seconds: int, workload: str = "read") -> dict:
+        async with database.SQLConnection(read_only=True, workload=workload) as db:
+            result = {"sensors": await db.execute_query(*gaps_utils.build_sensors_query(station_code)), "gaps": [], "coverage": []}
+            for sensor_ids in gaps_utils.sensor_batches(result["sensors"]):
+                queries = gaps_utils.build_gap_queries(sensor_ids, date_from, date_to, max_delay_seconds)
+                for name, (query, params) in queries.items():
+                    result[name].extend(await db.execute_query(query, params))
+        return result
+
+    async def get_sketches(self, station_code: int, types: Optional[List[str]], bucket_from, bucket_to) -> List[dict]:
+        query, params = quantiles_utils.build_sketches_query(station_code, types, bucket_from, bucket_to)
+        async with database.SQLConnection(read_only=True) as db:
+            return await db.execute_query(query, params)
+
+    async def merge_sketches(self, sketches: List[tuple], merge):
+        # Rows are locked while they are merged, so concurrent flushes from other workers serialize
+        async with database.SQLConnection() as db:
+            for station_code, sketch_type, bucket_start, readings, sketch in sketches:
+                key = (station_code, sketch_type, bucket_start)
+                stored = await db.execute_query(quantiles_queries.GET_SKETCH_FOR_UPDATE, key)
+                if stored:
+                    await db.execute_query(
+                        quantiles_queries.UPDATE_SKETCH,
+                        (readings, merge(stored[0]["sketch"], sketch), *key)
+                    )
+                else:
+                    await db.execute_query(quantiles_queries.INSERT_SKETCH, (*key, readings, sketch))
+
+    async def replace_sketches(self, sketches: List[tuple]):
+        async with database.SQLConnection(workload="bulk") as db:
+            for sketch in sketches:
+                await db.execute_query(quantiles_queries.REPLACE_SKETCH, sketch)
+
+    async def get_coverage(self, name: str):
+        async with database.SQLConnection(read_only=True) as db:
+            rows = await db.execute_query(coverage_queries.GET_COVERAGE, (name,))
+        return rows[0]["covered_from"] if rows else None
+
+    async def extend_coverage(self, name: str, covered_from):
+        async with database.SQLConnection() as db:
+            await db.execute_query(coverage_queries.EXTEND_COVERAGE, (name, covered_from))
+
+    async def get_grid_aggregates(self, zoom: int, request, bucket_from, bucket_to) -> List[dict]:
+        query, params = grid_utils.build_grid_query(zoom, request, bucket_from, bucket_to)
+        async with database.SQLConnection(read_only=True) as db:
+            return await db.execute_query(query, params)
+
+    async def add_grid_aggregates(self, aggregates: List[tuple]):
+        async with database.SQLConnection() as db:
+            for aggregate in aggregates:
+                await db.execute_query(grid_queries.UPSERT_GRID_AGGREGATE, aggregate)
+
+    async def get_grid_cells(self) -> List[tuple]:
+        async with database.SQLConnection(read_only=True, workload="bulk") as db:
+            rows = await db.execute_query(grid_queries.GET_GRID_CELLS)
+        return [(row["zoom"], row["x"], row["y"]) for row in rows]
+
+    async def clear_grid_cells(self, cells: List[tuple], bucket_from, bucket_to):
+        async with database.SQLConnection(workload="bulk") as db:
+            for zoom, x, y in cells:
+                await db.execute_query(grid_queries.DELETE_GRID_CELL, (zoom, x, y, bucket_from, bucket_to))
+
+    async def schedule_grid_rebuild(self, cells: List[tuple], rebuild_until):
+        async with database.SQLConnection() as db:
+            for zoom, x, y in cells:
+                await db.execute_query(grid_queries.SCHEDULE_GRID_REBUILD, (zoom, x, y, rebuild_until))
+
+    async def get_grid_rebuilds(self) -> List[dict]:
+        async with database.SQLConnection() as db:
+            return await db.execute_query(grid_queries.GET_GRID_REBUILDS)
+
+    async def finish_grid_rebuild(self, cells: List[tuple], rebuild_until):
+        async with database.SQLConnection() as db:
+            for zoom, x, y in cells:
+                await db.execute_query(grid_queries.DELETE_GRID_REBUILD, (zoom, x, y, rebuild_until))
+
+    async def insert_forecasts(self, date: str, station_code: int, forecasts: List[tuple]):
+        async with database.SQLConnection() as db:
+            for forecast_type, value, unit in forecasts:
+                await db.execute_query(
+                    stations_queries.CREATE_FORECAST,
+                    (date, station_code, forecast_type, value, unit)
+                )
+
+    async def get_forecast(self, station_code: int, date) -> List[dict]:
+        async with database.SQLConnection(read_only=True) as db:
+            return await db.execute_query(stations_queries.GET_FORECAST, (station_code, date))
+
+    async def get_stations(self, city: Optional[str], page: int, limit: int, sort: str, sort_order: str) -> List[dict]:
+        query, params = stations_utils.build_stations_query(city, page, limit, sort, sort_order)
+        async with database.SQLConnection(read_only=True) as db:
+            return await db.execute_query(query, params)
+
+    async def create_station(self, station):
+        try:
+            async with database.SQLConnection() as db:
+                await db.execute_query(
+                    stations_queries.INSERT_STATION,
+                    (station.city, station.latitude, station.longitude, station.installation_date)
+                )
+        except aiomysql.IntegrityError as e:
+            raise IntegrityError(str(e))
+
+    async def update_station(self, code: int, fields_to_update: dict):
+        query, params = stations_utils.update_station_in_db(code, fields_to_update)
+        try:
+            async with database.SQLConnection() as db:
+                await db.execute_query(query, params)
+        except aiomysql.IntegrityError as e:
+            raise IntegrityError(str(e))
+
+    async def delete_station(self, code: int):
+        try:
+            async with database.SQLConnection() as db:
+                await db.execute_query(stations_queries.DELETE_STATION, (code,))
+        except aiomysql.IntegrityError as e:
+            raise IntegrityError(str(e))
+
+    async def warm_up(self):
+        await database.open_pools()
+
+    async def close(self):
+        await database.close_pools()
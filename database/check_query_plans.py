@@ -0,0 +1,223 @@
+"""
+Runs EXPLAIN on every query shape the API generates and fails if any of them reads a table
+without the index it was designed for, falls back to a full table or unbounded index scan, or
+needs a filesort that is not bounded by the rows of its range.
+
+Run it against a MySQL database with the migrations applied. The optimizer only prefers indexes
+once tables are large enough, so on a freshly seeded database pass --seed to add synthetic
+stations and sensor readings first:
+
+    python -m database.migrate
+    python -m database.check_query_plans --seed 5000
+
+The test suite runs the same check when CHECK_QUERY_PLANS=1 (see tests/test_query_plans.py).
+"""
+import sys
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Optional
+import database.database as database
+import utils.stations as stations_utils
+import utils.exports as exports_utils
+import utils.quantiles as quantiles_utils
+import utils.grid as grid_utils
+import utils.gaps as gaps_utils
+import database.queries.quantiles as quantiles_queries
+import database.queries.coverage as coverage_queries
+import database.queries.grid as grid_queries
+import database.queries.sensors as sensors_queries
+from models.stations import StationDataRequest
+from models.exports import ExportRequest
+from models.grid import GridQueryParams
+
+SEED_STATIONS = """
+INSERT IGNORE INTO stations (city, latitude, longitude, installation_date)
+WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+SELECT CONCAT('Seed City ', n), 45.0 + n / 100000, 9.0 + n / 100000, DATE_SUB(CURDATE(), INTERVAL n DAY)
+FROM seq;
+"""
+
+SEED_SENSORS_DATA = """
+INSERT IGNORE INTO sensors_data (sensor_id, station_code, date, type, measurement, unit)
+WITH RECURSIVE seq (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+SELECT s.id, s.station_code, DATE_SUB(NOW(), INTERVAL seq.n MINUTE), s.type, ROUND(RAND() * 30, 2),
+    CASE s.type WHEN 'temperature' THEN 'Celsius' WHEN 'humidity' THEN '%%' ELSE 'm/s' END
+FROM sensors s CROSS JOIN seq;
+"""
+
+FIRST_STATION = """
+SELECT station_code FROM sensors ORDER BY station_code LIMIT 1;
+"""
+
+FIRST_SENSORS = """
+SELECT id FROM sensors ORDER BY id LIMIT %s;
+"""
+
+# Period of the gap scans checked; the seed writes one reading per sensor and minute
+GAP_SCAN_MINUTES = 10
+
+
+# Indexes each query shape may use, by table
+STATIONS_CODE = {"stations": {"PRIMARY"}}
+STATIONS_INSTALLATION_DATE = {"stations": {"idx_stations_installation_date"}}
+STATIONS_CITY = {"stations": {"unique_city"}}
+SENSORS_DATA_BY_STATION = {"sensors_data": {"idx_sensors_data_station_type_date", "idx_sensors_data_station_date"}}
+FORECAST_KEY = {"forecast": {"PRIMARY"}}
+SKETCHES_KEY = {"quantile_sketches": {"PRIMARY"}}
+GRID_KEY = {"grid_aggregates": {"PRIMARY"}}
+COVERAGE_KEY = {"aggregate_coverage": {"PRIMARY"}}
+GRID_REBUILDS_KEY = {"grid_rebuilds": {"PRIMARY"}}
+SENSORS_DATA_BY_SENSOR = {"sensors_data": {"PRIMARY"}}
+
+
+def _page_rows(params) -> int:
+    """Rows a paginated query reads in index order: its LIMIT plus its OFFSET"""
+    return params[-2] + params[-1]
+
+
+def query_shapes(station_code: int, sensor_ids: List[str]):
+    """
+    Yield (name, query, params, keys, max_rows, sort_rows) for every query shape the API and its
+    background tasks generate. keys maps each table to the indexes the shape may use; max_rows
+    bounds the rows a full index scan may read, and is only set for shapes that stop after a page
+    in index order. sort_rows bounds the rows a filesort may read, and is only set for the shapes
+    that sort the rows of a short range in memory.
+    """
+    date_to = datetime.now()
+    date_from = date_to - timedelta(days=7)
+
+    for sort, keys in [("code", STATIONS_CODE), ("installation_date", STATIONS_INSTALLATION_DATE)]:
+        for sort_order in ["ASC", "DESC"]:
+            query, params = stations_utils.build_stations_query(None, 1, 50, sort, sort_order)
+            yield f"stations sort={sort} {sort_order}", query, params, keys, _page_rows(params), None
+    query, params = stations_utils.build_stations_query("Milan", 1, 50, "code", "ASC")
+    yield "stations city filter", query, params, STATIONS_CITY, None, None
+
+    for sort in ["date", "type"]:
+        for sensor_type in [None, "temperature"]:
+            for with_range in [False, True]:
+                request = StationDataRequest(
+                    sort=sort,
+                    type=sensor_type,
+                    date_from=date_from.isoformat() if with_range else None,
+                    date_to=date_to.isoformat() if with_range else None,
+                )
+                query, params = stations_utils.build_paginated_query(station_code, request)
+                name = f"station data sort={sort} type={sensor_type or '-'} range={'yes' if with_range else 'no'}"
+                yield name, query, params, SENSORS_DATA_BY_STATION, _page_rows(params), None
+
+    query, params = stations_utils.get_station_data_summary_or_paginated(station_code, StationDataRequest(summary=True))
+    yield "station data summary", query, params, SENSORS_DATA_BY_STATION, None, None
+
+    query, params = stations_utils.get_forecast_for_next_day(station_code)
+    yield "forecast next day", query, params, FORECAST_KEY, None, None
+
+    for types in [None, ["temperature"]]:
+        request = ExportRequest(
+            station_codes=[station_code], types=types,
+            date_from=date_from.isoformat(), date_to=date_to.isoformat()
+        )
+        _, query, params = exports_utils.build_export_queries(request)
+        yield f"export types={','.join(types) if types else '-'}", query, params, SENSORS_DATA_BY_STATION, None, None
+
+    for types in [None, ["temperature"]]:
+        query, params = quantiles_utils.build_sketches_query(station_code, types, date_from, date_to)
+        yield f"percentile sketches types={','.join(types) if types else '-'}", query, params, SKETCHES_KEY, None, None
+    yield (
+        "percentile sketch for update", quantiles_queries.GET_SKETCH_FOR_UPDATE,
+        (station_code, "temperature", date_from), SKETCHES_KEY, None, None,
+    )
+
+    yield "aggregate coverage", coverage_queries.GET_COVERAGE, ("quantile_sketches",), COVERAGE_KEY, None, None
+
+    # The gaps are found by a window over each sensor's readings in date order. The primary key
+    # returns them in that order; if the optimizer still sorts them for the window, the sort must
+    # stay within the scanned period of the batch's sensors, never their whole history.
+    scan_from = date_to - timedelta(minutes=GAP_SCAN_MINUTES)
+    queries = gaps_utils.build_gap_queries(sensor_ids, scan_from, date_to, 120)
+    scan_rows = len(sensor_ids) * (GAP_SCAN_MINUTES + 1)
+    yield "gaps sensor batch", *queries["gaps"], SENSORS_DATA_BY_SENSOR, None, scan_rows
+    yield "gap coverage sensor batch", *queries["coverage"], SENSORS_DATA_BY_SENSOR, None, None
+
+    bbox = GridQueryParams(min_latitude=35.0, min_longitude=5.0, max_latitude=48.0, max_longitude=19.0)
+    for zoom in grid_utils.GRID_ZOOM_LEVELS:
+        query, params = grid_utils.build_grid_query(zoom, bbox, date_from, date_to)
+        yield f"grid zoom={zoom}", query, params, GRID_KEY, None, None
+    x, y = grid_utils.tile_for(45.46, 9.19, zoom)
+    yield "grid cell rebuild", grid_queries.DELETE_GRID_CELL, (zoom, x, y, date_from, date_to), GRID_KEY, None, None
+    yield "grid coverage", coverage_queries.GET_COVERAGE, ("grid_aggregates",), COVERAGE_KEY, None, None
+    yield "grid rebuild done", grid_queries.DELETE_GRID_REBUILD, (zoom, x, y, date_to), GRID_REBUILDS_KEY, None, None
+    yield (
+        "next reading", sensors_queries.GET_FIRST_READING_DATES.format(station_placeholders="%s"),
+        (station_code, date_from), SENSORS_DATA_BY_STATION, None, None,
+    )
+
+
+def plan_problems(plan, keys: dict, max_rows: Optional[int] = None, sort_rows: Optional[int] = None):
+    """
+    Return the reasons a plan is rejected, empty when it is acceptable. Every table must be read
+    through one of the indexes the shape expects; a full index scan is only accepted when the
+    optimizer estimates it stops within max_rows, as a page read in index order does. A filesort
+    is only accepted when the optimizer estimates it sorts at most sort_rows rows.
+    """
+    problems = []
+    for step in plan:
+        table = step.get("table")
+        if table is None or table.startswith("<"):
+            continue
+        key = step.get("key")
+        if step["type"] == "ALL" or key is None:
+            problems.append(f"full scan of {table}")
+        elif table in keys and key not in keys[table]:
+            problems.append(f"{table} read through {key} instead of {' or '.join(sorted(keys[table]))}")
+        elif step["type"] == "index" and (max_rows is None or (step.get("rows") or 0) > max_rows):
+            problems.append(f"full index scan of {table}")
+        if "filesort" in (step.get("Extra") or "") and (sort_rows is None or (step.get("rows") or 0) > sort_rows):
+            problems.append(f"filesort on {table}")
+    return problems
+
+
+async def seed(rows: int):
+    async with database.SQLConnection() as db:
+        await db.execute_query("SET SESSION cte_max_recursion_depth = %s", (rows + 1,))
+        await db.execute_query(SEED_STATIONS, (rows,))
+        await db.execute_query(SEED_SENSORS_DATA, (rows,))
+    async with database.SQLConnection() as db:
+        await db.execute_query("ANALYZE TABLE stations, sensors_data, forecast")
+
+
+async def check(seed_rows: int) -> int:
+    if seed_rows:
+        await seed(seed_rows)
+
+    failures = 0
+    async with database.SQLConnection() as db:
+        station = await db.execute_query(FIRST_STATION)
+        station_code = station[0]["station_code"] if station else 1
+        sensors = await db.execute_query(FIRST_SENSORS, (gaps_utils.GAP_SENSOR_BATCH_SIZE,))
+        sensor_ids = [sensor["id"] for sensor in sensors] or ["-"]
+        for name, query, params, keys, max_rows, sort_rows in query_shapes(station_code, sensor_ids):
+            plan = await db.execute_query("EXPLAIN " + query, params)
+            problems = plan_problems(plan, keys, max_rows, sort_rows)
+            keys = ", ".join(str(step.get("key")) for step in plan if step.get("table"))
+            print(f"{'FAIL' if problems else 'ok':<5} {name:<55} key={keys} {'; '.join(problems)}")
+            failures += bool(problems)
+
+    await database.close_pools()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="Add this many synthetic stations and readings per sensor first.")
+    args = parser.parse_args()
+
+    failures = asyncio.run(check(args.seed))
+    if failures:
+        print(f"{failures} query shape(s) without a usable index")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
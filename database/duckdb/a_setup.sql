@@ -0,0 +1,84 @@
+-- Schema of the embedded DuckDB backend, equivalent to database/a_setup.sql.
+-- DuckDB rejects any UPDATE of a row that a foreign key references, so the references to stations
+-- are left out and DuckDBBackend.delete_station enforces them. Sensors are never updated, so
+-- readings keep their foreign key to them.
+
+CREATE SEQUENCE IF NOT EXISTS stations_code_seq START 1;
+
+CREATE TABLE IF NOT EXISTS stations (
+    code INTEGER PRIMARY KEY DEFAULT nextval('stations_code_seq'),
+    city VARCHAR(100) NOT NULL UNIQUE,
+    latitude DECIMAL(9, 6) NOT NULL,
+    longitude DECIMAL(9, 6) NOT NULL,
+    installation_date DATE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sensors (
+    id CHAR(36) PRIMARY KEY,
+    station_code INTEGER NOT NULL,
+    type VARCHAR NOT NULL CHECK (type IN ('temperature', 'humidity', 'wind'))
+);
+
+CREATE TABLE IF NOT EXISTS sensors_data (
+    sensor_id CHAR(36) NOT NULL REFERENCES sensors(id),
+    station_code INTEGER NOT NULL,
+    date TIMESTAMP NOT NULL,
+    type VARCHAR NOT NULL CHECK (type IN ('temperature', 'humidity', 'wind')),
+    measurement DECIMAL(10, 2) NOT NULL,
+    unit VARCHAR(10) NOT NULL,
+    PRIMARY KEY (sensor_id, date),
+    CHECK (
+        (type = 'wind' AND unit = 'm/s') OR
+        (type = 'temperature' AND unit = 'Celsius') OR
+        (type = 'humidity' AND unit = '%')
+    )
+);
+
+CREATE TABLE IF NOT EXISTS forecast (
+    date TIMESTAMP NOT NULL,
+    station_code INTEGER NOT NULL,
+    type VARCHAR NOT NULL CHECK (type IN ('temperature', 'humidity', 'wind')),
+    measurement DECIMAL(10, 2) NOT NULL,
+    unit VARCHAR(10) NOT NULL,
+    PRIMARY KEY (date, station_code, type),
+    CHECK (
+        (type = 'wind' AND unit = 'm/s') OR
+        (type = 'temperature' AND unit = 'Celsius') OR
+        (type = 'humidity' AND unit = '%')
+    )
+);
+
+CREATE TABLE IF NOT EXISTS quantile_sketches (
+    station_code INTEGER NOT NULL,
+    type VARCHAR NOT NULL CHECK (type IN ('temperature', 'humidity', 'wind')),
+    bucket_start TIMESTAMP NOT NULL,
+    readings BIGINT NOT NULL,
+    sketch BLOB NOT NULL,
+    PRIMARY KEY (station_code, type, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS grid_aggregates (
+    zoom TINYINT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    type VARCHAR NOT NULL CHECK (type IN ('temperature', 'humidity', 'wind')),
+    bucket_start TIMESTAMP NOT NULL,
+    readings BIGINT NOT NULL,
+    total DOUBLE NOT NULL,
+    min_measurement DECIMAL(10, 2) NOT NULL,
+    max_measurement DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (zoom, x, y, type, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS grid_rebuilds (
+    zoom TINYINT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    rebuild_until TIMESTAMP NOT NULL,
+    PRIMARY KEY (zoom, x, y)
+);
+
+CREATE TABLE IF NOT EXISTS aggregate_coverage (
+    name VARCHAR(64) PRIMARY KEY,
+    covered_from TIMESTAMP NOT NULL
+);
@@ -0,0 +1,19 @@
+-- Sample stations and sensors for the embedded DuckDB backend, equivalent to database/b_fake_data.sql
+
+INSERT INTO stations (city, latitude, longitude, installation_date)
+VALUES
+('Milan', 45.4642, 9.1900, '2024-10-01'),
+('Como', 45.8100, 9.0852, '2024-08-15'),
+('Bergamo', 45.6983, 9.6773, '2024-09-01'),
+('Varese', 45.8205, 8.8257, '2024-09-05'),
+('Monza', 45.5845, 9.2744, '2024-10-02'),
+('Brescia', 45.5416, 10.2118, '2024-09-10'),
+('Pavia', 45.1847, 9.1582, '2024-09-15'),
+('Lecco', 45.8530, 9.3902, '2024-09-20'),
+('Lodi', 45.3092, 9.5032, '2024-09-25'),
+('Cremona', 45.1332, 10.0213, '2024-10-05');
+
+-- 3 sensors per station
+INSERT INTO sensors (id, station_code, type)
+SELECT CAST(gen_random_uuid() AS VARCHAR), code, sensor_type
+FROM stations CROSS JOIN (VALUES ('temperature'), ('humidity'), ('wind')) AS types (sensor_type);
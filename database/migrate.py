@@ -0,0 +1,64 @@
+"""
+Applies the versioned schema migrations in database/migrations to the primary database.
+
+Each migration is a .sql file whose name starts with its version (e.g. 001_sensors_data_query_indexes.sql).
+Applied versions are recorded in the schema_migrations table, so running this again only applies new files.
+
+    python -m database.migrate
+"""
+import os
+import asyncio
+import database.database as database
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+GET_APPLIED_MIGRATIONS = """
+SELECT version FROM schema_migrations;
+"""
+
+INSERT_MIGRATION = """
+INSERT INTO schema_migrations (version) VALUES (%s);
+"""
+
+
+def list_migrations():
+    """Return (version, path) for every migration file, in version order"""
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(os.path.splitext(f)[0], os.path.join(MIGRATIONS_DIR, f)) for f in files]
+
+
+def split_statements(sql: str):
+    """Split a migration file into statements, dropping comment lines"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+async def migrate():
+    async with database.SQLConnection() as db:
+        await db.execute_query(CREATE_MIGRATIONS_TABLE)
+        applied = {row["version"] for row in await db.execute_query(GET_APPLIED_MIGRATIONS)}
+
+    for version, path in list_migrations():
+        if version in applied:
+            continue
+        with open(path) as f:
+            statements = split_statements(f.read())
+        # DDL commits implicitly in MySQL, so each migration is recorded right after it runs
+        async with database.SQLConnection() as db:
+            for statement in statements:
+                await db.execute_query(statement)
+            await db.execute_query(INSERT_MIGRATION, (version,))
+        print(f"Applied migration {version}")
+
+    await database.close_pools()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
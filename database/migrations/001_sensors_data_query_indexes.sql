@@ -0,0 +1,11 @@
+-- Indexes matching the read shapes on sensors_data.
+-- The primary key (sensor_id, date) cannot serve queries that filter by station.
+
+-- Station data filtered by type and date range, ordered by date, and the per-type summary
+-- (GROUP BY type with AVG(measurement)) answered from the index alone
+CREATE INDEX idx_sensors_data_station_type_date
+ON sensors_data (station_code, type, date, measurement);
+
+-- Station data over a date range without a type filter, ordered by date, and exports
+CREATE INDEX idx_sensors_data_station_date
+ON sensors_data (station_code, date);
@@ -0,0 +1,3 @@
+-- Station listing sorted by installation date (the city filter is served by unique_city)
+CREATE INDEX idx_stations_installation_date
+ON stations (installation_date);
@@ -0,0 +1,9 @@
+-- Mergeable quantile sketches of the measurements of each station and type, per time bucket
+CREATE TABLE quantile_sketches (
+    station_code INT NOT NULL,
+    type ENUM('temperature', 'humidity', 'wind') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    readings BIGINT NOT NULL,
+    sketch BLOB NOT NULL,
+    PRIMARY KEY (station_code, type, bucket_start)
+);
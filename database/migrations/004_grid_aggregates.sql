@@ -0,0 +1,13 @@
+-- Measurement aggregates per map tile (Web Mercator zoom, x, y), type and time bucket
+CREATE TABLE grid_aggregates (
+    zoom TINYINT NOT NULL,
+    x INT NOT NULL,
+    y INT NOT NULL,
+    type ENUM('temperature', 'humidity', 'wind') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    readings BIGINT NOT NULL,
+    total DOUBLE NOT NULL,
+    min_measurement DECIMAL(10, 2) NOT NULL,
+    max_measurement DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (zoom, x, y, type, bucket_start)
+);
@@ -0,0 +1,6 @@
+-- Readings of every station over a date range, for the gap monitor's incremental scans
+-- (FIND_GAPS and GET_READING_COVERAGE without a station). The indexes on (station_code, ...)
+-- and the primary key (sensor_id, date) cannot serve a range on date alone; the index covers the
+-- columns the scans read, so only the new readings' index entries are visited.
+CREATE INDEX idx_sensors_data_date
+ON sensors_data (date, sensor_id, station_code, type);
@@ -0,0 +1,6 @@
+-- Start of the period each precomputed aggregate (quantile_sketches, grid_aggregates) covers
+-- completely: from there on every stored reading was added to it, by ingestion or by a backfill
+CREATE TABLE aggregate_coverage (
+    name VARCHAR(64) PRIMARY KEY,
+    covered_from DATETIME NOT NULL
+);
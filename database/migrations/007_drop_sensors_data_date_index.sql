@@ -0,0 +1,5 @@
+-- The gap scans read each sensor's range of the primary key (sensor_id, date) in batches of
+-- sensors, and the next-reading lookup reads idx_sensors_data_station_date per station, so the
+-- index on date that migration 005 added no longer serves any query. Dropping it saves a fourth
+-- secondary index update on every reading inserted.
+DROP INDEX idx_sensors_data_date ON sensors_data;
@@ -0,0 +1,9 @@
+-- Grid cells waiting to be rebuilt from sensors_data up to rebuild_until, after a station in them
+-- moved. The rows outlive a restart until the rebuild is done.
+CREATE TABLE grid_rebuilds (
+    zoom TINYINT NOT NULL,
+    x INT NOT NULL,
+    y INT NOT NULL,
+    rebuild_until DATETIME NOT NULL,
+    PRIMARY KEY (zoom, x, y)
+);
@@ -0,0 +1,17 @@
+GET_COVERAGE = """
+SELECT covered_from FROM aggregate_coverage WHERE name = %s;
+"""
+
+# The coverage only ever extends to earlier periods
+EXTEND_COVERAGE = """
+INSERT INTO aggregate_coverage (name, covered_from)
+VALUES (%s, %s) AS new
+ON DUPLICATE KEY UPDATE covered_from = LEAST(aggregate_coverage.covered_from, new.covered_from);
+"""
+
+# DuckDB spells the same upsert with ON CONFLICT
+EXTEND_COVERAGE_DUCKDB = """
+INSERT INTO aggregate_coverage (name, covered_from)
+VALUES (%s, %s)
+ON CONFLICT (name) DO UPDATE SET covered_from = LEAST(covered_from, excluded.covered_from);
+"""
@@ -0,0 +1,14 @@
+COUNT_EXPORT_ROWS = """
+SELECT COUNT(*) AS total FROM sensors_data
+WHERE station_code IN ({station_placeholders})
+AND date >= %s AND date <= %s
+{type_condition};
+"""
+
+GET_EXPORT_ROWS = """
+SELECT sensor_id, station_code, date, type, measurement, unit FROM sensors_data
+WHERE station_code IN ({station_placeholders})
+AND date >= %s AND date <= %s
+{type_condition}
+ORDER BY station_code, date;
+"""
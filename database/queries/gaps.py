@@ -0,0 +1,24 @@
+FIND_GAPS = """
+SELECT sensor_id, station_code, type, previous_date AS gap_start, date AS gap_end
+FROM (
+    SELECT sensor_id, station_code, type, date,
+        LAG(date) OVER (PARTITION BY sensor_id ORDER BY date) AS previous_date
+    FROM sensors_data
+    WHERE sensor_id IN ({sensor_placeholders}) AND date >= %s AND date <= %s
+) readings
+WHERE date > previous_date + INTERVAL (%s) SECOND
+ORDER BY sensor_id, gap_start;
+"""
+
+GET_READING_COVERAGE = """
+SELECT sensor_id, MIN(date) AS first_reading, MAX(date) AS last_reading, COUNT(*) AS readings
+FROM sensors_data
+WHERE sensor_id IN ({sensor_placeholders}) AND date >= %s AND date <= %s
+GROUP BY sensor_id;
+"""
+
+GET_SENSORS = """
+SELECT id AS sensor_id, station_code, type FROM sensors
+{station_condition}
+ORDER BY station_code, type;
+"""
@@ -0,0 +1,60 @@
+GET_GRID_CELLS = """
+SELECT DISTINCT zoom, x, y FROM grid_aggregates;
+"""
+
+GET_GRID_AGGREGATES = """
+SELECT x, y, type, bucket_start, readings, total, min_measurement, max_measurement
+FROM grid_aggregates
+WHERE zoom = %s AND x >= %s AND x <= %s AND y >= %s AND y <= %s
+AND bucket_start >= %s AND bucket_start <= %s
+{type_condition};
+"""
+
+UPSERT_GRID_AGGREGATE = """
+INSERT INTO grid_aggregates (zoom, x, y, type, bucket_start, readings, total, min_measurement, max_measurement)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) AS new
+ON DUPLICATE KEY UPDATE
+    readings = grid_aggregates.readings + new.readings,
+    total = grid_aggregates.total + new.total,
+    min_measurement = LEAST(grid_aggregates.min_measurement, new.min_measurement),
+    max_measurement = GREATEST(grid_aggregates.max_measurement, new.max_measurement);
+"""
+
+# DuckDB spells the same upsert with ON CONFLICT
+UPSERT_GRID_AGGREGATE_DUCKDB = """
+INSERT INTO grid_aggregates (zoom, x, y, type, bucket_start, readings, total, min_measurement, max_measurement)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON CONFLICT (zoom, x, y, type, bucket_start) DO UPDATE SET
+    readings = readings + excluded.readings,
+    total = total + excluded.total,
+    min_measurement = LEAST(min_measurement, excluded.min_measurement),
+    max_measurement = GREATEST(max_measurement, excluded.max_measurement);
+"""
+
+DELETE_GRID_CELL = """
+DELETE FROM grid_aggregates
+WHERE zoom = %s AND x = %s AND y = %s AND bucket_start >= %s AND bucket_start < %s;
+"""
+
+# A cell scheduled again before its rebuild ran is rebuilt up to the later date
+SCHEDULE_GRID_REBUILD = """
+INSERT INTO grid_rebuilds (zoom, x, y, rebuild_until)
+VALUES (%s, %s, %s, %s) AS new
+ON DUPLICATE KEY UPDATE rebuild_until = GREATEST(grid_rebuilds.rebuild_until, new.rebuild_until);
+"""
+
+# DuckDB spells the same upsert with ON CONFLICT
+SCHEDULE_GRID_REBUILD_DUCKDB = """
+INSERT INTO grid_rebuilds (zoom, x, y, rebuild_until)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (zoom, x, y) DO UPDATE SET rebuild_until = GREATEST(rebuild_until, excluded.rebuild_until);
+"""
+
+GET_GRID_REBUILDS = """
+SELECT zoom, x, y, rebuild_until FROM grid_rebuilds;
+"""
+
+# Keeps the row when the cell was scheduled again while it was being rebuilt
+DELETE_GRID_REBUILD = """
+DELETE FROM grid_rebuilds WHERE zoom = %s AND x = %s AND y = %s AND rebuild_until <= %s;
+"""
@@ -0,0 +1,39 @@
+GET_SKETCHES = """
+SELECT type, bucket_start, sketch FROM quantile_sketches
+WHERE station_code = %s AND bucket_start >= %s AND bucket_start <= %s
+{type_condition}
+ORDER BY type, bucket_start;
+"""
+
+GET_SKETCH = """
+SELECT sketch FROM quantile_sketches
+WHERE station_code = %s AND type = %s AND bucket_start = %s;
+"""
+
+GET_SKETCH_FOR_UPDATE = """
+SELECT sketch FROM quantile_sketches
+WHERE station_code = %s AND type = %s AND bucket_start = %s
+FOR UPDATE;
+"""
+
+INSERT_SKETCH = """
+INSERT INTO quantile_sketches (station_code, type, bucket_start, readings, sketch)
+VALUES (%s, %s, %s, %s, %s);
+"""
+
+UPDATE_SKETCH = """
+UPDATE quantile_sketches SET readings = readings + %s, sketch = %s
+WHERE station_code = %s AND type = %s AND bucket_start = %s;
+"""
+
+# Backfilled sketches replace the stored ones of their buckets
+REPLACE_SKETCH = """
+INSERT INTO quantile_sketches (station_code, type, bucket_start, readings, sketch)
+VALUES (%s, %s, %s, %s, %s) AS new
+ON DUPLICATE KEY UPDATE readings = new.readings, sketch = new.sketch;
+"""
+
+REPLACE_SKETCH_DUCKDB = """
+INSERT OR REPLACE INTO quantile_sketches (station_code, type, bucket_start, readings, sketch)
+VALUES (%s, %s, %s, %s, %s);
+"""
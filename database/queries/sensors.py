@@ -1,4 +1,11 @@
 CREATE_SENSOR_DATA = """
 INSERT INTO sensors_data (sensor_id, station_code, date, type, measurement, unit)
 VALUES (%s, %s, %s, %s, %s, %s)
-"""
\ No newline at end of file
+"""
+
+GET_FIRST_READING_DATES = """
+SELECT station_code, MIN(date) AS first_date
+FROM sensors_data
+WHERE station_code IN ({station_placeholders}) AND date >= %s
+GROUP BY station_code;
+"""
@@ -15,10 +15,21 @@ INSERT INTO stations (city, latitude, longitude, installation_date)
 VALUES (%s, %s, %s, %s);
 """
 
+UPDATE_STATION = """
+UPDATE stations SET {assignments} WHERE code = %s;
+"""
+
 DELETE_STATION = """
 DELETE FROM stations WHERE code = %s;
 """
 
+STATION_REFERENCES = """
+SELECT
+    EXISTS (SELECT 1 FROM sensors WHERE station_code = %s)
+    OR EXISTS (SELECT 1 FROM sensors_data WHERE station_code = %s)
+    OR EXISTS (SELECT 1 FROM forecast WHERE station_code = %s) AS referenced;
+"""
+
 GET_STATION_DATA = """
 SELECT * FROM sensors_data WHERE station_code = %s
 {filter_condition}
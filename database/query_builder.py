@@ -0,0 +1,93 @@
+"""
+Small typed builders for the queries whose shape depends on the request. Every filter, sort key
+and column comes from a whitelist, so request values only ever reach the database as parameters,
+and each combination of them (a query shape) renders its statement text once.
+"""
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+
+SORT_ORDERS = ("ASC", "DESC")
+
+
+class SelectQuery:
+    def __init__(self, template: str, filters: Dict[str, str], sort_keys: Iterable[str]):
+        """
+        A paginated SELECT. The template has {filter_condition}, {sort_column} and {sort_order}
+        slots and ends with LIMIT %s OFFSET %s; filters maps each allowed filter to its SQL
+        condition, in the order they are applied.
+        """
+        self.template = template
+        self.filters = filters
+        self.sort_keys = tuple(sort_keys)
+        self._statements = {}
+
+    def statement(self, filters: Tuple[str, ...], sort: str, sort_order: str = "ASC") -> str:
+        """The interned statement text of a shape"""
+        shape = (filters, sort, sort_order)
+        statement = self._statements.get(shape)
+        if statement is None:
+            if sort not in self.sort_keys:
+                raise HTTPException(status_code=400, detail="Invalid sort parameter.")
+            if sort_order not in SORT_ORDERS:
+                raise HTTPException(status_code=400, detail="Invalid sort order.")
+            unknown = [name for name in filters if name not in self.filters]
+            if unknown:
+                raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+            statement = sys.intern(self.template.format(
+                filter_condition=" ".join(self.filters[name] for name in filters),
+                sort_column=sort,
+                sort_order=sort_order,
+            ))
+            self._statements[shape] = statement
+        return statement
+
+    def build(self, leading: List[Any], values: Dict[str, Any], sort: str, sort_order: str, page: int, limit: int):
+        """
+        The statement and parameters for a page: the leading parameters of the template, the
+        values of the filters that are set, then the limit and offset.
+        """
+        params = list(leading)
+        filters = []
+        for name in self.filters:
+            value = values.get(name)
+            if value is not None:
+                filters.append(name)
+                params.append(value)
+        params.append(limit)
+        params.append((page - 1) * limit)
+        return self.statement(tuple(filters), sort, sort_order), params
+
+
+class UpdateQuery:
+    def __init__(self, template: str, columns: Iterable[str]):
+        """An UPDATE of a subset of whitelisted columns; the template has an {assignments} slot"""
+        self.template = template
+        self.columns = tuple(columns)
+        self._statements = {}
+
+    def statement(self, columns: Tuple[str, ...]) -> str:
+        statement = self._statements.get(columns)
+        if statement is None:
+            unknown = [column for column in columns if column not in self.columns]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Cannot update: {', '.join(unknown)}.")
+            if not columns:
+                raise HTTPException(status_code=400, detail="No fields to update.")
+            statement = sys.intern(self.template.format(
+                assignments=", ".join(f"{column} = %s" for column in columns)
+            ))
+            self._statements[columns] = statement
+        return statement
+
+    def build(self, values: Dict[str, Any], trailing: Optional[List[Any]] = None):
+        """
+        The statement and parameters setting the given columns, followed by the trailing
+        parameters of the template. Columns are always assigned in whitelist order, so the same
+        set of fields gives the same statement whatever order they came in.
+        """
+        columns = tuple(column for column in self.columns if column in values)
+        unknown = [column for column in values if column not in self.columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Cannot update: {', '.join(unknown)}.")
+        return self.statement(columns), [*(values[column] for column in columns), *(trailing or [])]
@@ -0,0 +1,16 @@
+-- Runs only on the replica container (see docker-compose.replica.yml)
+
+-- Account used by the application for read-only queries and lag checks
+GRANT SELECT ON meteo.* TO 'test_user'@'%';
+GRANT REPLICATION CLIENT ON *.* TO 'test_user'@'%';
+
+-- Follow the primary from the beginning of its GTID history, so the schema and data are replicated
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'mysql',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = 'TestProject123!',
+    SOURCE_AUTO_POSITION = 1,
+    GET_SOURCE_PUBLIC_KEY = 1;
+
+START REPLICA;
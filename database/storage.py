@@ -0,0 +1,30 @@
+import os
+from database.backends.base import StorageBackend
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mysql")
+
+_backend = None
+
+
+def get_backend() -> StorageBackend:
+    """
+    Return the storage backend selected by STORAGE_BACKEND: 'mysql' (default) or 'duckdb'.
+    """
+    global _backend
+    if _backend is None:
+        if STORAGE_BACKEND == "duckdb":
+            from database.backends.duckdb_backend import DuckDBBackend
+            _backend = DuckDBBackend()
+        elif STORAGE_BACKEND == "mysql":
+            from database.backends.mysql_backend import MySQLBackend
+            _backend = MySQLBackend()
+        else:
+            raise ValueError(f"Unknown storage backend '{STORAGE_BACKEND}'")
+    return _backend
+
+
+async def close_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
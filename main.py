@@ -1,10 +1,81 @@
-from fastapi import FastAPI
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 from routes.stations import router as stations_router
 from routes.sensors import router as sensors_router
+from routes.exports import router as exports_router
+from routes.metrics import router as metrics_router
+from routes.grid import router as grid_router
+from middleware.compression import CompressionMiddleware
+import database.database as database
+from database.storage import get_backend, close_backend
+import services.catalog as catalog
+from services.gaps import gap_monitor
+from services.exports import srv_start_export_workers, srv_drain_exports, export_sweeper
+from services.quantiles import sketch_flusher, srv_flush_sketches
+from services.grid import grid_flusher, grid_rebuilder, srv_flush_grid
+from utils.leader import release_leadership
 
-app = FastAPI()
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "30"))
+
+
+async def warm_up(app: FastAPI):
+    """Open the database connections and load the station catalog, then report ready"""
+    # Building the OpenAPI schema also builds the validators of every route's models
+    app.openapi()
+    await get_backend().warm_up()
+    await catalog.get_station_catalog()
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Do the one-off work before the first request instead of during it
+    app.state.ready = False
+    try:
+        await warm_up(app)
+    except Exception as e:
+        print(f"Warm-up failed, /ready will retry it: {e}")
+    await srv_start_export_workers()
+    # Check the replicas, track sensor outages, expire old exports, write the percentile
+    # sketches and grid aggregates and rebuild the cells of relocated stations in the background
+    background = [
+        asyncio.create_task(database.replica_monitor()),
+        asyncio.create_task(gap_monitor()),
+        asyncio.create_task(export_sweeper()),
+        asyncio.create_task(sketch_flusher()),
+        asyncio.create_task(grid_flusher()),
+        asyncio.create_task(grid_rebuilder()),
+    ]
+
+    yield
+
+    # The server has stopped accepting connections and finished the in-flight requests:
+    # let the export jobs finish and write the buffered sketches and aggregates, then release the database
+    app.state.ready = False
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await srv_drain_exports(SHUTDOWN_DRAIN_SECONDS)
+    for flush in [srv_flush_sketches, srv_flush_grid]:
+        try:
+            await flush()
+        except Exception as e:
+            print(f"Flush failed at shutdown: {e}")
+    release_leadership()
+    await close_backend()
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    title="Meteorological App",
+    description="This is a Meteorological Application API that provides various endpoints for managing stations and sensor data.",
+    version="1.0.0"
+)
 
 # Allow CORS (Cross-Origin Resource Sharing)
 app.add_middleware(
@@ -15,14 +86,40 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-app = FastAPI(
-    title="Meteorological App",
-    description="This is a Meteorological Application API that provides various endpoints for managing stations and sensor data.",
-    version="1.0.0"
-)
+# Compress JSON responses with gzip, brotli or zstd depending on the client's Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
+
+@app.middleware("http")
+async def bind_database_client(request: Request, call_next):
+    """Tag database work with the calling client so its reads can follow its own writes"""
+    client = request.headers.get("X-Client-Id") or (request.client.host if request.client else None)
+    token = database.current_client.set(client)
+    try:
+        return await call_next(request)
+    finally:
+        database.current_client.reset(token)
+
+
+@app.get("/ready", tags=["health"], summary="Readiness probe")
+async def ready(request: Request):
+    """
+    Return 200 once the database is reachable and the caches are loaded, 503 until then.
+    A failed warm-up at startup is retried on each probe.
+    """
+    if not request.app.state.ready:
+        try:
+            await warm_up(request.app)
+        except Exception as e:
+            return JSONResponse(status_code=503, content={"status": "starting", "detail": str(e)})
+    return {"status": "ready"}
+
 
 app.include_router(stations_router, tags=["stations"])
 app.include_router(sensors_router, tags=["sensors"])
+app.include_router(exports_router, tags=["exports"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(grid_router, tags=["grid"])
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,205 @@
+# middleware/compression.py
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_LEVELS = {
+    "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    "br": int(os.getenv("COMPRESSION_BROTLI_LEVEL", "4")),
+    "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
+}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml", "application/javascript")
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level: int):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+# Encodings in order of server preference, limited to the codecs that are installed
+COMPRESSORS = {}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+COMPRESSORS["gzip"] = GzipCompressor
+
+
+def negotiate_encoding(accept_encoding: str):
+    """
+    Pick the content encoding for an Accept-Encoding header, honouring q-values.
+    Ties are broken by server preference (zstd, then brotli, then gzip). Returns None for identity.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in COMPRESSORS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE, levels: dict = None):
+        """
+        Compress responses with the best encoding the client accepts.
+        Bodies below the minimum size are sent as is; streamed bodies are compressed chunk by chunk.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {**COMPRESSION_LEVELS, **(levels or {})}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.levels[encoding], self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send, encoding: str, level: int, minimum_size: int):
+        self.downstream = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+        self.pending = []
+        self.pending_size = 0
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            self.passthrough = (
+                message["status"] in (204, 304)
+                or b"content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            # Hold back the start of the body until we know whether it is worth compressing
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if more_body and self.pending_size < self.minimum_size:
+                return
+            body = b"".join(self.pending)
+            self.pending = []
+
+            if not more_body and len(body) < self.minimum_size:
+                await self.downstream(self._start(compressed=False))
+                await self.downstream({"type": "http.response.body", "body": body})
+                return
+
+            self.compressor = COMPRESSORS[self.encoding](self.level)
+            if not more_body:
+                # Whole body in hand: compress it at once and send an exact Content-Length
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                await self.downstream(self._start(compressed=True, content_length=len(compressed)))
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+            await self.downstream(self._start(compressed=True))
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _start(self, compressed: bool, content_length: int = None):
+        """Rewrite the response headers for the chosen encoding"""
+        headers = [
+            (name, value) for name, value in self.start_message.get("headers", [])
+            if name.lower() != b"vary" or b"accept-encoding" not in value.lower()
+        ]
+        headers.append((b"vary", b"Accept-Encoding"))
+        if compressed:
+            rewritten = []
+            for name, value in headers:
+                if name.lower() == b"content-length":
+                    continue
+                if name.lower() == b"etag" and not value.startswith(b"W/"):
+                    value = b"W/" + value  # The compressed body is no longer byte-identical
+                rewritten.append((name, value))
+            headers = rewritten
+            headers.append((b"content-encoding", self.encoding.encode()))
+            if content_length is not None:
+                headers.append((b"content-length", str(content_length).encode()))
+        return {**self.start_message, "headers": headers}
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+
+
+class ExportRequest(BaseModel):
+    station_codes: List[int] = Field(..., min_length=1, description="Codes of the stations to export.")
+    types: Optional[List[str]] = Field(default=None, description="Measurement types to export. All types when omitted.")
+    date_from: str = Field(..., description="Start of the export period (YYYY-MM-DD or ISO 8601).")
+    date_to: str = Field(..., description="End of the export period (YYYY-MM-DD or ISO 8601).")
+    format: str = Field(default="csv", description="Output format. Allowed values are 'csv' and 'parquet'.")
+
+
+class ExportJob(BaseModel):
+    id: str
+    status: str  # 'queued', 'running', 'completed', 'failed'
+    format: str
+    rows_written: int = 0
+    total_rows: Optional[int] = None
+    progress: float = 0.0
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    error: Optional[str] = None
+    download_url: Optional[str] = None
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional, List
+
+
+class GridQueryParams(BaseModel):
+    min_latitude: float = Field(..., ge=-90, le=90, description="South edge of the bounding box.")
+    min_longitude: float = Field(..., ge=-180, le=180, description="West edge of the bounding box.")
+    max_latitude: float = Field(..., ge=-90, le=90, description="North edge of the bounding box.")
+    max_longitude: float = Field(..., ge=-180, le=180, description="East edge of the bounding box.")
+    date_from: Optional[datetime] = Field(default=None, description="Start of the time window (default is 24 hours before date_to).")
+    date_to: Optional[datetime] = Field(default=None, description="End of the time window (default is now).")
+    type: Optional[str] = Field(default=None, description="Only this measurement type: 'temperature', 'humidity' or 'wind'.")
+
+
+class GridAggregate(BaseModel):
+    type: str
+    readings: int
+    mean: float
+    min: float
+    max: float
+    current: float  # Mean of the most recent bucket with readings
+    current_bucket: datetime
+
+
+class GridCell(BaseModel):
+    zoom: int
+    x: int
+    y: int
+    south: float
+    west: float
+    north: float
+    east: float
+    stations: int
+    aggregates: List[GridAggregate]
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional, List, Dict
 
 
 class SensorReadingModel(BaseModel):
@@ -9,3 +10,62 @@ class SensorReadingModel(BaseModel):
     type: str
     measurement: float
     unit: str
+
+
+class GapQueryParams(BaseModel):
+    date_from: datetime = Field(..., description="Start of the period to check.")
+    date_to: Optional[datetime] = Field(default=None, description="End of the period to check (default is now).")
+    interval_seconds: int = Field(default=60, ge=1, description="Expected reporting interval of the sensors, in seconds.")
+    tolerance: float = Field(default=1.5, ge=1, description="A gap is reported when readings are more than tolerance x interval apart.")
+
+
+class SensorGap(BaseModel):
+    start: datetime
+    end: Optional[datetime] = None  # None while the sensor is still silent
+    missing_readings: int
+
+
+class SensorGapReport(BaseModel):
+    sensor_id: str
+    station_code: int
+    type: str
+    readings: int
+    first_reading: Optional[datetime] = None
+    last_reading: Optional[datetime] = None
+    uptime_percent: float
+    gaps: List[SensorGap]
+
+
+class SensorOutage(BaseModel):
+    sensor_id: str
+    station_code: int
+    type: str
+    status: str  # 'online' or 'offline'
+    last_seen: Optional[datetime] = None
+    monitored_since: datetime
+    uptime_percent: float
+    gaps: List[SensorGap]
+
+
+class SensorAnomaly(BaseModel):
+    date: datetime
+    measurement: float
+    flags: List[str]  # 'spike', 'stuck' or 'out_of_range'
+
+
+class SensorRollingStats(BaseModel):
+    sensor_id: str
+    station_code: int
+    type: str
+    count: int
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    ewma: Optional[float] = None
+    window_size: int
+    window_mean: Optional[float] = None
+    window_min: Optional[float] = None
+    window_max: Optional[float] = None
+    last_value: Optional[float] = None
+    last_date: Optional[datetime] = None
+    flag_counts: Dict[str, int]
+    recent_anomalies: List[SensorAnomaly]
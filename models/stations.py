@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
-from typing import List
+from typing import List, Dict
 
 
 class Measurement(BaseModel):
@@ -53,6 +53,26 @@ class StationDataRequest(BaseModel):
     forecast: Optional[bool] = False
     summary: Optional[bool] = False
 
+class PercentileQueryParams(BaseModel):
+    date_from: datetime = Field(..., description="Start of the period.")
+    date_to: Optional[datetime] = Field(default=None, description="End of the period (default is now).")
+    type: Optional[str] = Field(default=None, description="Only this measurement type: 'temperature', 'humidity' or 'wind'.")
+    percentiles: str = Field(default="5,50,95,99", description="Comma separated percentiles between 0 and 100.")
+
+
+class StationPercentiles(BaseModel):
+    type: str
+    readings: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    percentiles: Dict[str, Optional[float]]  # e.g. {"p5": 12.4, "p50": 18.1}
+    rank_error: float  # Normalized rank error of each percentile, at 99% confidence
+    window_start: datetime  # The period rounded out to whole buckets
+    window_end: datetime
+    covered_from: Optional[datetime] = None  # Start of the period the sketches hold every reading of
+    complete: bool = False  # Whether the window lies within that period
+
+
 class SensorData(BaseModel):
     sensor_id: str
     date: datetime
@@ -0,0 +1,129 @@
+from fastapi import APIRouter
+from fastapi.responses import FileResponse
+from services.exports import srv_create_export, srv_get_export, srv_get_export_artifact
+from models.exports import ExportRequest, ExportJob
+
+
+router = APIRouter(prefix="/api/exports")
+
+
+@router.post(
+    "/",
+    status_code=202,
+    response_model=ExportJob,
+    summary="Create an export job",
+    description="Enqueue an extract of sensor data for one or more stations, types and a date range.",
+    response_description="Export job queued.",
+    responses={
+        202: {
+            "description": "Export job queued",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "id": "3f0c2b6e9d6a4f1e8f3a1c2b4d5e6f70",
+                        "status": "queued",
+                        "format": "csv",
+                        "rows_written": 0,
+                        "total_rows": None,
+                        "progress": 0.0,
+                        "created_at": "2024-10-15T10:00:00"
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "Invalid input data",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Invalid export format."
+                    }
+                }
+            }
+        },
+        429: {
+            "description": "Too many export jobs queued",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Too many export jobs queued, please retry later."
+                    }
+                }
+            }
+        }
+    }
+)
+async def create_export(body: ExportRequest):
+    """
+    Enqueue an export job. The extract runs in the background; poll the job for its progress.
+
+    The request body should be structured as follows:
+    {
+        "station_codes": [<int>, ...],
+        "types": [<str>, ...],  // Optional, any of "temperature", "humidity", "wind"
+        "date_from": <str>,
+        "date_to": <str>,
+        "format": <str>  // "csv" (gzip compressed) or "parquet"
+    }
+    """
+    return await srv_create_export(body)
+
+
+@router.get(
+    "/{job_id}",
+    response_model=ExportJob,
+    summary="Get export job status",
+    description="Get the status and progress of an export job.",
+    responses={
+        404: {
+            "description": "Export job not found",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Export job not found."
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_export(job_id: str):
+    """
+    Get the status, progress and download link of an export job.
+    """
+    return await srv_get_export(job_id)
+
+
+@router.get(
+    "/{job_id}/download",
+    summary="Download an export",
+    description="Download the file produced by a completed export job.",
+    responses={
+        409: {
+            "description": "Export job not completed",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Export job is running."
+                    }
+                }
+            }
+        },
+        410: {
+            "description": "Export artifact expired",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Export artifact has expired."
+                    }
+                }
+            }
+        }
+    }
+)
+async def download_export(job_id: str):
+    """
+    Download the compressed export file.
+    """
+    path, filename, media_type = await srv_get_export_artifact(job_id)
+    return FileResponse(path, media_type=media_type, filename=filename)
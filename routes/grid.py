@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends
+from typing import List
+from services.grid import srv_get_grid
+from models.grid import GridQueryParams, GridCell
+
+
+router = APIRouter(prefix="/api/grid")
+
+
+@router.get(
+    "/{zoom}",
+    response_model=List[GridCell],
+    summary="Get map grid aggregates",
+    description="Get the measurement aggregates of every map cell of a zoom level in a bounding box, over a time window.",
+    responses={
+        200: {
+            "description": "Grid cells retrieved successfully",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {
+                            "zoom": 6,
+                            "x": 33,
+                            "y": 22,
+                            "south": 45.089036,
+                            "west": 5.625,
+                            "north": 48.922499,
+                            "east": 11.25,
+                            "stations": 4,
+                            "aggregates": [
+                                {
+                                    "type": "temperature",
+                                    "readings": 5760,
+                                    "mean": 21.4,
+                                    "min": 12.1,
+                                    "max": 30.8,
+                                    "current": 24.9,
+                                    "current_bucket": "2024-10-15T14:00:00"
+                                }
+                            ]
+                        }
+                    ]
+                }
+            }
+        },
+        400: {
+            "description": "Invalid input data",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Invalid zoom. Allowed values are: 4, 6, 8, 10."
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_grid(zoom: int, params: GridQueryParams = Depends()):
+    """
+    Get the aggregates of the map cells overlapping a bounding box, in one call.
+
+    Cells are Web Mercator tiles (the `z/x/y` scheme of slippy maps) at the zoom levels of
+    `GRID_ZOOM_LEVELS` (default 4, 6, 8 and 10). Each station belongs to one cell per zoom level
+    according to its latitude and longitude.
+
+    - `min_latitude`, `min_longitude`, `max_latitude`, `max_longitude`: The bounding box.
+    - `date_from`, `date_to`: The time window (default is the last 24 hours), rounded out to whole
+      `GRID_BUCKET_SECONDS` buckets (default one hour).
+    - `type`: Only this measurement type.
+
+    For each type, `mean`, `min` and `max` cover the window and `current` is the mean of the
+    latest bucket with readings. The aggregates are updated as readings are ingested, so no
+    readings are scanned to answer.
+    """
+    return await srv_get_grid(zoom, params)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+import database.admission as admission
+
+
+router = APIRouter(prefix="/api/metrics")
+
+
+@router.get(
+    "/admission",
+    summary="Get admission control metrics",
+    description="Get the concurrency, queue depth and rejection counters of each database workload.",
+    responses={
+        200: {
+            "description": "Admission metrics retrieved successfully",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "read": {
+                            "concurrency": 4,
+                            "in_flight": 2,
+                            "queue_depth": 0,
+                            "max_queue": 50,
+                            "admitted": 1520,
+                            "rejected": 0,
+                            "timed_out": 0,
+                            "avg_service_time_ms": 3.4
+                        }
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_admission_metrics():
+    """
+    Get admission control metrics for the `ingest`, `read` and `bulk` workloads.
+    """
+    return admission.metrics()
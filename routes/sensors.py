@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from models.sensors import SensorReadingModel
+from models.sensors import SensorReadingModel, SensorOutage, SensorRollingStats
 from services.sensors import srv_create_sensor_reading
+from services.gaps import srv_get_outages
+from services.rolling_stats import srv_get_rolling_stats
+from typing import List, Optional
 
 router = APIRouter(prefix="/api")
 
@@ -55,5 +58,65 @@ async def create_sensor_reading(body: SensorReadingModel):
     """
     try:
         return await srv_create_sensor_reading(body)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get(
+    "/sensor/outages",
+    response_model=List[SensorOutage],
+    summary="Get sensor outages",
+    description="Status, recent gaps and uptime of every sensor, as tracked by the background gap monitor.",
+    responses={
+        503: {
+            "description": "The gap monitor has not completed its first scan yet",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "The gap monitor has not completed its first scan yet."
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_sensor_outages(station_code: Optional[int] = None, offline_only: bool = False):
+    """
+    Get the outages of the sensors, optionally for one station.
+
+    - `station_code`: Only report the sensors of this station.
+    - `offline_only`: Only report the sensors that are currently silent.
+
+    The gap monitor scans the new readings every `GAP_MONITOR_INTERVAL_SECONDS`, so the report is
+    served from memory and is at most one scan interval old. A silent sensor's open gap has no `end`.
+    """
+    return await srv_get_outages(station_code, offline_only)
+
+
+@router.get(
+    "/sensor/stats",
+    response_model=List[SensorRollingStats],
+    summary="Get rolling sensor statistics",
+    description="Moving averages and anomaly flags of each sensor, maintained as readings are ingested.",
+)
+async def get_sensor_stats(
+    station_code: Optional[int] = None,
+    sensor_id: Optional[str] = None,
+    type: Optional[str] = None,
+    flagged_only: bool = False,
+):
+    """
+    Get the rolling statistics of the sensors, optionally filtered by station, sensor and type.
+
+    - `count`, `mean`, `std`: Over every reading received since the service started.
+    - `ewma`: Exponentially weighted moving average (weight `ROLLING_EWMA_ALPHA`).
+    - `window_mean`, `window_min`, `window_max`: Over the last `ROLLING_WINDOW` readings.
+    - `flag_counts` and `recent_anomalies`: Readings flagged as a `spike` (far from the moving
+      average), `stuck` (the same value repeated) or `out_of_range` (physically implausible).
+    - `flagged_only`: Only report the sensors with recent anomalies.
+
+    The statistics are kept in memory by the ingest endpoints, so no history is read from the database.
+    """
+    return await srv_get_rolling_stats(station_code, sensor_id, type, flagged_only)
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Body
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Body, Request, Response
 from services.stations import srv_create_station_forecast, srv_get_stations, srv_create_station, srv_update_station, srv_delete_station, srv_get_station_data, srv_insert_batch_data
-from models.stations import StationForecast, StationQueryParams, Station, StationUpdate, StationDataRequest, BatchData
+from models.stations import StationForecast, StationQueryParams, Station, StationUpdate, StationDataRequest, BatchData, PercentileQueryParams, StationPercentiles
+from models.sensors import GapQueryParams, SensorGapReport
+from services.gaps import srv_get_station_gaps
+from services.quantiles import srv_get_station_percentiles
+from typing import List
+import utils.watermarks as watermarks
+from datetime import date
 
 
 router = APIRouter(prefix="/api/stations")
@@ -73,6 +79,8 @@ async def create_station_forecast(body: StationForecast):
     """
     try:
         return await srv_create_station_forecast(body)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -105,6 +113,9 @@ async def create_station_forecast(body: StationForecast):
                 }
             }
         },
+        304: {
+            "description": "The station catalog has not changed since the client's cached copy"
+        },
         400: {
             "description": "Invalid input data",
             "content": {
@@ -117,7 +128,7 @@ async def create_station_forecast(body: StationForecast):
         }
     }
 )
-async def get_stations(params: StationQueryParams = Depends()):
+async def get_stations(request: Request, response: Response, params: StationQueryParams = Depends()):
     """
     Get all stations with pagination and sorting or the station for a specific city.
 
@@ -129,10 +140,22 @@ async def get_stations(params: StationQueryParams = Depends()):
       - `offset`: The number of records to skip before starting to collect the result set.
       - `sort`: The field to sort by (e.g., 'name', 'city').
       - `sort_order`: The order of sorting ('ASC' for ascending, 'DESC' for descending).
+
+    Responses carry an `ETag` and `Last-Modified` header; send them back as `If-None-Match` or
+    `If-Modified-Since` to get a `304 Not Modified` while the catalog is unchanged.
     """
+    watermark = watermarks.catalog_watermark()
+    etag = watermarks.build_etag("catalog", watermark, str(request.url.query))
+    not_modified = watermarks.check_not_modified(request, etag, watermark)
+    if not_modified:
+        return not_modified
+
     try:
         stations = await srv_get_stations(city=params.city, page=params.page, limit=params.limit, sort=params.sort, sort_order=params.sort_order)
+        watermarks.set_validators(response, etag, watermark)
         return stations
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -308,10 +331,60 @@ async def get_station_data(station_code: int,
     )):
     """
     Retrieve meteorological data for a specific station based on filters and pagination.
+
+    Conditional requests are not supported on this POST form: use `GET /api/stations/{station_code}/data`
+    with the same fields as query parameters to revalidate a cached copy.
     """
+    try:
+        return await srv_get_station_data(station_code, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get(
+    "/{station_code}/data",
+    summary="Get station data (cacheable)",
+    description="Get the meteorological data for a specific station, with the filters and pagination as query parameters.",
+    responses={
+        304: {
+            "description": "The station's data has not changed since the client's cached copy"
+        },
+        400: {
+            "description": "Invalid input data",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Invalid input data format"
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_station_data_cacheable(station_code: int, http_request: Request, response: Response, request: StationDataRequest = Depends()):
+    """
+    Same data as `POST /api/stations/{station_code}`, as a GET so that it can be revalidated.
+
+    Responses carry an `ETag` and `Last-Modified` header; send them back as `If-None-Match` or
+    `If-Modified-Since` with the same query to get a `304 Not Modified` while no new data or
+    forecasts were written for the station.
+    """
+    watermark = watermarks.station_data_watermark(station_code)
+    # Forecasts are for the next day, so the tag must also change with the date
+    variant = request.model_dump_json() + (date.today().isoformat() if request.forecast else "")
+    etag = watermarks.build_etag(f"station-{station_code}", watermark, variant)
+    not_modified = watermarks.check_not_modified(http_request, etag, watermark)
+    if not_modified:
+        return not_modified
+
     try:
         stations = await srv_get_station_data(station_code, request)
+        watermarks.set_validators(response, etag, watermark)
         return stations
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -374,4 +447,110 @@ async def receive_batch_data(station_code: int, batch_data: BatchData):
     if batch_data.station_code != station_code:
         raise HTTPException(status_code=400, detail="Station code mismatch.")
 
-    return await srv_insert_batch_data(batch_data)
\ No newline at end of file
+    return await srv_insert_batch_data(batch_data)
+
+
+@router.get(
+    "/{station_code}/gaps",
+    response_model=List[SensorGapReport],
+    summary="Find missing sensor data",
+    description="List the periods in which each sensor of a station sent no readings, with its uptime.",
+    responses={
+        200: {
+            "description": "Gaps retrieved successfully",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {
+                            "sensor_id": "S1-T",
+                            "station_code": 1,
+                            "type": "temperature",
+                            "readings": 1380,
+                            "first_reading": "2024-10-15T00:00:00",
+                            "last_reading": "2024-10-15T23:59:00",
+                            "uptime_percent": 95.83,
+                            "gaps": [
+                                {"start": "2024-10-15T10:00:00", "end": "2024-10-15T11:01:00", "missing_readings": 60}
+                            ]
+                        }
+                    ]
+                }
+            }
+        },
+        400: {
+            "description": "Invalid input data",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "date_to must be after date_from."
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_station_gaps(station_code: int, params: GapQueryParams = Depends()):
+    """
+    Find the gaps in the data of each sensor of a station between `date_from` and `date_to`.
+
+    - `interval_seconds`: How often the sensors are expected to report (default 60).
+    - `tolerance`: Readings further apart than `tolerance x interval_seconds` count as a gap (default 1.5).
+
+    The gaps are found by the database, comparing each reading with the previous one of the same
+    sensor, so only the gap ranges are returned rather than the readings themselves. Periods without
+    readings at the start or end of the range are reported as gaps too.
+    """
+    return await srv_get_station_gaps(station_code, params)
+
+
+@router.get(
+    "/{station_code}/percentiles",
+    response_model=List[StationPercentiles],
+    summary="Get measurement percentiles",
+    description="Estimate percentiles of a station's measurements per type over a period, from quantile sketches.",
+    responses={
+        200: {
+            "description": "Percentiles estimated successfully",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {
+                            "type": "temperature",
+                            "readings": 10080,
+                            "min": 8.4,
+                            "max": 31.2,
+                            "percentiles": {"p5": 11.3, "p50": 19.8, "p95": 28.1, "p99": 30.4},
+                            "rank_error": 0.0133,
+                            "window_start": "2024-10-01T00:00:00",
+                            "window_end": "2024-10-08T00:00:00",
+                            "covered_from": "2024-09-01T00:00:00",
+                            "complete": True
+                        }
+                    ]
+                }
+            }
+        },
+        400: {
+            "description": "Invalid input data",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "detail": "Percentiles must be between 0 and 100."
+                    }
+                }
+            }
+        }
+    }
+)
+async def get_station_percentiles(station_code: int, params: PercentileQueryParams = Depends()):
+    """
+    Estimate percentiles (default p5, p50, p95 and p99) of each measurement type of a station
+    between `date_from` and `date_to`.
+
+    Every ingested reading is added to a KLL quantile sketch of its station, type and hour
+    (`QUANTILE_BUCKET_SECONDS`), and the sketches covering the period are merged to answer.
+    The period is rounded out to whole buckets, as reported in `window_start` and `window_end`.
+    `min` and `max` are exact. A percentile is within `rank_error` of the true rank with 99%
+    confidence: with the default 1.33%, the reported p95 lies between the true p93.67 and p96.33.
+    """
+    return await srv_get_station_percentiles(station_code, params)
@@ -0,0 +1,62 @@
+"""
+Production entry point. Runs the API without auto-reload, with uvloop and httptools when they
+are installed:
+
+    python server.py [--host 0.0.0.0] [--port 8000] [--workers 4]
+
+It runs one worker per CPU core unless --workers or WEB_CONCURRENCY sets the number, and a
+single one with the DuckDB backend. The workers share the cache watermarks, export records and
+gap monitor report through files on the host and the percentile sketches and grid aggregates
+through the database. The gap monitor, the export sweep and the grid cell rebuilds run in the
+one worker holding the leader lock (utils/leader.py). The rolling statistics stay in each
+worker's memory: they are updated on every reading in the ingest path, so each worker flags
+anomalies from the readings it received itself.
+
+Each worker opens its database pools and loads the station catalog before it accepts traffic,
+and reports it on /ready. On SIGTERM the workers stop accepting connections, give in-flight
+requests up to SHUTDOWN_TIMEOUT_SECONDS to complete and then drain their background work.
+"""
+import os
+import argparse
+import importlib.util
+import uvicorn
+
+SHUTDOWN_TIMEOUT_SECONDS = int(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "30"))
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY when set, otherwise one worker per CPU core (see the module docstring)"""
+    if os.getenv("STORAGE_BACKEND") == "duckdb":
+        return 1
+    return int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args()
+    if os.getenv("STORAGE_BACKEND") == "duckdb" and args.workers > 1:
+        parser.error("a DuckDB file can only be opened by one process, run a single worker")
+    if args.workers > 1:
+        print(f"Running {args.workers} workers: the rolling statistics are kept per worker process")
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        timeout_graceful_shutdown=SHUTDOWN_TIMEOUT_SECONDS,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import time
+import asyncio
+from typing import List, Optional
+from database.storage import get_backend
+import utils.watermarks as watermarks
+
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "1000"))
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "1"))
+
+# Every station, ordered by code and indexed by code, with the catalog watermark it was loaded at
+_catalog = {"watermark": None, "stations": [], "by_code": {}}
+_lock = asyncio.Lock()
+
+# The background reload started by lookup_station, and when it started
+_refresh = {"task": None, "started": 0.0}
+
+
+async def _load_stations() -> List[dict]:
+    backend = get_backend()
+    stations = []
+    page = 1
+    while True:
+        rows = await backend.get_stations(None, page, CATALOG_PAGE_SIZE, "code", "ASC")
+        stations.extend(rows)
+        if len(rows) < CATALOG_PAGE_SIZE:
+            return stations
+        page += 1
+
+
+async def get_station_catalog() -> List[dict]:
+    """
+    Return every station from memory, reloading them when the shared catalog watermark shows that
+    any worker has changed the catalog. A catalog loaded while a change may not have reached the
+    replicas yet is returned but not kept.
+    """
+    watermark = watermarks.catalog_watermark()
+    if _catalog["watermark"] == watermark:
+        return _catalog["stations"]
+
+    async with _lock:
+        if _catalog["watermark"] == watermark:
+            return _catalog["stations"]
+        stations = await _load_stations()
+        if watermarks.is_settled(watermark):
+            _catalog["watermark"] = watermark
+            _catalog["stations"] = stations
+            _catalog["by_code"] = {station["code"]: station for station in stations}
+        return stations
+
+
+async def get_station(code: int) -> Optional[dict]:
+    """Return one station of the catalog, None when it does not exist"""
+    stations = await get_station_catalog()
+    if stations is _catalog["stations"]:
+        return _catalog["by_code"].get(code)
+    return next((station for station in stations if station["code"] == code), None)
+
+
+def _refresh_in_background() -> asyncio.Task:
+    """
+    The reload of a stale catalog, started in the background at most once per
+    CATALOG_REFRESH_SECONDS. While a change settles the reload is not kept, so without the limit
+    every lookup would start another one.
+    """
+    task = _refresh["task"]
+    if task is None or (task.done() and time.monotonic() - _refresh["started"] >= CATALOG_REFRESH_SECONDS):
+        task = _refresh["task"] = asyncio.create_task(get_station_catalog())
+        task.add_done_callback(_report_refresh)
+        _refresh["started"] = time.monotonic()
+    return task
+
+
+def _report_refresh(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Station catalog refresh failed: {task.exception()}")
+
+
+async def lookup_station(code: int) -> Optional[dict]:
+    """
+    Return one station for the ingest path without waiting for a reload: a stale catalog is
+    answered from the last kept one while a reload runs in the background. Only a station the
+    kept catalog does not have yet, such as a new one, waits for that reload.
+    """
+    if _catalog["watermark"] is None:
+        return await get_station(code)
+    if _catalog["watermark"] == watermarks.catalog_watermark():
+        return _catalog["by_code"].get(code)
+
+    refresh = _refresh_in_background()
+    station = _catalog["by_code"].get(code)
+    if station is not None:
+        return station
+    stations = await asyncio.shield(refresh)
+    return next((station for station in stations if station["code"] == code), None)
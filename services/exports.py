@@ -0,0 +1,329 @@
+import os
+import re
+import csv
+import gzip
+import json
+import time
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from database.storage import get_backend
+from models.exports import ExportRequest, ExportJob
+from fastapi import HTTPException
+from utils.leader import is_leader
+import utils.exports as utils
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_MAX_QUEUED = int(os.getenv("EXPORT_MAX_QUEUED", "20"))
+EXPORT_TTL_SECONDS = int(os.getenv("EXPORT_TTL_SECONDS", "86400"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_SWEEP_SECONDS = int(os.getenv("EXPORT_SWEEP_SECONDS", "600"))
+EXPORT_HEARTBEAT_SECONDS = float(os.getenv("EXPORT_HEARTBEAT_SECONDS", "10"))
+# Least time between two progress updates of a running job's record
+EXPORT_PROGRESS_SECONDS = 1.0
+
+EXPORT_COLUMNS = ["sensor_id", "station_code", "date", "type", "measurement", "unit"]
+
+# Each job has a record, {id}.json next to its artifact in EXPORT_DIR, so every worker process
+# can answer for any job and the jobs outlive a restart. This process keeps the jobs it has
+# queued or is running, with their requests, and refreshes their records as a heartbeat.
+_jobs = {}
+_queue = None
+_workers = []
+
+
+class _CsvWriter:
+    extension = "csv.gz"
+    media_type = "application/gzip"
+
+    def __init__(self, path: str):
+        self.file = gzip.open(path, "wt", newline="", compresslevel=6)
+        self.writer = csv.DictWriter(self.file, fieldnames=EXPORT_COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    extension = "parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("sensor_id", pa.string()),
+            ("station_code", pa.int32()),
+            ("date", pa.timestamp("s")),
+            ("type", pa.string()),
+            ("measurement", pa.float64()),
+            ("unit", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        columns = {column: [row[column] for row in rows] for column in EXPORT_COLUMNS}
+        columns["measurement"] = [float(value) for value in columns["measurement"]]
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter}
+
+
+def _artifact_path(job: ExportJob) -> str:
+    return os.path.join(EXPORT_DIR, f"{job.id}.{_WRITERS[job.format].extension}")
+
+
+def _record_path(job_id: str) -> str:
+    return os.path.join(EXPORT_DIR, f"{job_id}.json")
+
+
+def _write_record(job: ExportJob, request: dict):
+    """Replace a job's record in one step, so readers never see a partial one"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = _record_path(job.id)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump({"job": job.model_dump(mode="json"), "request": request}, f)
+    os.replace(temporary, path)
+
+
+def _finish(job: ExportJob, status: str, error: Optional[str] = None):
+    job.status = status
+    job.error = error
+    job.finished_at = datetime.now()
+    job.expires_at = job.finished_at + timedelta(seconds=EXPORT_TTL_SECONDS)
+
+
+def _load_record(job_id: str):
+    """
+    The job and request of a record, None when there is none. A queued or running job whose
+    record the owning worker stopped refreshing is failed: that worker is gone.
+    """
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id):
+        return None
+    path = _record_path(job_id)
+    try:
+        with open(path) as f:
+            record = json.load(f)
+        refreshed_at = os.stat(path).st_mtime
+    except (FileNotFoundError, ValueError):
+        return None
+    job = ExportJob.model_validate(record["job"])
+    if job.status in ("queued", "running") and job.id not in _jobs and time.time() - refreshed_at > 3 * EXPORT_HEARTBEAT_SECONDS:
+        _finish(job, "failed", "The export was interrupted: the worker running it stopped.")
+        _remove(_artifact_path(job))
+        _write_record(job, record["request"])
+    return job, record["request"]
+
+
+def _ensure_workers():
+    """Start the worker pool on first use, inside the running event loop"""
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=EXPORT_MAX_QUEUED)
+    if not _workers:
+        for _ in range(EXPORT_WORKERS):
+            _workers.append(asyncio.create_task(_worker()))
+        _workers.append(asyncio.create_task(_heartbeat()))
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run_export(*_jobs[job_id])
+        except Exception as e:
+            print(f"Export job {job_id} failed: {e}")
+        finally:
+            _queue.task_done()
+        # A job cancelled by a shutdown stays, to be failed by srv_drain_exports
+        _jobs.pop(job_id, None)
+
+
+async def _heartbeat():
+    """Refresh the records of this worker's jobs, showing the other workers that they are alive"""
+    while True:
+        await asyncio.sleep(EXPORT_HEARTBEAT_SECONDS)
+        for job_id in list(_jobs):
+            try:
+                os.utime(_record_path(job_id))
+            except FileNotFoundError:
+                pass
+
+
+async def _run_export(job: ExportJob, request: ExportRequest):
+    """
+    Stream the requested rows through a server-side cursor into a compressed file on disk.
+    """
+    job.status = "running"
+    record = request.model_dump(mode="json")
+    await asyncio.to_thread(_write_record, job, record)
+    path = _artifact_path(job)
+    writer = None
+
+    try:
+        backend = get_backend()
+        job.total_rows = await backend.count_readings(request)
+        writer = await asyncio.to_thread(_WRITERS[job.format], path)
+        saved_at = time.monotonic()
+        async for rows in backend.stream_readings(request, batch_size=EXPORT_BATCH_SIZE):
+            await asyncio.to_thread(writer.write, rows)
+            job.rows_written += len(rows)
+            if job.total_rows:
+                job.progress = min(job.rows_written / job.total_rows, 1.0)
+            if time.monotonic() - saved_at >= EXPORT_PROGRESS_SECONDS:
+                await asyncio.to_thread(_write_record, job, record)
+                saved_at = time.monotonic()
+        await asyncio.to_thread(writer.close)
+        writer = None
+        job.progress = 1.0
+        job.download_url = f"/api/exports/{job.id}/download"
+        _finish(job, "completed")
+    except Exception as e:
+        _finish(job, "failed", str(e))
+        if writer is not None:
+            await asyncio.to_thread(writer.close)
+        _remove(path)
+
+    await asyncio.to_thread(_write_record, job, record)
+
+
+async def srv_create_export(request: ExportRequest) -> ExportJob:
+    """
+    Validate an export request and enqueue it for the worker pool.
+    """
+    utils.validate_export_request(request)
+    _ensure_workers()
+    if _queue.full():
+        raise HTTPException(status_code=429, detail="Too many export jobs queued, please retry later.")
+
+    job = ExportJob(id=uuid.uuid4().hex, status="queued", format=request.format, created_at=datetime.now())
+    _jobs[job.id] = (job, request)
+    try:
+        await asyncio.to_thread(_write_record, job, request.model_dump(mode="json"))
+        _queue.put_nowait(job.id)
+    except asyncio.QueueFull:
+        _jobs.pop(job.id)
+        _remove(_record_path(job.id))
+        raise HTTPException(status_code=429, detail="Too many export jobs queued, please retry later.")
+    except BaseException:
+        _jobs.pop(job.id)
+        raise
+    return job
+
+
+async def srv_get_export(job_id: str) -> ExportJob:
+    """
+    Retrieve the status and progress of an export job from its record.
+    """
+    loaded = await asyncio.to_thread(_load_record, job_id)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Export job not found.")
+    return loaded[0]
+
+
+async def srv_get_export_artifact(job_id: str):
+    """
+    Return the path, file name and media type of a completed export.
+    """
+    job = await srv_get_export(job_id)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}.")
+
+    path = _artifact_path(job)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Export artifact has expired.")
+
+    return path, os.path.basename(path), _WRITERS[job.format].media_type
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _sweep(now: datetime):
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    known = set()
+    for entry in os.scandir(EXPORT_DIR):
+        if not entry.name.endswith(".json"):
+            continue
+        loaded = _load_record(entry.name[:-len(".json")])
+        if loaded is None:
+            continue
+        job = loaded[0]
+        if job.expires_at and job.expires_at <= now:
+            _remove(_artifact_path(job))
+            _remove(entry.path)
+        else:
+            known.update({entry.name, os.path.basename(_artifact_path(job))})
+
+    cutoff = (now - timedelta(seconds=EXPORT_TTL_SECONDS)).timestamp()
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.is_file() and entry.name not in known and entry.stat().st_mtime <= cutoff:
+            _remove(entry.path)
+
+
+async def srv_cleanup_expired_exports(now: Optional[datetime] = None):
+    """
+    Delete the artifacts and records of export jobs past their expiry time, fail the jobs whose
+    worker stopped, and delete the files in EXPORT_DIR no record references that are older than
+    the expiry time.
+    """
+    await asyncio.to_thread(_sweep, now or datetime.now())
+
+
+async def export_sweeper():
+    """Delete expired exports periodically in the worker holding the leader lock; started by the application lifespan"""
+    while True:
+        if is_leader():
+            try:
+                await srv_cleanup_expired_exports()
+            except Exception as e:
+                print(f"Export cleanup failed: {e}")
+        await asyncio.sleep(EXPORT_SWEEP_SECONDS)
+
+
+async def srv_start_export_workers():
+    """Start the export workers ahead of the first export request"""
+    _ensure_workers()
+
+
+async def srv_drain_exports(timeout: float):
+    """
+    Give the queued and running export jobs up to timeout seconds to finish, then stop the workers
+    and fail the jobs that did not complete, removing their partial files.
+    """
+    global _queue
+    if _queue is not None:
+        try:
+            await asyncio.wait_for(_queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Stopping export workers with {_queue.qsize()} job(s) still queued")
+
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+    for job, request in _jobs.values():
+        _finish(job, "failed", "The export was interrupted by a shutdown.")
+        _remove(_artifact_path(job))
+        _write_record(job, request.model_dump(mode="json"))
+    _jobs.clear()
+    _queue = None
@@ -0,0 +1,220 @@
+import os
+import math
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional
+from pydantic import TypeAdapter
+from database.storage import get_backend
+from models.sensors import GapQueryParams, SensorOutage
+from fastapi import HTTPException
+from utils.leader import is_leader
+from utils.watermarks import WATERMARK_FILE
+import utils.gaps as utils
+
+GAP_MONITOR_INTERVAL_SECONDS = int(os.getenv("GAP_MONITOR_INTERVAL_SECONDS", "300"))
+GAP_EXPECTED_INTERVAL_SECONDS = int(os.getenv("GAP_EXPECTED_INTERVAL_SECONDS", "60"))
+GAP_TOLERANCE = float(os.getenv("GAP_TOLERANCE", "1.5"))
+GAP_MONITOR_LOOKBACK_SECONDS = int(os.getenv("GAP_MONITOR_LOOKBACK_SECONDS", "86400"))
+GAP_HISTORY_LIMIT = int(os.getenv("GAP_HISTORY_LIMIT", "100"))
+# How late a reading may be stored after its date; at least the interval at which stations send their batches
+GAP_MONITOR_LATENESS_SECONDS = int(os.getenv("GAP_MONITOR_LATENESS_SECONDS", "900"))
+# Report of the last scan, written by the worker running the monitor and read by the others
+GAP_REPORT_FILE = os.getenv("GAP_REPORT_FILE", WATERMARK_FILE + ".outages")
+
+# State of the outage monitor. Gaps older than settled_until are final; each scan re-reads the
+# readings from there on, so readings that arrive late still close the gaps they fall in.
+_monitor = {"scanned_until": None, "settled_until": None, "sensors": {}}
+# The report file as last read by a worker that does not run the monitor
+_published = {"modified": None, "outages": None}
+_outages = TypeAdapter(List[SensorOutage])
+
+
+async def srv_get_station_gaps(station_code: int, params: GapQueryParams):
+    """
+    Find the missing intervals of each sensor of a station over a date range, with their uptime.
+    """
+    date_to = params.date_to or datetime.now()
+    if date_to <= params.date_from:
+        raise HTTPException(status_code=400, detail="date_to must be after date_from.")
+    max_delay = math.ceil(params.interval_seconds * params.tolerance)
+
+    try:
+        result = await get_backend().find_reading_gaps(station_code, params.date_from, date_to, max_delay)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred while detecting gaps: {str(e)}")
+
+    return utils.summarize_gaps(
+        result["sensors"], result["gaps"], result["coverage"],
+        params.date_from, date_to, params.interval_seconds, max_delay
+    )
+
+
+def _sensor_state(sensor: dict, monitored_since: datetime) -> dict:
+    return {
+        "sensor_id": sensor["sensor_id"],
+        "station_code": sensor["station_code"],
+        "type": sensor["type"],
+        "monitored_since": monitored_since,
+        "last_seen": None,
+        # Last reading up to settled_until, where the next scan's first reading is compared from
+        "anchor": None,
+        "missing_readings": 0,
+        "gaps": deque(maxlen=GAP_HISTORY_LIMIT),
+        # Gaps after settled_until, found again by every scan until they settle
+        "open_gaps": [],
+    }
+
+
+def _gap(start: datetime, end: datetime, interior: bool = True) -> dict:
+    return {"start": start, "end": end, "missing_readings": utils.missing_readings(start, end, GAP_EXPECTED_INTERVAL_SECONDS, interior)}
+
+
+def _scan_sensor(state: dict, coverage: dict, gaps: list, settle_at: datetime, max_delay: int):
+    """
+    Fold one scan's readings of a sensor into its state: the gaps ending by settle_at become final,
+    the later ones replace the open gaps of the previous scan.
+    """
+    first = coverage["first_reading"]
+    found = [_gap(gap["gap_start"], gap["gap_end"]) for gap in sorted(gaps, key=lambda gap: gap["gap_start"])]
+    start = state["anchor"] or state["monitored_since"]
+    if (first - start).total_seconds() > max_delay:
+        found.insert(0, _gap(start, first, interior=state["anchor"] is not None))
+
+    open_gaps = []
+    for gap in found:
+        if gap["end"] <= settle_at:
+            state["missing_readings"] += gap["missing_readings"]
+            state["gaps"].append(gap)
+        else:
+            open_gaps.append(gap)
+    state["open_gaps"] = open_gaps
+    state["last_seen"] = max(state["last_seen"] or first, coverage["last_reading"])
+
+    spanning = [gap for gap in open_gaps if gap["start"] <= settle_at]
+    if spanning:
+        state["anchor"] = spanning[0]["start"]
+    elif coverage["last_reading"] <= settle_at:
+        state["anchor"] = coverage["last_reading"]
+    elif first <= settle_at:
+        # Readings continue past settle_at without a gap, so the first one after it is within
+        # max_delay of settle_at as well as of the last one before it
+        state["anchor"] = settle_at
+
+
+async def srv_scan_gaps(now: Optional[datetime] = None):
+    """
+    Scan the readings from the settled point on and update each sensor's gaps. Readings are
+    expected within GAP_MONITOR_LATENESS_SECONDS of their date, so the gaps ending before then
+    are final and later scans start from there; the more recent gaps stay open and are found
+    again by the next scan, after late readings may have closed them.
+    """
+    now = now or datetime.now()
+    window_start = _monitor["settled_until"] or now - timedelta(seconds=GAP_MONITOR_LOOKBACK_SECONDS)
+    settle_at = max(window_start, now - timedelta(seconds=GAP_MONITOR_LATENESS_SECONDS))
+    max_delay = math.ceil(GAP_EXPECTED_INTERVAL_SECONDS * GAP_TOLERANCE)
+
+    result = await get_backend().find_reading_gaps(None, window_start, now, max_delay, workload="bulk")
+    coverage = {row["sensor_id"]: row for row in result["coverage"]}
+    gaps = {}
+    for gap in result["gaps"]:
+        gaps.setdefault(gap["sensor_id"], []).append(gap)
+
+    states = _monitor["sensors"]
+    for sensor in result["sensors"]:
+        state = states.setdefault(sensor["sensor_id"], _sensor_state(sensor, window_start))
+        sensor_coverage = coverage.get(sensor["sensor_id"])
+        if sensor_coverage is None:
+            state["open_gaps"] = []
+            continue
+        _scan_sensor(state, sensor_coverage, gaps.get(sensor["sensor_id"], []), settle_at, max_delay)
+
+    _monitor["settled_until"] = settle_at
+    _monitor["scanned_until"] = now
+
+
+def _build_report() -> List[dict]:
+    """Each monitored sensor's status, recent gaps and uptime as of the last scan"""
+    now = _monitor["scanned_until"]
+    max_delay = math.ceil(GAP_EXPECTED_INTERVAL_SECONDS * GAP_TOLERANCE)
+
+    outages = []
+    for state in _monitor["sensors"].values():
+        gaps = (list(state["gaps"]) + state["open_gaps"])[-GAP_HISTORY_LIMIT:]
+        missing = state["missing_readings"] + sum(gap["missing_readings"] for gap in state["open_gaps"])
+        silent_since = state["last_seen"] or state["monitored_since"]
+        offline = (now - silent_since).total_seconds() > max_delay
+        if offline:
+            open_missing = utils.missing_readings(silent_since, now, GAP_EXPECTED_INTERVAL_SECONDS, interior=False)
+            missing += open_missing
+            gaps.append({"start": silent_since, "end": None, "missing_readings": open_missing})
+
+        outages.append({
+            "sensor_id": state["sensor_id"],
+            "station_code": state["station_code"],
+            "type": state["type"],
+            "status": "offline" if offline else "online",
+            "last_seen": state["last_seen"],
+            "monitored_since": state["monitored_since"],
+            "uptime_percent": utils.uptime_percent(missing, state["monitored_since"], now, GAP_EXPECTED_INTERVAL_SECONDS),
+            "gaps": gaps,
+        })
+
+    return outages
+
+
+def _publish_report():
+    """Replace the report file in one step, so the other workers never read a partial one"""
+    temporary = f"{GAP_REPORT_FILE}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(_outages.dump_json(_outages.validate_python(_build_report())))
+    os.replace(temporary, GAP_REPORT_FILE)
+
+
+def _read_report() -> Optional[List[dict]]:
+    """The report published by the worker running the monitor, None before its first scan"""
+    try:
+        modified = os.stat(GAP_REPORT_FILE).st_mtime_ns
+        if modified != _published["modified"]:
+            with open(GAP_REPORT_FILE, "rb") as f:
+                outages = _outages.validate_json(f.read())
+            _published.update(modified=modified, outages=[outage.model_dump() for outage in outages])
+    except (FileNotFoundError, ValueError):
+        return None
+    return _published["outages"]
+
+
+async def srv_get_outages(station_code: Optional[int] = None, offline_only: bool = False):
+    """
+    Report each monitored sensor's status, recent gaps and uptime without querying the database:
+    from memory in the worker that runs the monitor, from its published report in the others.
+    """
+    if _monitor["scanned_until"] is not None:
+        outages = _build_report()
+    else:
+        outages = await asyncio.to_thread(_read_report)
+    if outages is None:
+        raise HTTPException(status_code=503, detail="The gap monitor has not completed its first scan yet.")
+
+    return [
+        outage for outage in outages
+        if (station_code is None or outage["station_code"] == station_code)
+        and (not offline_only or outage["status"] == "offline")
+    ]
+
+
+async def gap_monitor():
+    """
+    Run the gap scan periodically in the worker holding the leader lock and publish its report;
+    started by the application lifespan of every worker
+    """
+    while True:
+        if is_leader():
+            try:
+                await srv_scan_gaps()
+                await asyncio.to_thread(_publish_report)
+            except Exception as e:
+                print(f"Gap scan failed: {e}")
+        await asyncio.sleep(GAP_MONITOR_INTERVAL_SECONDS)
@@ -0,0 +1,280 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from database.storage import get_backend
+from models.grid import GridQueryParams
+from models.exports import ExportRequest
+from fastapi import HTTPException
+import services.catalog as catalog
+import utils.grid as utils
+from utils.leader import is_leader
+from utils.time_buckets import bucket_end, bucket_start
+
+GRID_FLUSH_SECONDS = int(os.getenv("GRID_FLUSH_SECONDS", "10"))
+GRID_DEFAULT_WINDOW_SECONDS = int(os.getenv("GRID_DEFAULT_WINDOW_SECONDS", "86400"))
+GRID_BACKFILL_WINDOW_SECONDS = int(os.getenv("GRID_BACKFILL_WINDOW_SECONDS", "86400"))
+GRID_REBUILD_DELAY_SECONDS = int(os.getenv("GRID_REBUILD_DELAY_SECONDS", "60"))
+# How late a reading may be stored after its date; at least the interval at which stations send their batches
+GRID_LATENESS_SECONDS = int(os.getenv("GRID_LATENESS_SECONDS", "900"))
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "5000"))
+
+# Name of the grid aggregates in the aggregate_coverage table
+COVERAGE_NAME = "grid_aggregates"
+
+# Aggregate increments of the readings ingested by this worker and not yet written to the database,
+# [readings, total, min, max] by (zoom, x, y, type, bucket_start), and those being written by the current flush
+_pending = {}
+_flushing = {}
+
+# When this worker started adding readings to the aggregates, and whether the coverage it gives
+# has been recorded in the database
+_recording = {"since": None, "recorded": False}
+
+
+def _add(aggregates: dict, key: tuple, readings: int, total: float, minimum: float, maximum: float):
+    aggregate = aggregates.get(key)
+    if aggregate is None:
+        aggregates[key] = [readings, total, minimum, maximum]
+    else:
+        aggregate[0] += readings
+        aggregate[1] += total
+        aggregate[2] = min(aggregate[2], minimum)
+        aggregate[3] = max(aggregate[3], maximum)
+
+
+async def record_readings(station_code: int, readings: List[dict]):
+    """Add stored readings to the aggregates of their station's cell at every zoom level"""
+    if _recording["since"] is None:
+        _recording["since"] = datetime.now()
+    try:
+        station = await catalog.lookup_station(station_code)
+    except Exception as e:
+        print(f"Grid update skipped, station catalog unavailable: {e}")
+        return
+    if station is None:
+        return
+
+    tiles = utils.station_tiles(station["latitude"], station["longitude"])
+    for reading in readings:
+        bucket = bucket_start(reading["date"], utils.GRID_BUCKET_SECONDS)
+        value = float(reading["measurement"])
+        for zoom, x, y in tiles:
+            _add(_pending, (zoom, x, y, reading["type"], bucket), 1, value, value, value)
+
+
+async def srv_flush_grid():
+    """
+    Add the pending increments to the stored aggregates. When the write fails they are put back
+    for the next flush.
+    """
+    if not _pending or _flushing:
+        return
+    _flushing.update(_pending)
+    _pending.clear()
+    rows = [(*key, *aggregate) for key, aggregate in _flushing.items()]
+    try:
+        await get_backend().add_grid_aggregates(rows)
+    except BaseException:
+        for key, aggregate in _flushing.items():
+            _add(_pending, key, *aggregate)
+        raise
+    finally:
+        _flushing.clear()
+    await _record_coverage()
+
+
+async def _record_coverage():
+    """
+    Record the period this worker's aggregates cover once they are in the database. The bucket it
+    started recording in is partial, so the coverage starts with the next one.
+    """
+    if _recording["recorded"] or _recording["since"] is None:
+        return
+    await get_backend().extend_coverage(COVERAGE_NAME, bucket_end(_recording["since"], utils.GRID_BUCKET_SECONDS))
+    _recording["recorded"] = True
+
+
+async def grid_flusher():
+    """Flush the pending grid increments periodically; started by the application lifespan"""
+    while True:
+        await asyncio.sleep(GRID_FLUSH_SECONDS)
+        try:
+            await srv_flush_grid()
+        except Exception as e:
+            print(f"Grid flush failed: {e}")
+
+
+async def srv_rebuild_grid(since: datetime, until: datetime, cells: Optional[Iterable[tuple]] = None) -> dict:
+    """
+    Rebuild the aggregates of (zoom, x, y) cells, by default every cell with a station or stored
+    aggregates, for the buckets from since up to until out of the stored readings. The cells are
+    cleared first and refilled one window of GRID_BACKFILL_WINDOW_SECONDS at a time, so the memory
+    used stays bounded. Rebuild only buckets that no longer receive readings: a reading stored but
+    not yet flushed by a worker would be counted twice.
+    """
+    backend = get_backend()
+    tiles = {
+        station["code"]: utils.station_tiles(station["latitude"], station["longitude"])
+        for station in await catalog.get_station_catalog()
+    }
+    if cells is None:
+        cells = {tile for station_tiles in tiles.values() for tile in station_tiles}
+        cells.update(await backend.get_grid_cells())
+    else:
+        cells = set(cells)
+    tiles = {code: [tile for tile in station_tiles if tile in cells] for code, station_tiles in tiles.items()}
+    station_codes = [code for code, station_tiles in tiles.items() if station_tiles]
+
+    await backend.clear_grid_cells(sorted(cells), since, until)
+    readings = buckets = 0
+    window_start = since
+    while station_codes and window_start < until:
+        # Skip the periods without readings instead of querying them window by window
+        next_reading = await backend.get_first_reading_date(window_start, station_codes)
+        if next_reading is None or next_reading >= until:
+            break
+        window_start = max(window_start, bucket_start(next_reading, utils.GRID_BUCKET_SECONDS))
+        window_end = min(window_start + timedelta(seconds=GRID_BACKFILL_WINDOW_SECONDS), until)
+        request = ExportRequest(
+            station_codes=station_codes,
+            date_from=window_start.isoformat(),
+            date_to=(window_end - timedelta(microseconds=1)).isoformat(),
+        )
+        aggregates = {}
+        async for rows in backend.stream_readings(request, batch_size=BACKFILL_BATCH_SIZE):
+            for row in rows:
+                bucket = bucket_start(row["date"], utils.GRID_BUCKET_SECONDS)
+                value = float(row["measurement"])
+                for zoom, x, y in tiles[row["station_code"]]:
+                    _add(aggregates, (zoom, x, y, row["type"], bucket), 1, value, value, value)
+            readings += len(rows)
+        if aggregates:
+            # The cells were cleared, so adding the window's aggregates stores them as they are
+            await backend.add_grid_aggregates([(*key, *aggregate) for key, aggregate in aggregates.items()])
+        buckets += len(aggregates)
+        window_start = window_end
+    return {"readings": readings, "buckets": buckets, "cells": len(cells)}
+
+
+async def _first_reading() -> Optional[datetime]:
+    station_codes = [station["code"] for station in await catalog.get_station_catalog()]
+    return await get_backend().get_first_reading_date(datetime(1970, 1, 1), station_codes)
+
+
+async def srv_backfill_grid(since: Optional[datetime] = None, until: Optional[datetime] = None) -> dict:
+    """
+    Rebuild the aggregates of every cell for the buckets from since to until and extend the
+    coverage back to since. By default every reading before the period that ingestion already
+    covers is backfilled.
+    """
+    backend = get_backend()
+    coverage = await backend.get_coverage(COVERAGE_NAME)
+    # The coverage can only move back over a rebuilt period that reaches it, or reaches the
+    # present when nothing is covered yet
+    contiguous = until is None or (coverage is not None and until >= coverage)
+    until = bucket_start(until or coverage or datetime.now(), utils.GRID_BUCKET_SECONDS)
+    since = since or await _first_reading() or until
+    since = bucket_start(since, utils.GRID_BUCKET_SECONDS)
+    if since >= until:
+        return {"readings": 0, "buckets": 0, "covered_from": coverage}
+
+    result = await srv_rebuild_grid(since, until)
+    if contiguous:
+        await backend.extend_coverage(COVERAGE_NAME, since)
+    return {"readings": result["readings"], "buckets": result["buckets"], "covered_from": await backend.get_coverage(COVERAGE_NAME)}
+
+
+async def srv_schedule_relocation(previous: dict, current: dict):
+    """
+    Record that the cells a station leaves or enters when its coordinates change must be rebuilt
+    from sensors_data, up to the end of the current bucket. Until their catalogs reload, the
+    workers keep adding its readings to the old cells; the rebuild replaces them afterwards.
+    """
+    if current["latitude"] is None or current["longitude"] is None:
+        return
+    moved = set(utils.station_tiles(previous["latitude"], previous["longitude"]))
+    moved ^= set(utils.station_tiles(current["latitude"], current["longitude"]))
+    if moved:
+        await get_backend().schedule_grid_rebuild(sorted(moved), bucket_end(datetime.now(), utils.GRID_BUCKET_SECONDS))
+
+
+def _rebuild_due(rebuild_until: datetime) -> datetime:
+    """
+    When the buckets up to rebuild_until can be rebuilt: once readings dated before it can no longer
+    arrive and the last of them have been flushed, so no worker still holds increments that the
+    rebuild would count a second time.
+    """
+    return rebuild_until + timedelta(seconds=GRID_LATENESS_SECONDS + GRID_FLUSH_SECONDS + GRID_REBUILD_DELAY_SECONDS)
+
+
+async def srv_run_rebuilds(now: Optional[datetime] = None) -> int:
+    """Rebuild the scheduled cells that are due and remove their schedule; returns the number of cells rebuilt"""
+    now = now or datetime.now()
+    backend = get_backend()
+    due = {}
+    for row in await backend.get_grid_rebuilds():
+        if _rebuild_due(row["rebuild_until"]) <= now:
+            due.setdefault(row["rebuild_until"], []).append((row["zoom"], row["x"], row["y"]))
+    if not due:
+        return 0
+
+    since = await _first_reading()
+    for rebuild_until, cells in sorted(due.items()):
+        if since is not None and since < rebuild_until:
+            await srv_rebuild_grid(bucket_start(since, utils.GRID_BUCKET_SECONDS), rebuild_until, cells)
+        await backend.finish_grid_rebuild(cells, rebuild_until)
+    return sum(len(cells) for cells in due.values())
+
+
+async def grid_rebuilder():
+    """
+    Run the due cell rebuilds in the worker holding the leader lock; started by the application
+    lifespan. The first run replays the rebuilds scheduled before a restart.
+    """
+    while True:
+        if is_leader():
+            try:
+                await srv_run_rebuilds()
+            except Exception as e:
+                print(f"Grid rebuild failed: {e}")
+        await asyncio.sleep(GRID_REBUILD_DELAY_SECONDS)
+
+
+async def srv_get_grid(zoom: int, params: GridQueryParams):
+    """
+    Return the aggregates of every cell of a zoom level in a bounding box over a time window,
+    from the precomputed per-cell buckets.
+    """
+    date_to = params.date_to or datetime.now()
+    date_from = params.date_from or date_to - timedelta(seconds=GRID_DEFAULT_WINDOW_SECONDS)
+    utils.validate_grid_request(zoom, params, date_from, date_to)
+    bucket_from = bucket_start(date_from, utils.GRID_BUCKET_SECONDS)
+    bucket_to = bucket_start(date_to, utils.GRID_BUCKET_SECONDS)
+
+    try:
+        rows = list(await get_backend().get_grid_aggregates(zoom, params, bucket_from, bucket_to))
+        stations = await catalog.get_station_catalog()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred while retrieving the grid: {str(e)}")
+
+    x_min, x_max, y_min, y_max = utils.cells_in_bbox(zoom, params)
+    # Readings this worker has not written yet
+    for (cell_zoom, x, y, sensor_type, bucket), (readings, total, minimum, maximum) in [*_pending.items(), *_flushing.items()]:
+        if (
+            cell_zoom == zoom and x_min <= x <= x_max and y_min <= y <= y_max
+            and bucket_from <= bucket <= bucket_to and (params.type is None or sensor_type == params.type)
+        ):
+            rows.append({
+                "x": x, "y": y, "type": sensor_type, "bucket_start": bucket, "readings": readings,
+                "total": total, "min_measurement": minimum, "max_measurement": maximum,
+            })
+
+    station_counts = {}
+    for station in stations:
+        cell = utils.tile_for(station["latitude"], station["longitude"], zoom)
+        station_counts[cell] = station_counts.get(cell, 0) + 1
+
+    return utils.summarize_cells(zoom, rows, station_counts)
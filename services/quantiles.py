@@ -0,0 +1,194 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+from database.storage import get_backend
+from models.stations import PercentileQueryParams
+from models.exports import ExportRequest
+from fastapi import HTTPException
+import services.catalog as catalog
+import utils.quantiles as utils
+from utils.quantiles import KLLSketch
+
+QUANTILE_FLUSH_SECONDS = int(os.getenv("QUANTILE_FLUSH_SECONDS", "10"))
+QUANTILE_TYPES = ["temperature", "humidity", "wind"]
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "5000"))
+
+# Name of the sketches in the aggregate_coverage table
+COVERAGE_NAME = "quantile_sketches"
+
+# Sketches of the readings ingested by this worker and not yet written to the database,
+# by (station_code, type, bucket_start), and those being written by the current flush
+_pending = {}
+_flushing = {}
+
+# When this worker started adding readings to the sketches, and whether the coverage it gives
+# has been recorded in the database
+_recording = {"since": None, "recorded": False}
+
+
+def record_readings(station_code: int, readings: List[dict]):
+    """Add stored readings to the pending sketches of their station, type and time bucket"""
+    if _recording["since"] is None:
+        _recording["since"] = datetime.now()
+    groups = {}
+    for reading in readings:
+        key = (station_code, reading["type"], utils.bucket_start(reading["date"]))
+        groups.setdefault(key, []).append(reading["measurement"])
+    for key, values in groups.items():
+        sketch = _pending.get(key)
+        if sketch is None:
+            sketch = _pending[key] = KLLSketch()
+        sketch.update_many(values)
+
+
+async def srv_flush_sketches():
+    """
+    Merge the pending sketches into the stored ones. When the write fails they are put back,
+    merged with the readings that arrived meanwhile, for the next flush.
+    """
+    if not _pending or _flushing:
+        return
+    _flushing.update(_pending)
+    _pending.clear()
+    rows = [
+        (station_code, sketch_type, bucket_start, sketch.n, sketch.to_bytes())
+        for (station_code, sketch_type, bucket_start), sketch in _flushing.items()
+    ]
+    try:
+        await get_backend().merge_sketches(rows, utils.merge_sketch_bytes)
+    except BaseException:
+        for key, sketch in _flushing.items():
+            if key in _pending:
+                sketch.merge(_pending[key])
+            _pending[key] = sketch
+        raise
+    finally:
+        _flushing.clear()
+    await _record_coverage()
+
+
+async def _record_coverage():
+    """
+    Record the period this worker's sketches cover once they are in the database. The bucket it
+    started recording in is partial, so the coverage starts with the next one.
+    """
+    if _recording["recorded"] or _recording["since"] is None:
+        return
+    first_complete_bucket = utils.bucket_start(_recording["since"]) + timedelta(seconds=utils.QUANTILE_BUCKET_SECONDS)
+    await get_backend().extend_coverage(COVERAGE_NAME, first_complete_bucket)
+    _recording["recorded"] = True
+
+
+async def srv_backfill_sketches(since: Optional[datetime] = None, until: Optional[datetime] = None) -> dict:
+    """
+    Rebuild the sketches of the buckets from since to until out of the stored readings, replacing
+    the stored ones, and extend the coverage back to since. By default every reading before the
+    period that ingestion already covers is backfilled. Rebuild only buckets that no longer receive
+    readings: a reading stored but not yet flushed by a worker would be counted twice.
+    """
+    backend = get_backend()
+    coverage = await backend.get_coverage(COVERAGE_NAME)
+    # The coverage can only move back over a rebuilt period that reaches it, or reaches the
+    # present when nothing is covered yet
+    contiguous = until is None or (coverage is not None and until >= coverage)
+    until = utils.bucket_start(until or coverage or datetime.now())
+    since = utils.bucket_start(since or datetime(1970, 1, 1))
+    if since >= until:
+        return {"readings": 0, "buckets": 0, "covered_from": coverage}
+
+    readings = buckets = 0
+    for station in await catalog.get_station_catalog():
+        request = ExportRequest(
+            station_codes=[station["code"]],
+            date_from=since.isoformat(),
+            date_to=(until - timedelta(microseconds=1)).isoformat(),
+        )
+        sketches = {}
+        async for rows in backend.stream_readings(request, batch_size=BACKFILL_BATCH_SIZE):
+            groups = {}
+            for row in rows:
+                groups.setdefault((row["type"], utils.bucket_start(row["date"])), []).append(row["measurement"])
+            for key, values in groups.items():
+                sketch = sketches.get(key)
+                if sketch is None:
+                    sketch = sketches[key] = KLLSketch()
+                sketch.update_many(values)
+            readings += len(rows)
+            # Rows come in date order, so the buckets before the last row's are complete
+            current = utils.bucket_start(rows[-1]["date"])
+            complete = [key for key in sketches if key[1] < current]
+            buckets += await _replace(backend, station["code"], {key: sketches.pop(key) for key in complete})
+        buckets += await _replace(backend, station["code"], sketches)
+
+    if contiguous:
+        await backend.extend_coverage(COVERAGE_NAME, since)
+    return {"readings": readings, "buckets": buckets, "covered_from": await backend.get_coverage(COVERAGE_NAME)}
+
+
+async def _replace(backend, station_code: int, sketches: dict) -> int:
+    if sketches:
+        await backend.replace_sketches([
+            (station_code, sketch_type, bucket_start, sketch.n, sketch.to_bytes())
+            for (sketch_type, bucket_start), sketch in sketches.items()
+        ])
+    return len(sketches)
+
+
+async def sketch_flusher():
+    """Flush the pending sketches periodically; started by the application lifespan"""
+    while True:
+        await asyncio.sleep(QUANTILE_FLUSH_SECONDS)
+        try:
+            await srv_flush_sketches()
+        except Exception as e:
+            print(f"Sketch flush failed: {e}")
+
+
+async def srv_get_station_percentiles(station_code: int, params: PercentileQueryParams):
+    """
+    Estimate percentiles of a station's measurements over a period by merging the sketches of
+    the time buckets it covers, instead of sorting the readings.
+    """
+    date_to = params.date_to or datetime.now()
+    if date_to <= params.date_from:
+        raise HTTPException(status_code=400, detail="date_to must be after date_from.")
+    if params.type is not None and params.type not in QUANTILE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid type. Allowed values are: {', '.join(QUANTILE_TYPES)}.")
+    percentiles = utils.parse_percentiles(params.percentiles)
+    types = [params.type] if params.type else QUANTILE_TYPES
+    bucket_from = utils.bucket_start(params.date_from)
+    bucket_to = utils.bucket_start(date_to)
+
+    try:
+        rows = await get_backend().get_sketches(station_code, types, bucket_from, bucket_to)
+        covered_from = await get_backend().get_coverage(COVERAGE_NAME)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred while retrieving the sketches: {str(e)}")
+
+    merged = {sketch_type: KLLSketch() for sketch_type in types}
+    for row in rows:
+        merged[row["type"]].merge(KLLSketch.from_bytes(bytes(row["sketch"])))
+    # Readings this worker has not written yet
+    for (code, sketch_type, bucket_start), sketch in [*_pending.items(), *_flushing.items()]:
+        if code == station_code and sketch_type in merged and bucket_from <= bucket_start <= bucket_to:
+            merged[sketch_type].merge(sketch)
+
+    results = []
+    for sketch_type, sketch in merged.items():
+        values = sketch.quantiles([percentile / 100 for percentile in percentiles])
+        results.append({
+            "type": sketch_type,
+            "readings": sketch.n,
+            "min": sketch.min if sketch.n else None,
+            "max": sketch.max if sketch.n else None,
+            "percentiles": {f"p{percentile:g}": value for percentile, value in zip(percentiles, values)},
+            "rank_error": round(utils.rank_error(), 4),
+            "window_start": bucket_from,
+            "window_end": bucket_to + timedelta(seconds=utils.QUANTILE_BUCKET_SECONDS),
+            "covered_from": covered_from,
+            "complete": covered_from is not None and covered_from <= bucket_from,
+        })
+    return results
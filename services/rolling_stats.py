@@ -0,0 +1,59 @@
+from typing import Optional, List
+import numpy as np
+from utils.rolling_stats import RollingStats
+
+# Rolling statistics of each (sensor, type), kept in memory and fed by the ingest paths
+_stats = {}
+
+
+def _get_stats(sensor_id: str, station_code: int, sensor_type: str) -> RollingStats:
+    key = (sensor_id, sensor_type)
+    stats = _stats.get(key)
+    if stats is None:
+        stats = _stats[key] = RollingStats(sensor_id, station_code, sensor_type)
+    return stats
+
+
+def record_reading(reading: dict) -> List[str]:
+    """Update the statistics with a stored reading and return its anomaly flags"""
+    stats = _get_stats(reading["sensor_id"], reading["station_code"], reading["type"])
+    return stats.update(reading["measurement"], reading["date"])
+
+
+def record_batch(station_code: int, readings: List[dict]) -> int:
+    """
+    Update the statistics with the stored readings of a batch, one vectorized update per
+    (sensor, type) with its readings in date order. Returns the number of flagged readings.
+    """
+    groups = {}
+    for reading in readings:
+        groups.setdefault((reading["sensor_id"], reading["type"]), []).append(reading)
+
+    flagged = 0
+    for (sensor_id, sensor_type), group in groups.items():
+        group.sort(key=lambda reading: reading["date"])
+        values = np.fromiter((reading["measurement"] for reading in group), dtype=float, count=len(group))
+        flags = _get_stats(sensor_id, station_code, sensor_type).update_many(values, [reading["date"] for reading in group])
+        flagged += sum(1 for reading_flags in flags if reading_flags)
+    return flagged
+
+
+async def srv_get_rolling_stats(station_code: Optional[int] = None, sensor_id: Optional[str] = None, sensor_type: Optional[str] = None, flagged_only: bool = False):
+    """
+    Report the rolling aggregates and recent anomalies of each sensor from memory,
+    without reading the history back from the database.
+    """
+    reports = []
+    for stats in _stats.values():
+        if station_code is not None and stats.station_code != station_code:
+            continue
+        if sensor_id is not None and stats.sensor_id != sensor_id:
+            continue
+        if sensor_type is not None and stats.type != sensor_type:
+            continue
+        if flagged_only and not stats.anomalies:
+            continue
+        reports.append(stats.report())
+
+    reports.sort(key=lambda report: (report["station_code"], report["sensor_id"], report["type"]))
+    return reports
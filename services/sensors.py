@@ -1,6 +1,9 @@
 from models.sensors import SensorReadingModel
-import database.database as database
-import database.queries.sensors as sensors_queries
+from database.storage import get_backend
+import utils.watermarks as watermarks
+import services.rolling_stats as rolling_stats
+import services.quantiles as quantiles
+import services.grid as grid
 from fastapi import HTTPException
 
 
@@ -9,19 +12,17 @@ async def srv_create_sensor_reading(sensor_reading: SensorReadingModel):
     Insert a new sensor reading into the sensors_data table
     """
     try:
-        async with database.SQLConnection() as db:
-            await db.execute_query(
-                sensors_queries.CREATE_SENSOR_DATA,
-                (
-                    sensor_reading.sensor_id,
-                    sensor_reading.station_code,
-                    sensor_reading.date,
-                    sensor_reading.type,
-                    sensor_reading.measurement,
-                    sensor_reading.unit
-                )
-            )
+        await get_backend().insert_reading(sensor_reading.model_dump())
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    watermarks.bump_station_data(sensor_reading.station_code)
+    reading = sensor_reading.model_dump()
+    quantiles.record_readings(sensor_reading.station_code, [reading])
+    await grid.record_readings(sensor_reading.station_code, [reading])
+    flags = rolling_stats.record_reading(reading)
+    if flags:
+        return {"message": "Sensor reading created successfully", "flags": flags}
     return {"message": "Sensor reading created successfully"}
\ No newline at end of file
@@ -1,10 +1,14 @@
 from typing import Optional, List
-import database.database as database
-import database.queries.stations as stations_queries
+from database.storage import get_backend
+from database.backends.base import IntegrityError
 from models.stations import StationForecast, Station, StationUpdate, StationDataRequest, BatchData
 from fastapi import HTTPException
-from mysql.connector.errors import IntegrityError
 import utils.stations as utils
+import utils.watermarks as watermarks
+import services.rolling_stats as rolling_stats
+import services.quantiles as quantiles
+import services.grid as grid
+import services.catalog as catalog
 
 async def srv_create_station_forecast(station_forecast: StationForecast):
     """
@@ -17,23 +21,20 @@ async def srv_create_station_forecast(station_forecast: StationForecast):
             'temperature': station_forecast.forecast.temperature
         }
 
-        async with database.SQLConnection() as db:
-            for forecast_type, forecast_data in forecast_map.items():
-                if forecast_data:
-                    await db.execute_query(
-                        stations_queries.CREATE_FORECAST,
-                        (
-                            station_forecast.date,
-                            station_forecast.station_code,
-                            forecast_type,
-                            forecast_data.value,
-                            forecast_data.unit
-                        )
-                    )
+        await get_backend().insert_forecasts(
+            station_forecast.date,
+            station_forecast.station_code,
+            [
+                (forecast_type, forecast_data.value, forecast_data.unit)
+                for forecast_type, forecast_data in forecast_map.items()
+                if forecast_data
+            ]
+        )
 
     except Exception as er:
         raise er
 
+    watermarks.bump_station_data(station_forecast.station_code)
     return station_forecast
 
 
@@ -45,34 +46,34 @@ async def srv_get_stations(
     sort_order: Optional[str] = "ASC"
 ) -> List[dict]:
     """
-    Retrieve stations from the database, optionally filtered by city, with pagination and sorting.
+    Retrieve stations from the catalog cache, optionally filtered by city, with pagination and sorting.
     """
     if limit is None:
         limit = 50
 
     sort, sort_order = utils.validate_sorting_parameters(sort, sort_order)
 
-    final_query, params = utils.build_stations_query(city, page, limit, sort, sort_order)
-
     try:
-        async with database.SQLConnection() as db:
-            return await db.execute_query(final_query, params)
+        stations = await catalog.get_station_catalog()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
 
+    return utils.page_stations(stations, city, page, limit, sort, sort_order)
+
 
 async def srv_create_station(station: Station):
     try:
-        async with database.SQLConnection() as db:
-            await db.execute_query(
-                stations_queries.INSERT_STATION,
-                (station.city, station.latitude, station.longitude, station.installation_date)
-            )
+        await get_backend().create_station(station)
+    except HTTPException:
+        raise
     except IntegrityError as er:
-        raise HTTPException(status_code=409, detail=f"Station with code '{station.code}' already exists")
+        raise HTTPException(status_code=409, detail=f"Station for city '{station.city}' already exists")
     except Exception as er:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
-    
+
+    watermarks.bump_catalog()
     return station
 
 
@@ -82,15 +83,24 @@ async def srv_update_station(code: int, station_update: StationUpdate):
     """
     try:
         fields_to_update = utils.validate_station_update_fields(station_update)
-        query, params = utils.update_station_in_db(code, fields_to_update)
         try:
-            async with database.SQLConnection() as db:
-                await db.execute_query(query, params)
+            if "latitude" in fields_to_update or "longitude" in fields_to_update:
+                # The station's readings move to the cells of its new coordinates. The rebuild is
+                # recorded first, so a failed update only rebuilds the cells as they were
+                previous = await catalog.get_station(code)
+                if previous is not None:
+                    await grid.srv_schedule_relocation(previous, {**previous, **fields_to_update})
+            await get_backend().update_station(code, fields_to_update)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"An error occurred while updating the station: {str(e)}")
 
+        watermarks.bump_catalog()
         return {"message": "Station updated"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
@@ -100,13 +110,15 @@ async def srv_delete_station(code: str):
     Delete an existing station by its city name.
     """
     try:
-        async with database.SQLConnection() as db:
-            await db.execute_query(stations_queries.DELETE_STATION, (code,))
+        await get_backend().delete_station(code)
+    except HTTPException:
+        raise
     except IntegrityError as e:
         raise HTTPException(status_code=400, detail="Cannot delete station: associated records exist in other tables.")
     except Exception as er:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    watermarks.bump_catalog()
     return {"message": "Station deleted"}
 
 
@@ -114,14 +126,15 @@ async def srv_get_station_data(station_code: int, request: StationDataRequest):
     """
     Retrieve meteorological data for a specific station based on filters and pagination.
     """
-    if request.forecast:
-        query, params = utils.get_forecast_for_next_day(station_code)
-    else:
-        query, params = utils.get_station_data_summary_or_paginated(station_code, request)
-    
     try:
-        async with database.SQLConnection() as db:
-            results = await db.execute_query(query, params)
+        if request.forecast:
+            results = await get_backend().get_forecast(station_code, utils.next_day())
+        elif request.summary:
+            results = await get_backend().get_station_data_summary(station_code)
+        else:
+            results = await get_backend().get_station_data(station_code, request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while retrieving data: {str(e)}")
     
@@ -132,30 +145,27 @@ async def srv_insert_batch_data(batch_data: BatchData):
     Create a batch of sensor data for a specific station.
     """
     try:
-        async with database.SQLConnection() as db:
-            errors = 0
-            for sensor_data in batch_data.data:
-                try:
-                    await db.execute_query(
-                        stations_queries.CREATE_BATCH_SENSOR_DATA,
-                        (
-                        sensor_data.sensor_id,
-                        batch_data.station_code,
-                        sensor_data.date,
-                        sensor_data.type,
-                        sensor_data.measurement,
-                        sensor_data.unit
-                    )
-                )
-                except Exception as e:
-                    errors += 1
-                    print(f"Error inserting sensor data: {e}. Sensor data: {sensor_data}")
-                    continue
+        readings = [sensor_data.model_dump() for sensor_data in batch_data.data]
+        stored = await get_backend().insert_readings(batch_data.station_code, readings)
+        errors = stored.count(False)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    flagged = 0
+    if errors < len(batch_data.data):
+        watermarks.bump_station_data(batch_data.station_code)
+        stored_readings = [reading for reading, was_stored in zip(readings, stored) if was_stored]
+        quantiles.record_readings(batch_data.station_code, stored_readings)
+        await grid.record_readings(batch_data.station_code, stored_readings)
+        flagged = rolling_stats.record_batch(batch_data.station_code, stored_readings)
+
     if errors > 0:
-        return {"message": f"{errors} errors occured, please check the logs"}
+        response = {"message": f"{errors} errors occured, please check the logs"}
     else:
-        return {"message": "Batch data created successfully"}
\ No newline at end of file
+        response = {"message": "Batch data created successfully"}
+    if flagged:
+        response["flagged_readings"] = flagged
+    return response
\ No newline at end of file
@@ -0,0 +1,26 @@
+import os
+import tempfile
+import pytest
+
+# Keep the cache watermarks of the test runs away from the ones of a local server
+os.environ.setdefault("WATERMARK_FILE", os.path.join(tempfile.mkdtemp(), "watermarks"))
+
+
+@pytest.fixture
+def duckdb_backend(monkeypatch):
+    """A fresh in-memory DuckDB backend with the sample stations and sensors, used by the API"""
+    import database.storage as storage
+    from database.backends.duckdb_backend import DuckDBBackend
+
+    backend = DuckDBBackend(":memory:")
+    monkeypatch.setattr(storage, "_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def client(duckdb_backend):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+import database.admission as admission
+from database.admission import WorkloadBudget
+
+
+def test_full_queue_and_timeout_are_rejected_with_retry_after():
+    async def scenario():
+        budget = WorkloadBudget("read", concurrency=1, max_queue=1, timeout=0.05)
+        await budget.acquire()
+        waiter = asyncio.create_task(budget.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as full:
+            await budget.acquire()
+        with pytest.raises(HTTPException) as timed_out:
+            await waiter
+        budget.release(0.01)
+        # The slot is free again once the holder releases it
+        await asyncio.wait_for(budget.acquire(), 0.1)
+        budget.release(0.01)
+        return budget, full.value, timed_out.value
+
+    budget, full, timed_out = asyncio.run(scenario())
+    for error in (full, timed_out):
+        assert error.status_code == 503
+        assert int(error.headers["Retry-After"]) >= 1
+    assert "queue is full" in full.detail and "timed out" in timed_out.detail
+    assert (budget.rejected, budget.timed_out, budget.admitted, budget.in_flight) == (1, 1, 2, 0)
+
+
+def test_timeouts_racing_releases_keep_every_slot():
+    async def scenario():
+        budget = WorkloadBudget("read", concurrency=1, max_queue=10, timeout=0.001)
+        for _ in range(300):
+            await budget.acquire()
+
+            async def release_later():
+                await asyncio.sleep(0.001)
+                budget.release(0.001)
+
+            releaser = asyncio.create_task(release_later())
+            try:
+                await budget.acquire()
+                budget.release(0.001)
+            except HTTPException:
+                pass
+            await releaser
+        return budget
+
+    budget = asyncio.run(scenario())
+    assert budget.in_flight == 0
+    assert not budget._semaphore.locked()
+    assert budget._semaphore._value == budget.concurrency
+
+
+def test_retry_after_grows_with_the_queue():
+    budget = WorkloadBudget("bulk", concurrency=2, max_queue=10, timeout=1.0)
+    budget.service_time = 1.5
+    assert budget.retry_after() == 1
+    budget.waiting = 5
+    assert budget.retry_after() == 5
+
+
+def test_busy_read_budget_answers_503(client, monkeypatch):
+    budget = WorkloadBudget("read", concurrency=1, max_queue=0, timeout=0.01)
+    monkeypatch.setitem(admission.budgets, "read", budget)
+    client.portal.call(budget.acquire)
+    try:
+        response = client.get("/api/stations/1/data")
+    finally:
+        budget.release(0.0)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
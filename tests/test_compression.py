@@ -0,0 +1,57 @@
+import gzip
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import middleware.compression as compression
+from middleware.compression import CompressionMiddleware, negotiate_encoding
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("GZIP", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=0.5, deflate", "gzip"),
+    ("gzip;q=bad", None),
+    ("*", next(iter(compression.COMPRESSORS))),
+    ("*, gzip;q=0", next(encoding for encoding in compression.COMPRESSORS if encoding != "gzip")),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.mark.skipif("br" not in compression.COMPRESSORS, reason="brotli is not installed")
+def test_negotiate_encoding_prefers_higher_q_then_server_order():
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.8") == "gzip"
+    assert negotiate_encoding("gzip, br") == "br"
+
+
+def _client(size: int) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/")
+    async def payload():
+        return {"data": "x" * size}
+
+    return TestClient(app)
+
+
+def test_compresses_large_json():
+    response = _client(1000).get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == {"data": "x" * 1000}
+
+
+def test_small_body_is_sent_as_is():
+    response = _client(10).get("/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"data": "x" * 10}
+
+
+def test_gzip_compressor_stream_decodes():
+    compressor = compression.GzipCompressor(6)
+    data = compressor.compress(b"a" * 5000) + compressor.compress(b"b" * 5000) + compressor.finish()
+    assert gzip.decompress(data) == b"a" * 5000 + b"b" * 5000
@@ -0,0 +1,114 @@
+import csv
+import gzip
+import io
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+import services.exports as exports
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _insert_readings(backend, count: int):
+    sensor_id = backend.connection.execute(
+        "SELECT id FROM sensors WHERE station_code = 1 AND type = 'temperature'"
+    ).fetchone()[0]
+    rows = [(sensor_id, 1, datetime(2024, 3, 1) + timedelta(minutes=i), "temperature", float(i), "Celsius") for i in range(count)]
+    backend.connection.executemany(
+        "INSERT INTO sensors_data (sensor_id, station_code, date, type, measurement, unit) VALUES (?, ?, ?, ?, ?, ?)", rows
+    )
+
+
+def _wait_for(client, job_id: str) -> dict:
+    for _ in range(200):
+        job = client.get(f"/api/exports/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Export {job_id} did not finish")
+
+
+BODY = {"station_codes": [1], "types": ["temperature"], "date_from": "2024-03-01", "date_to": "2024-03-02"}
+
+
+def test_export_lifecycle(client, duckdb_backend, export_dir):
+    _insert_readings(duckdb_backend, 120)
+    response = client.post("/api/exports/", json=BODY)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    job = _wait_for(client, job_id)
+    assert job["status"] == "completed"
+    assert job["rows_written"] == job["total_rows"] == 120
+    assert job["expires_at"] is not None
+
+    download = client.get(job["download_url"])
+    assert download.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(download.content).decode())))
+    assert len(rows) == 120
+
+    # Another worker process only has the record to go by
+    assert (export_dir / f"{job_id}.json").exists()
+    assert exports._jobs == {}
+    assert client.get(f"/api/exports/{job_id}").json()["status"] == "completed"
+
+
+@pytest.mark.parametrize("dates, detail", [
+    ({"date_from": "yesterday"}, "Invalid date_from"),
+    ({"date_to": "2024-13-01"}, "Invalid date_to"),
+    ({"date_from": "2024-03-02", "date_to": "2024-03-01"}, "date_to must not be before date_from."),
+])
+def test_export_dates_are_validated_before_queueing(client, export_dir, dates, detail):
+    response = client.post("/api/exports/", json={**BODY, **dates})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+    assert list(export_dir.iterdir()) == []
+
+
+def test_unknown_job(client, export_dir):
+    assert client.get("/api/exports/" + "0" * 32).status_code == 404
+    assert client.get("/api/exports/..").status_code == 404
+
+
+def _record(export_dir, status: str, finished_at=None, expires_at=None) -> exports.ExportJob:
+    job = exports.ExportJob(
+        id=os.urandom(16).hex(), status=status, format="csv", created_at=datetime.now(),
+        finished_at=finished_at, expires_at=expires_at,
+    )
+    exports._write_record(job, BODY)
+    (export_dir / f"{job.id}.csv.gz").write_bytes(b"data")
+    return job
+
+
+def test_job_of_a_stopped_worker_fails(export_dir):
+    job = _record(export_dir, "running")
+    stale = time.time() - 4 * exports.EXPORT_HEARTBEAT_SECONDS
+    os.utime(export_dir / f"{job.id}.json", (stale, stale))
+
+    loaded, _ = exports._load_record(job.id)
+    assert loaded.status == "failed" and "stopped" in loaded.error
+    assert not (export_dir / f"{job.id}.csv.gz").exists()
+    assert exports._load_record(job.id)[0].status == "failed"
+
+
+def test_sweeper_deletes_expired_jobs_and_orphans(export_dir):
+    now = datetime.now()
+    expired = _record(export_dir, "completed", now - timedelta(days=2), now - timedelta(days=1))
+    current = _record(export_dir, "completed", now, now + timedelta(days=1))
+    old = (now - timedelta(seconds=exports.EXPORT_TTL_SECONDS + 60)).timestamp()
+    orphan = export_dir / ("f" * 32 + ".csv.gz")
+    orphan.write_bytes(b"data")
+    os.utime(orphan, (old, old))
+    fresh_orphan = export_dir / ("e" * 32 + ".csv.gz")
+    fresh_orphan.write_bytes(b"data")
+
+    exports._sweep(now)
+
+    remaining = {path.name for path in export_dir.iterdir()}
+    assert remaining == {f"{current.id}.json", f"{current.id}.csv.gz", fresh_orphan.name}
+    assert expired.id not in "".join(remaining)
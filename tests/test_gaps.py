@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+import services.gaps as gaps
+import utils.gaps as gaps_utils
+from utils.gaps import missing_readings, summarize_gaps, uptime_percent
+
+NOON = datetime(2024, 3, 1, 12)
+
+
+def test_missing_readings_of_interior_and_edge_gaps():
+    # Readings at 12:00 and 12:05 leave 12:01 to 12:04 missing
+    assert missing_readings(NOON, NOON + timedelta(minutes=5), 60) == 4
+    # From the start of a window to a reading at 12:05, 12:00 is missing too
+    assert missing_readings(NOON, NOON + timedelta(minutes=5), 60, interior=False) == 5
+    assert missing_readings(NOON, NOON + timedelta(seconds=30), 60) == 0
+
+
+def test_uptime_percent_is_bounded():
+    assert uptime_percent(0, NOON, NOON + timedelta(hours=1), 60) == 100.0
+    assert uptime_percent(15, NOON, NOON + timedelta(hours=1), 60) == 75.0
+    assert uptime_percent(100, NOON, NOON + timedelta(hours=1), 60) == 0.0
+
+
+def test_summarize_gaps_adds_the_window_edges():
+    date_from, date_to = NOON, NOON + timedelta(hours=1)
+    sensors = [
+        {"sensor_id": "a", "station_code": 1, "type": "temperature"},
+        {"sensor_id": "b", "station_code": 1, "type": "humidity"},
+    ]
+    coverage = [{
+        "sensor_id": "a", "readings": 40,
+        "first_reading": NOON + timedelta(minutes=5), "last_reading": NOON + timedelta(minutes=50),
+    }]
+    found = [{"sensor_id": "a", "gap_start": NOON + timedelta(minutes=20), "gap_end": NOON + timedelta(minutes=26)}]
+
+    report = summarize_gaps(sensors, found, coverage, date_from, date_to, 60, 90)
+    first, silent = report
+    assert [(gap["start"], gap["end"], gap["missing_readings"]) for gap in first["gaps"]] == [
+        (NOON, NOON + timedelta(minutes=5), 5),
+        (NOON + timedelta(minutes=20), NOON + timedelta(minutes=26), 5),
+        (NOON + timedelta(minutes=50), date_to, 10),
+    ]
+    assert first["uptime_percent"] == 66.67
+    assert silent["readings"] == 0
+    assert silent["gaps"] == [{"start": date_from, "end": date_to, "missing_readings": 60}]
+    assert silent["uptime_percent"] == 0.0
+
+
+def _sensor_id(backend) -> str:
+    return backend.connection.execute("SELECT id FROM sensors WHERE station_code = 1 AND type = 'temperature'").fetchone()[0]
+
+
+def _insert_minutes(backend, first: int, last: int):
+    """Store the readings of minutes first to last past noon, as a batch would"""
+    sensor_id = _sensor_id(backend)
+    rows = [(sensor_id, 1, NOON + timedelta(minutes=m), "temperature", 20.0, "Celsius") for m in range(first, last + 1)]
+    backend.connection.executemany(
+        "INSERT INTO sensors_data (sensor_id, station_code, date, type, measurement, unit) VALUES (?, ?, ?, ?, ?, ?)", rows
+    )
+
+
+@pytest.fixture
+def monitor(duckdb_backend, monkeypatch):
+    monkeypatch.setattr(gaps, "_monitor", {"scanned_until": None, "settled_until": None, "sensors": {}})
+    monkeypatch.setattr(gaps, "GAP_MONITOR_LOOKBACK_SECONDS", 900)
+    monkeypatch.setattr(gaps, "GAP_MONITOR_LATENESS_SECONDS", 900)
+
+    def scan_at(minute: int) -> dict:
+        async def scan():
+            await gaps.srv_scan_gaps(NOON + timedelta(minutes=minute))
+            return await gaps.srv_get_outages(station_code=1)
+        outages = asyncio.run(scan())
+        return next(sensor for sensor in outages if sensor["sensor_id"] == _sensor_id(duckdb_backend))
+    return scan_at
+
+
+def test_late_batch_closes_the_gap_it_falls_in(duckdb_backend, monitor):
+    _insert_minutes(duckdb_backend, 0, 9)
+    sensor = monitor(15)
+    assert sensor["status"] == "offline"
+
+    # The readings of 12:10 to 12:24 arrive after the scan that already passed them
+    _insert_minutes(duckdb_backend, 10, 24)
+    sensor = monitor(25)
+    assert sensor["status"] == "online"
+    assert sensor["gaps"] == []
+    assert sensor["uptime_percent"] == 100.0
+
+
+def test_gap_is_counted_once_across_scans(duckdb_backend, monitor):
+    _insert_minutes(duckdb_backend, 0, 29)
+    monitor(30)
+    for minute in [45, 60, 75, 90]:
+        _insert_minutes(duckdb_backend, minute - 15 if minute > 45 else 40, minute - 1)
+        sensor = monitor(minute)
+
+    assert sensor["status"] == "online"
+    assert [(gap["start"], gap["end"], gap["missing_readings"]) for gap in sensor["gaps"]] == [
+        (NOON + timedelta(minutes=29), NOON + timedelta(minutes=40), 10),
+    ]
+    # Monitored from 12:15, the first scan's lookback: 10 of 75 readings missing
+    assert sensor["uptime_percent"] == 86.67
+    # The gap settled once the lateness window passed it
+    state = gaps._monitor["sensors"][_sensor_id(duckdb_backend)]
+    assert state["open_gaps"] == [] and state["missing_readings"] == 10
+
+
+def test_gap_queries_give_the_same_result_in_sensor_batches(duckdb_backend, monkeypatch):
+    _insert_minutes(duckdb_backend, 0, 9)
+    _insert_minutes(duckdb_backend, 20, 29)
+    date_to = NOON + timedelta(minutes=30)
+
+    whole = asyncio.run(duckdb_backend.find_reading_gaps(None, NOON, date_to, 90))
+    monkeypatch.setattr(gaps_utils, "GAP_SENSOR_BATCH_SIZE", 1)
+    batched = asyncio.run(duckdb_backend.find_reading_gaps(None, NOON, date_to, 90))
+
+    assert batched == whole
+    assert [(gap["gap_start"], gap["gap_end"]) for gap in whole["gaps"]] == [
+        (NOON + timedelta(minutes=9), NOON + timedelta(minutes=20)),
+    ]
+
+
+def test_other_workers_serve_the_published_report(duckdb_backend, monitor, monkeypatch, tmp_path):
+    _insert_minutes(duckdb_backend, 0, 9)
+    leader_view = monitor(15)
+    monkeypatch.setattr(gaps, "GAP_REPORT_FILE", str(tmp_path / "outages"))
+    gaps._publish_report()
+
+    # A worker that does not run the monitor has no scan of its own
+    monkeypatch.setattr(gaps, "_monitor", {"scanned_until": None, "settled_until": None, "sensors": {}})
+    monkeypatch.setattr(gaps, "_published", {"modified": None, "outages": None})
+    outages = asyncio.run(gaps.srv_get_outages(station_code=1, offline_only=True))
+    assert leader_view in outages
+    assert all(outage["station_code"] == 1 and outage["status"] == "offline" for outage in outages)
+
+
+def test_outages_wait_for_the_first_scan(monkeypatch, tmp_path):
+    monkeypatch.setattr(gaps, "_monitor", {"scanned_until": None, "settled_until": None, "sensors": {}})
+    monkeypatch.setattr(gaps, "GAP_REPORT_FILE", str(tmp_path / "outages"))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(gaps.srv_get_outages())
+    assert error.value.status_code == 503
@@ -0,0 +1,177 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+import utils.grid as grid_utils
+from utils.grid import cells_in_bbox, station_tiles, summarize_cells, tile_bounds, tile_for
+
+
+def test_tile_for_known_tiles():
+    assert tile_for(0.0, 0.0, 1) == (1, 1)
+    assert tile_for(45.4642, 9.19, 6) == (33, 22)
+    # Points beyond the Web Mercator limits fall in the edge tiles
+    assert tile_for(89.9, -180.0, 4) == (0, 0)
+    assert tile_for(-89.9, 180.0, 4) == (15, 15)
+
+
+@pytest.mark.parametrize("latitude, longitude", [(45.4642, 9.19), (-33.87, 151.21), (64.13, -21.9)])
+def test_tile_bounds_contain_the_point(latitude, longitude):
+    for zoom in [4, 8, 10]:
+        bounds = tile_bounds(*tile_for(latitude, longitude, zoom), zoom)
+        assert bounds["south"] <= latitude < bounds["north"]
+        assert bounds["west"] <= longitude < bounds["east"]
+
+
+def test_station_tiles_cover_every_zoom_level():
+    assert [tile[0] for tile in station_tiles(45.4642, 9.19)] == grid_utils.GRID_ZOOM_LEVELS
+
+
+def test_cells_in_bbox_grow_southwards():
+    bbox = SimpleNamespace(min_latitude=35.0, min_longitude=5.0, max_latitude=48.0, max_longitude=19.0)
+    x_min, x_max, y_min, y_max = cells_in_bbox(6, bbox)
+    assert (x_min, y_min) == tile_for(48.0, 5.0, 6)
+    assert (x_max, y_max) == tile_for(35.0, 19.0, 6)
+    assert x_min <= x_max and y_min <= y_max
+
+
+def test_summarize_cells_folds_buckets():
+    first, second = datetime(2024, 3, 1, 10), datetime(2024, 3, 1, 11)
+    rows = [
+        {"x": 1, "y": 2, "type": "temperature", "bucket_start": first, "readings": 2, "total": 30.0, "min_measurement": 10, "max_measurement": 20},
+        {"x": 1, "y": 2, "type": "temperature", "bucket_start": second, "readings": 1, "total": 25.0, "min_measurement": 25, "max_measurement": 25},
+        # Part of the same bucket written by another worker
+        {"x": 1, "y": 2, "type": "temperature", "bucket_start": second, "readings": 1, "total": 35.0, "min_measurement": 35, "max_measurement": 35},
+        {"x": 0, "y": 2, "type": "wind", "bucket_start": first, "readings": 1, "total": 4.0, "min_measurement": 4, "max_measurement": 4},
+    ]
+    cells = summarize_cells(4, rows, {(1, 2): 3})
+    assert [(cell["x"], cell["y"]) for cell in cells] == [(0, 2), (1, 2)]
+    assert cells[0]["stations"] == 0 and cells[1]["stations"] == 3
+    aggregate = cells[1]["aggregates"][0]
+    assert aggregate["readings"] == 4
+    assert aggregate["mean"] == 22.5
+    assert (aggregate["min"], aggregate["max"]) == (10.0, 35.0)
+    assert aggregate["current_bucket"] == second and aggregate["current"] == 30.0
+
+
+def _insert_readings(backend, station_code: int, start: datetime, count: int):
+    sensor_id = backend.connection.execute(
+        "SELECT id FROM sensors WHERE station_code = ? AND type = 'temperature'", [station_code]
+    ).fetchone()[0]
+    rows = [(sensor_id, station_code, start + timedelta(minutes=i), "temperature", float(i % 30), "Celsius") for i in range(count)]
+    backend.connection.executemany(
+        "INSERT INTO sensors_data (sensor_id, station_code, date, type, measurement, unit) VALUES (?, ?, ?, ?, ?, ?)", rows
+    )
+
+
+GRID_PATH = (
+    "/api/grid/{zoom}?min_latitude={south}&min_longitude={west}&max_latitude={north}&max_longitude={east}"
+    "&type=temperature&date_from=2024-03-01T00:00:00&date_to=2024-03-02T00:00:00"
+)
+
+
+def _cell_readings(client, zoom: int, latitude: float, longitude: float) -> int:
+    bounds = tile_bounds(*tile_for(latitude, longitude, zoom), zoom)
+    # Stay inside the cell so the neighbouring ones are left out
+    path = GRID_PATH.format(
+        zoom=zoom, south=bounds["south"] + 1e-6, west=bounds["west"] + 1e-6,
+        north=bounds["north"] - 1e-6, east=bounds["east"] - 1e-6,
+    )
+    cells = client.get(path).json()
+    return sum(aggregate["readings"] for cell in cells for aggregate in cell["aggregates"])
+
+
+def test_backfill_builds_the_grid_from_history(duckdb_backend):
+    import main
+    from services.grid import COVERAGE_NAME, srv_backfill_grid
+
+    _insert_readings(duckdb_backend, 1, datetime(2024, 3, 1), 600)
+    station = duckdb_backend.connection.execute("SELECT latitude, longitude FROM stations WHERE code = 1").fetchone()
+    zoom = grid_utils.GRID_ZOOM_LEVELS[-1]
+
+    with TestClient(main.app) as client:
+        assert _cell_readings(client, zoom, *station) == 0
+        result = client.portal.call(srv_backfill_grid)
+        assert result["readings"] == 600
+        assert result["covered_from"] == datetime(2024, 3, 1)
+        assert _cell_readings(client, zoom, *station) == 600
+
+        # Rebuilding the same period replaces the aggregates instead of adding to them
+        client.portal.call(srv_backfill_grid, datetime(2024, 3, 1), datetime(2024, 3, 2))
+        assert _cell_readings(client, zoom, *station) == 600
+        assert client.portal.call(duckdb_backend.get_coverage, COVERAGE_NAME) == datetime(2024, 3, 1)
+
+
+def test_rebuild_moves_a_relocated_station(duckdb_backend):
+    import main
+    import services.catalog as catalog
+    from services.grid import srv_backfill_grid, srv_rebuild_grid
+
+    _insert_readings(duckdb_backend, 1, datetime(2024, 3, 1), 120)
+    old = tuple(float(value) for value in duckdb_backend.connection.execute("SELECT latitude, longitude FROM stations WHERE code = 1").fetchone())
+    new = (-33.87, 151.21)
+    zoom = grid_utils.GRID_ZOOM_LEVELS[0]
+
+    with TestClient(main.app) as client:
+        client.portal.call(srv_backfill_grid)
+        assert client.put("/api/stations/1", json={"latitude": new[0], "longitude": new[1]}).status_code == 200
+        moved = set(station_tiles(*old)) ^ set(station_tiles(*new))
+        client.portal.call(catalog.get_station_catalog)
+        client.portal.call(srv_rebuild_grid, datetime(2024, 3, 1), datetime(2024, 3, 2), moved)
+
+        assert _cell_readings(client, zoom, *old) == 0
+        assert _cell_readings(client, zoom, *new) == 120
+
+
+def test_lookup_station_answers_from_the_kept_catalog(duckdb_backend, monkeypatch):
+    import services.catalog as catalog
+    import utils.watermarks as watermarks
+
+    async def scenario():
+        await catalog.get_station_catalog()
+        loads = []
+        load_stations = catalog._load_stations
+
+        async def counting_load():
+            loads.append(1)
+            return await load_stations()
+
+        monkeypatch.setattr(catalog, "_load_stations", counting_load)
+        watermarks.bump_catalog()
+        # A known station is answered at once, the stale catalog reloads once in the background
+        stations = [await catalog.lookup_station(1) for _ in range(50)]
+        await catalog._refresh["task"]
+        return stations, loads
+
+    stations, loads = asyncio.run(scenario())
+    assert all(station["code"] == 1 for station in stations)
+    assert len(loads) == 1
+
+
+def test_relocation_rebuild_is_recorded_and_runs_once_settled(duckdb_backend):
+    import main
+    import services.grid as grid
+
+    _insert_readings(duckdb_backend, 1, datetime(2024, 3, 1), 120)
+    old = tuple(float(value) for value in duckdb_backend.connection.execute("SELECT latitude, longitude FROM stations WHERE code = 1").fetchone())
+    new = (-33.87, 151.21)
+    zoom = grid_utils.GRID_ZOOM_LEVELS[0]
+
+    with TestClient(main.app) as client:
+        client.portal.call(grid.srv_backfill_grid)
+        assert client.put("/api/stations/1", json={"latitude": new[0], "longitude": new[1]}).status_code == 200
+
+        # The rebuild is stored, so it outlives the worker that recorded it
+        rebuilds = client.portal.call(duckdb_backend.get_grid_rebuilds)
+        assert {(row["zoom"], row["x"], row["y"]) for row in rebuilds} == set(station_tiles(*old)) ^ set(station_tiles(*new))
+        rebuild_until = rebuilds[0]["rebuild_until"]
+
+        # Readings dated before rebuild_until may still arrive and sit in a worker's buffer
+        assert client.portal.call(grid.srv_run_rebuilds, rebuild_until) == 0
+        assert _cell_readings(client, zoom, *old) == 120
+
+        settled = rebuild_until + timedelta(seconds=grid.GRID_LATENESS_SECONDS + grid.GRID_FLUSH_SECONDS + grid.GRID_REBUILD_DELAY_SECONDS)
+        assert client.portal.call(grid.srv_run_rebuilds, settled) == len(rebuilds)
+        assert _cell_readings(client, zoom, *old) == 0
+        assert _cell_readings(client, zoom, *new) == 120
+        assert client.portal.call(duckdb_backend.get_grid_rebuilds) == []
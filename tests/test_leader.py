@@ -0,0 +1,25 @@
+import os
+import sys
+import subprocess
+import utils.leader as leader
+
+CHECK = "import utils.leader as leader; print(leader.is_leader())"
+
+
+def _other_worker(lock_file: str) -> str:
+    env = {**os.environ, "LEADER_LOCK_FILE": lock_file}
+    return subprocess.run([sys.executable, "-c", CHECK], env=env, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def test_one_process_holds_the_leader_lock(tmp_path, monkeypatch):
+    lock_file = str(tmp_path / "leader")
+    monkeypatch.setattr(leader, "LEADER_LOCK_FILE", lock_file)
+    monkeypatch.setattr(leader, "_fd", None)
+
+    assert leader.is_leader()
+    assert leader.is_leader()
+    assert _other_worker(lock_file) == "False"
+
+    # Another worker takes over once the leader lets go
+    leader.release_leadership()
+    assert _other_worker(lock_file) == "True"
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from utils.quantiles import KLLSketch, merge_sketch_bytes, parse_percentiles, rank_error
+
+
+def _rank_errors(sketch: KLLSketch, values: np.ndarray, fractions):
+    ordered = np.sort(values)
+    errors = []
+    for fraction, estimate in zip(fractions, sketch.quantiles(fractions)):
+        rank = np.searchsorted(ordered, estimate, side="right") / len(ordered)
+        errors.append(abs(rank - fraction))
+    return errors
+
+
+def test_merged_sketch_error_stays_within_bound():
+    rng = np.random.default_rng(7)
+    parts = [rng.normal(20 + i % 5, 3, 2000) for i in range(37)]
+    merged = KLLSketch()
+    for part in parts:
+        sketch = KLLSketch()
+        sketch.update_many(part)
+        merged.merge(sketch)
+
+    values = np.concatenate(parts)
+    assert merged.n == len(values)
+    assert merged.min == values.min() and merged.max == values.max()
+    fractions = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+    assert max(_rank_errors(merged, values, fractions)) < rank_error()
+
+
+def test_serialization_round_trip():
+    sketch = KLLSketch()
+    sketch.update_many(np.random.default_rng(1).uniform(0, 100, 10000))
+    restored = KLLSketch.from_bytes(sketch.to_bytes())
+    assert (restored.k, restored.n, restored.min, restored.max) == (sketch.k, sketch.n, sketch.min, sketch.max)
+    assert restored.levels == sketch.levels
+    assert restored.quantiles([0.1, 0.5, 0.9]) == sketch.quantiles([0.1, 0.5, 0.9])
+
+
+def test_merge_sketch_bytes_adds_the_readings():
+    a, b = KLLSketch(), KLLSketch()
+    a.update_many(range(100))
+    b.update_many(range(100, 300))
+    merged = KLLSketch.from_bytes(merge_sketch_bytes(a.to_bytes(), b.to_bytes()))
+    assert merged.n == 300
+    assert (merged.min, merged.max) == (0, 299)
+
+
+def test_empty_sketch_and_extremes():
+    sketch = KLLSketch()
+    assert sketch.quantiles([0.5]) == [None]
+    sketch.update_many([3.0, 1.0, 2.0])
+    assert sketch.quantiles([0.0, 0.5, 1.0]) == [1.0, 2.0, 3.0]
+
+
+def test_parse_percentiles():
+    assert parse_percentiles("5, 50,99.9") == [5.0, 50.0, 99.9]
+    for invalid in ["", "abc", "101", "-1"]:
+        with pytest.raises(HTTPException):
+            parse_percentiles(invalid)
+
+
+def test_backfill_builds_sketches_from_history(duckdb_backend):
+    import main
+    from services.quantiles import srv_backfill_sketches
+
+    sensor_id = duckdb_backend.connection.execute(
+        "SELECT id FROM sensors WHERE station_code = 1 AND type = 'temperature'"
+    ).fetchone()[0]
+    start = datetime(2024, 3, 1)
+    rows = [(sensor_id, 1, start + timedelta(minutes=i), "temperature", float(i % 30), "Celsius") for i in range(600)]
+    duckdb_backend.connection.executemany(
+        "INSERT INTO sensors_data (sensor_id, station_code, date, type, measurement, unit) VALUES (?, ?, ?, ?, ?, ?)", rows
+    )
+    path = "/api/stations/1/percentiles?type=temperature&percentiles=0,100&date_from=2024-03-01T00:00:00&date_to=2024-03-01T09:00:00"
+
+    with TestClient(main.app) as client:
+        before = client.get(path).json()[0]
+        assert before["readings"] == 0 and not before["complete"]
+
+        result = client.portal.call(srv_backfill_sketches)
+        assert result["readings"] == 600 and result["buckets"] == 10
+
+        after = client.get(path).json()[0]
+    assert after["readings"] == 600
+    assert after["percentiles"] == {"p0": 0.0, "p100": 29.0}
+    assert after["complete"]
+
+
+def test_backfill_before_the_covered_period_leaves_the_coverage(duckdb_backend):
+    import main
+    from services.quantiles import COVERAGE_NAME, srv_backfill_sketches
+
+    with TestClient(main.app) as client:
+        result = client.portal.call(srv_backfill_sketches, datetime(2024, 1, 1), datetime(2024, 2, 1))
+        assert result["covered_from"] is None
+        client.portal.call(duckdb_backend.extend_coverage, COVERAGE_NAME, datetime(2024, 2, 1))
+        result = client.portal.call(srv_backfill_sketches, datetime(2024, 1, 1), datetime(2024, 2, 1))
+        assert result["covered_from"] == datetime(2024, 1, 1)
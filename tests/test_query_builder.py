@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from database.query_builder import SelectQuery, UpdateQuery
+from utils.stations import STATION_DATA_QUERY, STATION_UPDATE_QUERY, build_paginated_query, build_stations_query
+
+TEMPLATE = "SELECT * FROM t WHERE a = %s {filter_condition} ORDER BY {sort_column} {sort_order} LIMIT %s OFFSET %s"
+
+
+def _query():
+    return SelectQuery(TEMPLATE, {"b": "AND b = %s", "c": "AND c >= %s"}, ["a", "b"])
+
+
+def test_select_applies_the_filters_that_are_set_in_order():
+    statement, params = _query().build([1], {"c": 5, "b": 2, "d": 9}, "b", "DESC", 3, 10)
+    assert statement == "SELECT * FROM t WHERE a = %s AND b = %s AND c >= %s ORDER BY b DESC LIMIT %s OFFSET %s"
+    assert params == [1, 2, 5, 10, 20]
+
+
+def test_select_rejects_what_is_not_whitelisted():
+    query = _query()
+    with pytest.raises(HTTPException) as error:
+        query.build([1], {}, "a; DROP TABLE t", "ASC", 1, 10)
+    assert error.value.status_code == 400 and error.value.detail == "Invalid sort parameter."
+    with pytest.raises(HTTPException) as error:
+        query.build([1], {}, "a", "SIDEWAYS", 1, 10)
+    assert error.value.detail == "Invalid sort order."
+    with pytest.raises(ValueError):
+        query.statement(("d",), "a", "ASC")
+
+
+def test_each_shape_renders_one_interned_statement():
+    query = _query()
+    first, _ = query.build([1], {"b": 2}, "a", "ASC", 1, 10)
+    second, _ = query.build([7], {"b": 3}, "a", "ASC", 2, 50)
+    assert first is second
+    other, _ = query.build([1], {"c": 2}, "a", "ASC", 1, 10)
+    assert other is not first
+    assert len(query._statements) == 2
+
+
+def test_update_assigns_columns_in_whitelist_order():
+    query = UpdateQuery("UPDATE t SET {assignments} WHERE id = %s", ["x", "y", "z"])
+    statement, params = query.build({"z": 3, "x": 1}, [42])
+    assert statement == "UPDATE t SET x = %s, z = %s WHERE id = %s"
+    assert params == [1, 3, 42]
+    assert query.build({"x": 5, "z": 6}, [1])[0] is statement
+
+
+def test_update_rejects_unknown_or_missing_columns():
+    query = UpdateQuery("UPDATE t SET {assignments} WHERE id = %s", ["x"])
+    with pytest.raises(HTTPException) as error:
+        query.build({"x": 1, "id = 0, x": 2}, [1])
+    assert error.value.status_code == 400 and error.value.detail.startswith("Cannot update:")
+    with pytest.raises(HTTPException) as error:
+        query.build({}, [1])
+    assert error.value.detail == "No fields to update."
+
+
+def test_station_queries():
+    request = SimpleNamespace(date_from="2024-01-01", date_to=None, type="wind", sort="date", page=2, limit=50)
+    statement, params = build_paginated_query(1, request)
+    assert statement is STATION_DATA_QUERY.statement(("date_from", "type"), "date", "ASC")
+    assert params == [1, "2024-01-01", "wind", 50, 50]
+    with pytest.raises(HTTPException):
+        build_paginated_query(1, SimpleNamespace(**{**vars(request), "type": "pressure"}))
+
+    statement, params = build_stations_query(None, 1, 20, "code", "DESC")
+    assert "WHERE city" not in statement and "ORDER BY code DESC" in statement
+    assert params == [20, 0]
+    assert STATION_UPDATE_QUERY.build({"longitude": 9.2, "city": "Milano"}, [1])[1] == ["Milano", 9.2, 1]
@@ -0,0 +1,67 @@
+import os
+import asyncio
+import pytest
+import database.check_query_plans as check_query_plans
+from database.check_query_plans import plan_problems, query_shapes
+
+
+def _step(table: str, type: str, key, rows: int = 10, extra: str = ""):
+    return {"table": table, "type": type, "key": key, "rows": rows, "Extra": extra}
+
+
+def test_limit_probe_with_full_index_scan_is_rejected():
+    plan = [_step("sensors_data", "index", "idx_sensors_data_station_date", rows=500000)]
+    keys = {"sensors_data": {"idx_sensors_data_station_date"}}
+    assert plan_problems(plan, keys, max_rows=1) == ["full index scan of sensors_data"]
+    assert plan_problems(plan, keys) == ["full index scan of sensors_data"]
+
+
+def test_page_read_in_index_order_is_accepted():
+    plan = [_step("stations", "index", "PRIMARY", rows=50)]
+    assert plan_problems(plan, {"stations": {"PRIMARY"}}, max_rows=50) == []
+
+
+def test_unexpected_index_is_rejected():
+    plan = [_step("sensors_data", "range", "PRIMARY")]
+    problems = plan_problems(plan, {"sensors_data": {"idx_sensors_data_station_date"}})
+    assert problems == ["sensors_data read through PRIMARY instead of idx_sensors_data_station_date"]
+
+
+def test_full_scan_and_filesort_are_rejected():
+    plan = [_step("stations", "ALL", None, extra="Using where; Using filesort")]
+    assert plan_problems(plan, {"stations": {"PRIMARY"}}) == ["full scan of stations", "filesort on stations"]
+
+
+def test_filesort_is_accepted_within_its_row_bound_only():
+    plan = [_step("sensors_data", "range", "PRIMARY", rows=2200, extra="Using where; Using filesort")]
+    keys = {"sensors_data": {"PRIMARY"}}
+    assert plan_problems(plan, keys, sort_rows=2200) == []
+    assert plan_problems(plan, keys, sort_rows=2199) == ["filesort on sensors_data"]
+    assert plan_problems(plan, keys) == ["filesort on sensors_data"]
+
+
+def test_derived_tables_are_skipped():
+    plan = [_step("<derived2>", "ALL", None), _step("sensors_data", "ref", "idx_sensors_data_station_date")]
+    assert plan_problems(plan, {"sensors_data": {"idx_sensors_data_station_date"}}) == []
+
+
+def test_every_shape_declares_its_indexes():
+    shapes = list(query_shapes(1, ["a", "b", "c"]))
+    names = [name for name, *_ in shapes]
+    assert len(names) == len(set(names))
+    for name, query, params, keys, max_rows, sort_rows in shapes:
+        assert keys, name
+        assert query.count("%s") == len(params), name
+        for table in keys:
+            assert table in query, name
+
+
+@pytest.mark.skipif(os.getenv("CHECK_QUERY_PLANS") != "1", reason="set CHECK_QUERY_PLANS=1 and the DB_* variables to check plans on MySQL")
+def test_query_plans_use_their_indexes():
+    seed_rows = int(os.getenv("CHECK_QUERY_PLANS_SEED", "0"))
+    assert asyncio.run(check_query_plans.check(seed_rows)) == 0
+
+
+def test_only_the_gap_scan_may_sort():
+    sorting = [name for name, *_, sort_rows in query_shapes(1, ["a", "b", "c"]) if sort_rows is not None]
+    assert sorting == ["gaps sensor batch"]
@@ -0,0 +1,131 @@
+import asyncio
+import time
+import pytest
+import database.database as database
+
+
+class _Pool:
+    size = freesize = 1
+
+    def __init__(self, fail_cursor=False):
+        self.fail_cursor = fail_cursor
+        self.released = []
+
+    async def acquire(self):
+        return _Connection(self)
+
+    def release(self, connection):
+        self.released.append(connection)
+
+
+class _Connection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def cursor(self, cursor_class):
+        if self.pool.fail_cursor:
+            raise ConnectionError("lost")
+        return object()
+
+
+def _endpoint(name, healthy=True, lag=0.0, checked=True, pool=None):
+    endpoint = database.DatabaseEndpoint(name, {})
+    endpoint.healthy = healthy
+    endpoint.lag = lag
+    endpoint.checked_at = time.monotonic() if checked else 0.0
+    endpoint.pool = pool or _Pool()
+    return endpoint
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    endpoints = []
+    monkeypatch.setattr(database, "replicas", endpoints)
+    monkeypatch.setattr(database, "_last_writes", {})
+    return endpoints
+
+
+def test_select_replica_skips_unusable_replicas(replicas):
+    replicas.extend([
+        _endpoint("down", healthy=False),
+        _endpoint("lagging", lag=database.REPLICA_MAX_LAG_SECONDS + 1),
+        _endpoint("stale", checked=False),
+    ])
+    assert database.select_replica() is None
+    replicas.append(_endpoint("ok"))
+    assert database.select_replica().name == "ok"
+
+
+def test_new_replica_is_out_of_rotation_until_checked(replicas):
+    replicas.append(database.DatabaseEndpoint("new", {}))
+    assert database.select_replica() is None
+
+
+def test_read_falls_back_to_primary_when_replica_fails(replicas, monkeypatch):
+    broken = _endpoint("broken", pool=_Pool(fail_cursor=True))
+    replicas.append(broken)
+    primary = _endpoint("primary")
+    monkeypatch.setattr(database, "primary", primary)
+
+    async def scenario():
+        db = database.SQLConnection(read_only=True)
+        await db._connect()
+        return db
+
+    db = asyncio.run(scenario())
+    assert db.endpoint is primary
+    assert not broken.healthy
+    # The connection whose cursor failed went back to its pool
+    assert len(broken.pool.released) == 1
+
+
+def test_recent_writer_reads_from_primary(replicas, monkeypatch):
+    replicas.append(_endpoint("replica"))
+    primary = _endpoint("primary")
+    monkeypatch.setattr(database, "primary", primary)
+
+    async def read_endpoint():
+        db = database.SQLConnection(read_only=True)
+        await db._connect()
+        return db.endpoint.name
+
+    async def scenario():
+        token = database.current_client.set("client-a")
+        try:
+            before = await read_endpoint()
+            database._record_write()
+            after = await read_endpoint()
+        finally:
+            database.current_client.reset(token)
+        token = database.current_client.set("client-b")
+        try:
+            other = await read_endpoint()
+        finally:
+            database.current_client.reset(token)
+        return before, after, other
+
+    assert asyncio.run(scenario()) == ("replica", "primary", "replica")
+
+
+def test_stickiness_expires(replicas, monkeypatch):
+    token = database.current_client.set("client-a")
+    try:
+        database._record_write()
+        assert database._recently_wrote()
+        monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0.0)
+        assert not database._recently_wrote()
+    finally:
+        database.current_client.reset(token)
+
+
+def test_health_check_failure_takes_replica_out(replicas):
+    class _Unreachable(database.DatabaseEndpoint):
+        async def get_pool(self):
+            raise ConnectionError("unreachable")
+
+    replica = _Unreachable("replica", {})
+    replica.healthy = True
+    replicas.append(replica)
+    asyncio.run(database.check_replicas())
+    assert not replica.healthy and replica.checked_at > 0
+    assert database.select_replica() is None
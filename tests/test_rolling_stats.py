@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from utils.rolling_stats import RollingStats, ROLLING_MIN_SAMPLES, ROLLING_STUCK_READINGS, ROLLING_WINDOW
+
+START = datetime(2024, 10, 1)
+
+
+def _dates(n: int, offset: int = 0):
+    return [START + timedelta(minutes=offset + i) for i in range(n)]
+
+
+def _series(n: int, seed: int = 0) -> np.ndarray:
+    """Temperatures with noise, a spike, a stuck stretch and an out-of-range reading"""
+    rng = np.random.default_rng(seed)
+    values = np.round(20 + rng.normal(0, 1, n), 2)
+    values[n // 3] = 45.0
+    values[n // 2:n // 2 + ROLLING_STUCK_READINGS + 5] = 21.5
+    values[-10] = 120.0
+    return values
+
+
+def _assert_same_state(batched: RollingStats, single: RollingStats):
+    a, b = batched.report(), single.report()
+    for key in ["count", "window_size", "last_value", "last_date", "flag_counts"]:
+        assert a[key] == b[key], key
+    for key in ["mean", "std", "ewma", "window_mean", "window_min", "window_max"]:
+        assert a[key] == pytest.approx(b[key], rel=1e-9, abs=1e-9), key
+    assert a["recent_anomalies"] == b["recent_anomalies"]
+
+
+@pytest.mark.parametrize("batch_size", [2, 7, 64, 300, 1000])
+def test_update_many_matches_repeated_update(batch_size):
+    values = _series(1000)
+    dates = _dates(len(values))
+    batched = RollingStats("s1", 1, "temperature")
+    single = RollingStats("s1", 1, "temperature")
+
+    batched_flags = []
+    for start in range(0, len(values), batch_size):
+        batched_flags += batched.update_many(values[start:start + batch_size], dates[start:start + batch_size])
+    single_flags = [single.update(float(value), date) for value, date in zip(values, dates)]
+
+    assert batched_flags == single_flags
+    _assert_same_state(batched, single)
+
+
+def test_welford_matches_numpy():
+    values = _series(500, seed=3)
+    stats = RollingStats("s1", 1, "temperature")
+    stats.update_many(values, _dates(len(values)))
+    report = stats.report()
+    assert report["mean"] == pytest.approx(values.mean())
+    assert report["std"] == pytest.approx(values.std(ddof=1))
+    assert report["window_mean"] == pytest.approx(values[-ROLLING_WINDOW:].mean())
+
+
+def test_flags():
+    stats = RollingStats("s1", 1, "temperature")
+    values = np.round(20 + np.random.default_rng(1).normal(0, 0.5, ROLLING_MIN_SAMPLES), 2)
+    stats.update_many(values, _dates(len(values)))
+
+    assert "spike" in stats.update(40.0, START + timedelta(hours=1))
+    assert stats.update(200.0, START + timedelta(hours=2)) == ["out_of_range", "spike"]
+
+    flags = [stats.update(20.0, START + timedelta(hours=3, minutes=i)) for i in range(ROLLING_STUCK_READINGS)]
+    assert all("stuck" not in f for f in flags[:-1])
+    assert "stuck" in flags[-1]
+
+
+def test_no_spike_before_min_samples():
+    stats = RollingStats("s1", 1, "temperature")
+    stats.update_many(np.array([20.0, 20.1, 19.9]), _dates(3))
+    assert "spike" not in stats.update(40.0, START + timedelta(hours=1))
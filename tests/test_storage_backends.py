@@ -0,0 +1,39 @@
+import pytest
+from database.backends.base import StorageBackend
+from database.backends.duckdb_backend import DuckDBBackend
+
+
+def test_incomplete_backend_fails_when_created():
+    class PartialBackend(StorageBackend):
+        async def insert_reading(self, reading: dict):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialBackend()
+
+
+def test_duckdb_backend_implements_the_interface():
+    backend = DuckDBBackend(":memory:")
+    assert isinstance(backend, StorageBackend)
+
+
+def test_update_station_with_sensors(client):
+    response = client.put("/api/stations/1", json={"city": "Milano", "longitude": 9.2})
+    assert response.status_code == 200, response.text
+    stations = {station["code"]: station for station in client.get("/api/stations/?limit=100").json()}
+    assert stations[1]["city"] == "Milano"
+    assert float(stations[1]["longitude"]) == 9.2
+
+
+def test_delete_station_is_restricted_while_referenced(client):
+    response = client.delete("/api/stations/1")
+    assert response.status_code == 400
+    assert any(station["code"] == 1 for station in client.get("/api/stations/?limit=100").json())
+
+
+def test_delete_unreferenced_station(client):
+    station = {"city": "Test City", "latitude": 45.0, "longitude": 9.0, "installation_date": "2024-11-01"}
+    assert client.post("/api/stations/", json=station).status_code in (200, 201)
+    code = next(s["code"] for s in client.get("/api/stations/?limit=100").json() if s["city"] == "Test City")
+    assert client.delete(f"/api/stations/{code}").status_code == 200
+    assert all(station["code"] != code for station in client.get("/api/stations/?limit=100").json())
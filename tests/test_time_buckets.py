@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+from utils.time_buckets import bucket_end, bucket_start
+
+
+def test_bucket_start():
+    assert bucket_start(datetime(2024, 3, 1, 10, 59, 59), 3600) == datetime(2024, 3, 1, 10)
+    assert bucket_start(datetime(2024, 3, 1, 10, 0), 3600) == datetime(2024, 3, 1, 10)
+    assert bucket_start(datetime(2024, 3, 1, 10, 40), 1800) == datetime(2024, 3, 1, 10, 30)
+    assert bucket_start(datetime(2024, 3, 1, 10, 40, tzinfo=timezone.utc), 3600) == datetime(2024, 3, 1, 10)
+
+
+def test_bucket_end():
+    assert bucket_end(datetime(2024, 3, 1, 10, 0), 3600) == datetime(2024, 3, 1, 11)
+    assert bucket_end(datetime(2024, 3, 1, 23, 59), 86400) == datetime(2024, 3, 2)
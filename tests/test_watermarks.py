@@ -0,0 +1,75 @@
+import time
+from starlette.requests import Request
+from starlette.responses import Response
+import database.database as database
+import utils.watermarks as watermarks
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_matching_etag_gives_304():
+    watermark = watermarks.station_data_watermark(1)
+    etag = watermarks.build_etag("station-1", watermark, "page=1")
+    not_modified = watermarks.check_not_modified(_request(if_none_match=etag), etag, watermark)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert watermarks.check_not_modified(_request(if_none_match='W/"other"'), etag, watermark) is None
+    assert watermarks.check_not_modified(_request(), etag, watermark) is None
+
+
+def test_variant_is_part_of_the_tag():
+    watermark = watermarks.station_data_watermark(1)
+    assert watermarks.build_etag("station-1", watermark, "page=1") != watermarks.build_etag("station-1", watermark, "page=2")
+
+
+def test_bump_changes_the_tag():
+    before = watermarks.station_data_watermark(2)
+    etag = watermarks.build_etag("station-2", before, "")
+    watermarks.bump_station_data(2)
+    after = watermarks.station_data_watermark(2)
+    assert after[0] == before[0] + 1
+    new_etag = watermarks.build_etag("station-2", after, "")
+    assert new_etag != etag
+    assert watermarks.check_not_modified(_request(if_none_match=etag), new_etag, after) is None
+
+
+def test_unsettled_change_holds_back_validators(monkeypatch):
+    monkeypatch.setattr(database, "replicas", [object()])
+    watermarks.bump_station_data(3)
+    watermark = watermarks.station_data_watermark(3)
+    etag = watermarks.build_etag("station-3", watermark, "")
+    assert not watermarks.is_settled(watermark)
+    assert watermarks.check_not_modified(_request(if_none_match=etag), etag, watermark) is None
+    response = Response()
+    watermarks.set_validators(response, etag, watermark)
+    assert "etag" not in response.headers
+
+    settled = (watermark[0], int((time.time() - database.REPLICA_MAX_LAG_SECONDS - 1) * 1000))
+    assert watermarks.is_settled(settled)
+    response = Response()
+    watermarks.set_validators(response, etag, settled)
+    assert response.headers["etag"] == etag and "last-modified" in response.headers
+
+
+def test_station_data_revalidation(client):
+    path = "/api/stations/1/data?limit=10"
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(path + "&page=2", headers={"If-None-Match": etag}).status_code == 200
+
+    watermarks.bump_station_data(1)
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_post_station_data_is_not_conditional(client):
+    response = client.post("/api/stations/1", json={"limit": 10}, headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
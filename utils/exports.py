@@ -0,0 +1,55 @@
+# utils/exports.py
+from datetime import datetime
+from fastapi import HTTPException
+import database.queries.exports as exports_queries
+
+EXPORT_FORMATS = ["csv", "parquet"]
+SENSOR_TYPES = ["humidity", "temperature", "wind"]
+
+
+def validate_export_request(request):
+    """
+    Validate the format, period and measurement types of an export request.
+    """
+    if request.format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid export format.")
+
+    dates = {}
+    for field in ("date_from", "date_to"):
+        try:
+            dates[field] = datetime.fromisoformat(getattr(request, field)).replace(tzinfo=None)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid {field}, expected YYYY-MM-DD or ISO 8601.")
+    if dates["date_to"] < dates["date_from"]:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from.")
+
+    if request.types and any(t not in SENSOR_TYPES for t in request.types):
+        raise HTTPException(status_code=400, detail="Invalid sensor type.")
+
+    if request.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet exports require pyarrow to be installed.")
+
+
+def build_export_queries(request):
+    """
+    Build the count and data queries for an export, sharing the same parameters.
+    """
+    station_placeholders = ", ".join(["%s"] * len(request.station_codes))
+    params = [*request.station_codes, request.date_from, request.date_to]
+
+    type_condition = ""
+    if request.types:
+        type_condition = f"AND type IN ({', '.join(['%s'] * len(request.types))})"
+        params.extend(request.types)
+
+    count_query = exports_queries.COUNT_EXPORT_ROWS.format(
+        station_placeholders=station_placeholders, type_condition=type_condition
+    )
+    data_query = exports_queries.GET_EXPORT_ROWS.format(
+        station_placeholders=station_placeholders, type_condition=type_condition
+    )
+
+    return count_query, data_query, params
@@ -0,0 +1,111 @@
+# utils/gaps.py
+from datetime import datetime
+from typing import Iterator, List, Optional
+import database.queries.gaps as gaps_queries
+
+# Sensors scanned per gap query. MySQL estimates the rows of an IN list of up to
+# eq_range_index_dive_limit (200) values from the primary key itself, above that from statistics.
+GAP_SENSOR_BATCH_SIZE = 200
+
+
+def build_sensors_query(station_code: Optional[int]):
+    """Build the query listing the sensors of a station, or of every station when station_code is None"""
+    if station_code is None:
+        return gaps_queries.GET_SENSORS.format(station_condition=""), []
+    return gaps_queries.GET_SENSORS.format(station_condition="WHERE station_code = %s"), [station_code]
+
+
+def build_gap_queries(sensor_ids: List[str], date_from: datetime, date_to: datetime, max_delay_seconds: int):
+    """
+    Build the gap and coverage queries for a batch of sensors. They read the primary key
+    (sensor_id, date), which returns each sensor's readings of the range in date order.
+    Returns a dict of name -> (query, params).
+    """
+    placeholders = ", ".join(["%s"] * len(sensor_ids))
+    return {
+        "gaps": (
+            gaps_queries.FIND_GAPS.format(sensor_placeholders=placeholders),
+            [*sensor_ids, date_from, date_to, max_delay_seconds]
+        ),
+        "coverage": (
+            gaps_queries.GET_READING_COVERAGE.format(sensor_placeholders=placeholders),
+            [*sensor_ids, date_from, date_to]
+        ),
+    }
+
+
+def sensor_batches(sensors) -> Iterator[List[str]]:
+    """Split the ids of the sensors into batches of GAP_SENSOR_BATCH_SIZE"""
+    sensor_ids = [sensor["sensor_id"] for sensor in sensors]
+    for start in range(0, len(sensor_ids), GAP_SENSOR_BATCH_SIZE):
+        yield sensor_ids[start:start + GAP_SENSOR_BATCH_SIZE]
+
+
+def missing_readings(start: datetime, end: datetime, interval_seconds: int, interior: bool = True) -> int:
+    """
+    Number of expected readings that fall inside a gap. An interior gap is bounded by two readings,
+    an edge gap by the start or end of the window.
+    """
+    expected = int((end - start).total_seconds() // interval_seconds)
+    return max(expected - 1, 0) if interior else expected
+
+
+def uptime_percent(missing: int, window_start: datetime, window_end: datetime, interval_seconds: int) -> float:
+    """Share of the expected readings in the window that were received"""
+    expected = max(int((window_end - window_start).total_seconds() // interval_seconds), 1)
+    return round(max(0.0, 100.0 * (1 - missing / expected)), 2)
+
+
+def summarize_gaps(sensors, gaps, coverage, date_from: datetime, date_to: datetime, interval_seconds: int, max_delay_seconds: int):
+    """
+    Combine the gap rows found by the database with each sensor's first and last reading into
+    compact per-sensor gap ranges, including the edges of the window, and an uptime percentage.
+    """
+    coverage_by_sensor = {row["sensor_id"]: row for row in coverage}
+    gaps_by_sensor = {}
+    for gap in gaps:
+        gaps_by_sensor.setdefault(gap["sensor_id"], []).append({
+            "start": gap["gap_start"],
+            "end": gap["gap_end"],
+            "missing_readings": missing_readings(gap["gap_start"], gap["gap_end"], interval_seconds),
+        })
+
+    report = []
+    for sensor in sensors:
+        sensor_coverage = coverage_by_sensor.get(sensor["sensor_id"])
+        sensor_gaps = gaps_by_sensor.get(sensor["sensor_id"], [])
+
+        if sensor_coverage is None:
+            sensor_gaps = [{
+                "start": date_from,
+                "end": date_to,
+                "missing_readings": missing_readings(date_from, date_to, interval_seconds, interior=False),
+            }]
+        else:
+            first, last = sensor_coverage["first_reading"], sensor_coverage["last_reading"]
+            if (first - date_from).total_seconds() > max_delay_seconds:
+                sensor_gaps.insert(0, {
+                    "start": date_from,
+                    "end": first,
+                    "missing_readings": missing_readings(date_from, first, interval_seconds, interior=False),
+                })
+            if (date_to - last).total_seconds() > max_delay_seconds:
+                sensor_gaps.append({
+                    "start": last,
+                    "end": date_to,
+                    "missing_readings": missing_readings(last, date_to, interval_seconds, interior=False),
+                })
+
+        missing = sum(gap["missing_readings"] for gap in sensor_gaps)
+        report.append({
+            "sensor_id": sensor["sensor_id"],
+            "station_code": sensor["station_code"],
+            "type": sensor["type"],
+            "readings": sensor_coverage["readings"] if sensor_coverage else 0,
+            "first_reading": sensor_coverage["first_reading"] if sensor_coverage else None,
+            "last_reading": sensor_coverage["last_reading"] if sensor_coverage else None,
+            "uptime_percent": uptime_percent(missing, date_from, date_to, interval_seconds),
+            "gaps": sensor_gaps,
+        })
+
+    return report
@@ -0,0 +1,127 @@
+import os
+import math
+from datetime import datetime
+from typing import List, Tuple
+from fastapi import HTTPException
+import database.queries.grid as grid_queries
+
+GRID_ZOOM_LEVELS = [int(zoom) for zoom in os.getenv("GRID_ZOOM_LEVELS", "4,6,8,10").split(",")]
+GRID_BUCKET_SECONDS = int(os.getenv("GRID_BUCKET_SECONDS", "3600"))
+
+# Web Mercator stops at the latitude where the map becomes square
+MAX_LATITUDE = 85.05112878
+
+
+def tile_for(latitude: float, longitude: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator (x, y) tile of a point at a zoom level, as used by slippy map tiles"""
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, float(latitude)))
+    n = 2 ** zoom
+    x = int((float(longitude) + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> dict:
+    """South, west, north and east edges of a tile, in degrees"""
+    n = 2 ** zoom
+
+    def latitude(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return {
+        "south": latitude(y + 1),
+        "west": x / n * 360.0 - 180.0,
+        "north": latitude(y),
+        "east": (x + 1) / n * 360.0 - 180.0,
+    }
+
+
+def station_tiles(latitude: float, longitude: float) -> List[Tuple[int, int, int]]:
+    """(zoom, x, y) of the cell containing a station at every grid zoom level"""
+    return [(zoom, *tile_for(latitude, longitude, zoom)) for zoom in GRID_ZOOM_LEVELS]
+
+
+def validate_grid_request(zoom: int, request, date_from: datetime, date_to: datetime):
+    if zoom not in GRID_ZOOM_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid zoom. Allowed values are: {', '.join(map(str, GRID_ZOOM_LEVELS))}.")
+    if request.min_latitude > request.max_latitude or request.min_longitude > request.max_longitude:
+        raise HTTPException(status_code=400, detail="The bounding box minimum must be below its maximum.")
+    if request.type is not None and request.type not in ["temperature", "humidity", "wind"]:
+        raise HTTPException(status_code=400, detail="Invalid type. Allowed values are: temperature, humidity, wind.")
+    if date_to <= date_from:
+        raise HTTPException(status_code=400, detail="date_to must be after date_from.")
+
+
+def cells_in_bbox(zoom: int, request) -> Tuple[int, int, int, int]:
+    """
+    (x_min, x_max, y_min, y_max) of the cells overlapping the request's bounding box.
+    Tile rows grow southwards, so the north edge gives the smallest y.
+    """
+    x_min, y_min = tile_for(request.max_latitude, request.min_longitude, zoom)
+    x_max, y_max = tile_for(request.min_latitude, request.max_longitude, zoom)
+    return x_min, x_max, y_min, y_max
+
+
+def build_grid_query(zoom: int, request, bucket_from: datetime, bucket_to: datetime):
+    """Build the query for the per-bucket aggregates of the cells overlapping the request's bounding box"""
+    params = [zoom, *cells_in_bbox(zoom, request), bucket_from, bucket_to]
+    type_condition = ""
+    if request.type:
+        type_condition = "AND type = %s"
+        params.append(request.type)
+    return grid_queries.GET_GRID_AGGREGATES.format(type_condition=type_condition), params
+
+
+def summarize_cells(zoom: int, rows: List[dict], station_counts: dict) -> List[dict]:
+    """
+    Fold the per-bucket rows of each cell and type into the aggregates over the window. The
+    current value is the mean of the cell's latest bucket with readings. Several rows may hold
+    parts of the same bucket.
+    """
+    cells = {}
+    for row in rows:
+        cell = cells.get((row["x"], row["y"]))
+        if cell is None:
+            cell = cells[(row["x"], row["y"])] = {
+                "zoom": zoom,
+                "x": row["x"],
+                "y": row["y"],
+                **tile_bounds(row["x"], row["y"], zoom),
+                "stations": station_counts.get((row["x"], row["y"]), 0),
+                "aggregates": {},
+            }
+        readings, total = int(row["readings"]), float(row["total"])
+        aggregate = cell["aggregates"].get(row["type"])
+        if aggregate is None:
+            aggregate = cell["aggregates"][row["type"]] = {
+                "type": row["type"],
+                "readings": 0,
+                "total": 0.0,
+                "min": float(row["min_measurement"]),
+                "max": float(row["max_measurement"]),
+                "current_bucket": None,
+                "current_readings": 0,
+                "current_total": 0.0,
+            }
+        aggregate["readings"] += readings
+        aggregate["total"] += total
+        aggregate["min"] = min(aggregate["min"], float(row["min_measurement"]))
+        aggregate["max"] = max(aggregate["max"], float(row["max_measurement"]))
+        if aggregate["current_bucket"] is None or row["bucket_start"] > aggregate["current_bucket"]:
+            aggregate["current_bucket"] = row["bucket_start"]
+            aggregate["current_readings"] = 0
+            aggregate["current_total"] = 0.0
+        if row["bucket_start"] == aggregate["current_bucket"]:
+            aggregate["current_readings"] += readings
+            aggregate["current_total"] += total
+
+    result = []
+    for cell in cells.values():
+        aggregates = []
+        for aggregate in cell["aggregates"].values():
+            aggregate["mean"] = aggregate.pop("total") / aggregate["readings"]
+            aggregate["current"] = aggregate.pop("current_total") / aggregate.pop("current_readings")
+            aggregates.append(aggregate)
+        cell["aggregates"] = sorted(aggregates, key=lambda aggregate: aggregate["type"])
+        result.append(cell)
+    return sorted(result, key=lambda cell: (cell["y"], cell["x"]))
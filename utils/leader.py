@@ -0,0 +1,35 @@
+# utils/leader.py
+import os
+import fcntl
+from utils.watermarks import WATERMARK_FILE
+
+# The background jobs that must run once per host (the gap monitor, the export sweep, the grid
+# cell rebuilds) run in the worker process holding an exclusive lock on this file. The
+# kernel releases the lock when that process exits, and another worker takes it over on its
+# next attempt.
+LEADER_LOCK_FILE = os.getenv("LEADER_LOCK_FILE", WATERMARK_FILE + ".leader")
+
+_fd = None
+
+
+def is_leader() -> bool:
+    """Whether this process holds the leader lock, taking it when no other process does"""
+    global _fd
+    if _fd is not None:
+        return True
+    fd = os.open(LEADER_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return False
+    _fd = fd
+    return True
+
+
+def release_leadership():
+    """Give up the leader lock, so another worker takes it over; called at shutdown"""
+    global _fd
+    if _fd is not None:
+        os.close(_fd)
+        _fd = None
@@ -0,0 +1,161 @@
+import os
+import math
+import random
+import struct
+from datetime import datetime
+from typing import Iterable, List, Optional
+import numpy as np
+from fastapi import HTTPException
+import database.queries.quantiles as quantiles_queries
+import utils.time_buckets as time_buckets
+
+QUANTILE_SKETCH_K = int(os.getenv("QUANTILE_SKETCH_K", "200"))
+QUANTILE_BUCKET_SECONDS = int(os.getenv("QUANTILE_BUCKET_SECONDS", "3600"))
+
+_HEADER = struct.Struct("<BHQddB")  # format version, k, n, min, max, number of levels
+_FORMAT_VERSION = 1
+_CAPACITY_DECAY = 2 / 3
+
+
+def rank_error(k: int = QUANTILE_SKETCH_K) -> float:
+    """
+    Normalized rank error of a KLL sketch with parameter k, at 99% confidence: a reported p95 is
+    the value of a true rank within 95 +/- 100 * rank_error(k). About 1.3% for k = 200.
+    """
+    return 2.296 / k ** 0.9723
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang and Liberty). Values are kept in levels of compactors where
+    a value at level h stands for 2^h readings; a full level is sorted and every other value is
+    promoted to the next level, so the size stays around 3k values whatever the number of readings.
+    Sketches of disjoint sets of readings merge into a sketch of their union with the same error.
+    """
+
+    def __init__(self, k: int = QUANTILE_SKETCH_K):
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels: List[list] = [[]]
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * _CAPACITY_DECAY ** depth)), 2)
+
+    def _size(self) -> int:
+        return sum(len(values) for values in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, values in enumerate(self.levels):
+                if len(values) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    values.sort()
+                    kept = [values.pop()] if len(values) % 2 else []
+                    self.levels[level + 1].extend(values[random.getrandbits(1)::2])
+                    self.levels[level] = kept
+                    break
+
+    def update(self, value: float):
+        self.update_many([value])
+
+    def update_many(self, values: Iterable[float]):
+        values = [float(value) for value in values]
+        if not values:
+            return
+        self.levels[0].extend(values)
+        self.n += len(values)
+        self.min = min(self.min, min(values))
+        self.max = max(self.max, max(values))
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, values in enumerate(other.levels):
+            self.levels[level].extend(values)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def quantiles(self, fractions: List[float]) -> List[float]:
+        """Values at the given fractions of the rank (0.5 is the median); None when empty"""
+        if self.n == 0:
+            return [None] * len(fractions)
+        values = np.concatenate([np.asarray(level, dtype=float) for level in self.levels])
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        results = []
+        for fraction in fractions:
+            if fraction <= 0:
+                results.append(self.min)
+            elif fraction >= 1:
+                results.append(self.max)
+            else:
+                index = int(np.searchsorted(cumulative, fraction * cumulative[-1]))
+                results.append(float(values[min(index, len(values) - 1)]))
+        return results
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form: a header, the number of values per level, then the values as float64"""
+        lengths = struct.pack(f"<{len(self.levels)}I", *(len(level) for level in self.levels))
+        values = np.concatenate([np.asarray(level, dtype="<f8") for level in self.levels]).tobytes()
+        return _HEADER.pack(_FORMAT_VERSION, self.k, self.n, self.min, self.max, len(self.levels)) + lengths + values
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KLLSketch":
+        version, k, n, minimum, maximum, level_count = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format version {version}")
+        lengths = struct.unpack_from(f"<{level_count}I", data, _HEADER.size)
+        values = np.frombuffer(data, dtype="<f8", offset=_HEADER.size + 4 * level_count).tolist()
+        sketch = cls(k)
+        sketch.n, sketch.min, sketch.max = n, minimum, maximum
+        sketch.levels = []
+        start = 0
+        for length in lengths:
+            sketch.levels.append(values[start:start + length])
+            start += length
+        return sketch
+
+
+def merge_sketch_bytes(stored: bytes, update: bytes) -> bytes:
+    """Merge a serialized sketch update into a stored one"""
+    sketch = KLLSketch.from_bytes(stored)
+    sketch.merge(KLLSketch.from_bytes(update))
+    return sketch.to_bytes()
+
+
+def build_sketches_query(station_code: int, types: Optional[List[str]], bucket_from: datetime, bucket_to: datetime):
+    """Build the query for the stored sketches of a station's buckets, optionally for some types only"""
+    params = [station_code, bucket_from, bucket_to]
+    type_condition = ""
+    if types:
+        type_condition = f"AND type IN ({', '.join(['%s'] * len(types))})"
+        params.extend(types)
+    return quantiles_queries.GET_SKETCHES.format(type_condition=type_condition), params
+
+
+def parse_percentiles(percentiles: str) -> List[float]:
+    """Parse a comma separated list of percentiles between 0 and 100"""
+    try:
+        values = [float(value) for value in percentiles.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Percentiles must be a comma separated list of numbers.")
+    if not values or any(not 0 <= value <= 100 for value in values):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100.")
+    return values
+
+
+def bucket_start(date: datetime) -> datetime:
+    """Start of the sketch bucket a reading falls in"""
+    return time_buckets.bucket_start(date, QUANTILE_BUCKET_SECONDS)
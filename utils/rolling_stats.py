@@ -0,0 +1,182 @@
+import os
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+import numpy as np
+
+ROLLING_WINDOW = int(os.getenv("ROLLING_WINDOW", "60"))
+ROLLING_EWMA_ALPHA = float(os.getenv("ROLLING_EWMA_ALPHA", "0.1"))
+ROLLING_MIN_SAMPLES = int(os.getenv("ROLLING_MIN_SAMPLES", "30"))
+ROLLING_SPIKE_ZSCORE = float(os.getenv("ROLLING_SPIKE_ZSCORE", "4"))
+ROLLING_STUCK_READINGS = int(os.getenv("ROLLING_STUCK_READINGS", "10"))
+ROLLING_ANOMALY_HISTORY = int(os.getenv("ROLLING_ANOMALY_HISTORY", "20"))
+
+# Physically plausible measurements per type, in the units the stations report
+VALID_RANGES = {
+    "temperature": (-90.0, 60.0),
+    "humidity": (0.0, 100.0),
+    "wind": (0.0, 120.0),
+}
+
+# EWMA weights are rescaled every chunk so that (1 - alpha) ** -n cannot overflow
+_EWMA_CHUNK = 256
+
+
+class RollingStats:
+    """
+    Incremental statistics of one sensor's measurements of one type: Welford mean and variance
+    over every reading seen, an EWMA, and a ring buffer of the last ROLLING_WINDOW values.
+
+    Each reading is compared with the state before it: it is a spike when it is more than
+    ROLLING_SPIKE_ZSCORE standard deviations from the EWMA, stuck when it repeats the same value
+    ROLLING_STUCK_READINGS times in a row, and out of range outside VALID_RANGES.
+    """
+
+    def __init__(self, sensor_id: str, station_code: int, sensor_type: str):
+        self.sensor_id = sensor_id
+        self.station_code = station_code
+        self.type = sensor_type
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma = None
+        self.window = np.zeros(ROLLING_WINDOW)
+        self.position = 0
+        self.last_value = None
+        self.last_date = None
+        self.repeats = 0
+        self.flag_counts = {"spike": 0, "stuck": 0, "out_of_range": 0}
+        self.anomalies = deque(maxlen=ROLLING_ANOMALY_HISTORY)
+
+    def update(self, value: float, date: datetime) -> List[str]:
+        """Add one reading in O(1) and return its anomaly flags"""
+        flags = []
+        low, high = VALID_RANGES.get(self.type, (-np.inf, np.inf))
+        if not low <= value <= high:
+            flags.append("out_of_range")
+        if self.count >= ROLLING_MIN_SAMPLES:
+            std = (self.m2 / (self.count - 1)) ** 0.5
+            if std > 0 and abs(value - self.ewma) > ROLLING_SPIKE_ZSCORE * std:
+                flags.append("spike")
+        self.repeats = self.repeats + 1 if value == self.last_value else 1
+        if self.repeats >= ROLLING_STUCK_READINGS:
+            flags.append("stuck")
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.ewma = value if self.ewma is None else self.ewma + ROLLING_EWMA_ALPHA * (value - self.ewma)
+        self.window[self.position % ROLLING_WINDOW] = value
+        self.position += 1
+        self.last_value = value
+        self.last_date = date
+        self._record_flags(date, value, flags)
+        return flags
+
+    def update_many(self, values: np.ndarray, dates: List[datetime]) -> List[List[str]]:
+        """
+        Add a batch of readings, in date order, with array operations instead of a loop per reading.
+        Returns the same flags as calling update() on each reading in turn.
+        """
+        n = len(values)
+        if n == 0:
+            return []
+        if n == 1:
+            return [self.update(float(values[0]), dates[0])]
+        index = np.arange(n)
+
+        # Count, mean and M2 before each reading, from prefix sums of the deviations from the
+        # previous mean: M2 = M2_0 + sum(d^2) - sum(d)^2 / n, with d = x - mean_0
+        deviations = values - self.mean
+        s1 = np.concatenate(([0.0], np.cumsum(deviations)))
+        s2 = np.concatenate(([0.0], np.cumsum(deviations ** 2)))
+        counts = self.count + np.arange(n + 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = self.mean + np.where(counts > 0, s1 / counts, 0.0)
+            m2s = self.m2 + s2 - np.where(counts > 0, s1 ** 2 / counts, 0.0)
+            stds = np.sqrt(np.maximum(m2s[:-1], 0.0) / (counts[:-1] - 1))
+
+        # EWMA before each reading: e_i = b^i * e_0 + alpha * sum_{k<i} b^(i-1-k) * x_k, with b = 1 - alpha
+        ewma_before = np.empty(n)
+        ewma = values[0] if self.ewma is None else self.ewma
+        decay = 1.0 - ROLLING_EWMA_ALPHA
+        for start in range(0, n, _EWMA_CHUNK):
+            chunk = values[start:start + _EWMA_CHUNK]
+            powers = decay ** np.arange(len(chunk) + 1)
+            weighted = np.cumsum(chunk / powers[1:])
+            ewma_before[start:start + len(chunk)] = powers[:-1] * (
+                ewma + ROLLING_EWMA_ALPHA * np.concatenate(([0.0], weighted[:-1]))
+            )
+            ewma = powers[-1] * (ewma + ROLLING_EWMA_ALPHA * weighted[-1])
+
+        # Consecutive repeats of each value, continuing the run from the previous batch
+        same = np.empty(n, dtype=bool)
+        same[0] = values[0] == self.last_value
+        same[1:] = values[1:] == values[:-1]
+        last_reset = np.maximum.accumulate(np.where(same, -1, index))
+        repeats = np.where(last_reset < 0, self.repeats + index + 1, index - last_reset + 1)
+
+        low, high = VALID_RANGES.get(self.type, (-np.inf, np.inf))
+        out_of_range = (values < low) | (values > high)
+        with np.errstate(invalid="ignore"):
+            spike = (
+                (counts[:-1] >= ROLLING_MIN_SAMPLES)
+                & (stds > 0)
+                & (np.abs(values - ewma_before) > ROLLING_SPIKE_ZSCORE * stds)
+            )
+        stuck = repeats >= ROLLING_STUCK_READINGS
+
+        self.count += n
+        self.mean = float(means[-1])
+        self.m2 = float(m2s[-1])
+        self.ewma = float(ewma)
+        tail = values[-ROLLING_WINDOW:]
+        slots = (self.position + n - len(tail) + np.arange(len(tail))) % ROLLING_WINDOW
+        self.window[slots] = tail
+        self.position += n
+        self.last_value = float(values[-1])
+        self.last_date = dates[-1]
+        self.repeats = int(repeats[-1])
+
+        flags = []
+        for i in range(n):
+            reading_flags = []
+            if out_of_range[i]:
+                reading_flags.append("out_of_range")
+            if spike[i]:
+                reading_flags.append("spike")
+            if stuck[i]:
+                reading_flags.append("stuck")
+            if reading_flags:
+                self._record_flags(dates[i], float(values[i]), reading_flags)
+            flags.append(reading_flags)
+        return flags
+
+    def _record_flags(self, date: datetime, value: float, flags: List[str]):
+        for flag in flags:
+            self.flag_counts[flag] += 1
+        if flags:
+            self.anomalies.append({"date": date, "measurement": value, "flags": flags})
+
+    def report(self) -> dict:
+        """Current aggregates; the window statistics are computed over the ring buffer on request"""
+        window = self.window[:min(self.position, ROLLING_WINDOW)]
+        std: Optional[float] = (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else None
+        return {
+            "sensor_id": self.sensor_id,
+            "station_code": self.station_code,
+            "type": self.type,
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "std": std,
+            "ewma": self.ewma,
+            "window_size": len(window),
+            "window_mean": float(window.mean()) if len(window) else None,
+            "window_min": float(window.min()) if len(window) else None,
+            "window_max": float(window.max()) if len(window) else None,
+            "last_value": self.last_value,
+            "last_date": self.last_date,
+            "flag_counts": dict(self.flag_counts),
+            "recent_anomalies": list(self.anomalies),
+        }
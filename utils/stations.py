@@ -1,8 +1,29 @@
 # utils/stations.py
 from datetime import datetime, timedelta
+from typing import List
 from fastapi import HTTPException
 import database.database as database
 import database.queries.stations as stations_queries
+from database.query_builder import SelectQuery, UpdateQuery
+
+SENSOR_TYPES = ["humidity", "temperature", "wind"]
+
+STATIONS_QUERY = SelectQuery(
+    stations_queries.GET_STATIONS,
+    filters={"city": "WHERE city = %s"},
+    sort_keys=["code", "installation_date"],
+)
+
+STATION_DATA_QUERY = SelectQuery(
+    stations_queries.GET_STATION_DATA,
+    filters={"date_from": "AND date >= %s", "date_to": "AND date <= %s", "type": "AND type = %s"},
+    sort_keys=["date", "type"],
+)
+
+STATION_UPDATE_QUERY = UpdateQuery(
+    stations_queries.UPDATE_STATION,
+    columns=["city", "latitude", "longitude", "installation_date"],
+)
 
 
 def validate_station_update_fields(station_update):
@@ -18,30 +39,24 @@ def validate_station_update_fields(station_update):
 
 def update_station_in_db(station_code: int, fields_to_update: dict):
     """
-    Update the station in the database.
+    Build the query updating the given fields of a station.
     """
-    update_parts = []
-    params = []
+    return STATION_UPDATE_QUERY.build(fields_to_update, [station_code])
 
-    for field, value in fields_to_update.items():
-        update_parts.append(f"{field} = %s")
-        params.append(value)
 
-    params.append(station_code)
-
-    const query = `UPDATE stations SET ${updateParts.join(', ')} WHERE code = ?`;
-
-    return query, params
-    
+def next_day():
+    """
+    The date forecasts are retrieved for.
+    """
+    return (datetime.now() + timedelta(days=1)).date()
 
 
 def get_forecast_for_next_day(station_code: int):
     """
     Retrieve the forecast data for the next day for a specific station.
     """
-    next_day = (datetime.now() + timedelta(days=1)).date()
     forecast_query = stations_queries.GET_FORECAST
-    return forecast_query, (station_code, next_day)
+    return forecast_query, (station_code, next_day())
 
 
 
@@ -62,32 +77,15 @@ def build_paginated_query(station_code: int, request):
     """
     Construct the SQL query for paginated results based on the request parameters.
     """
-    query = """SELECT * FROM sensors_data WHERE station_code = %s"""
-    params = [station_code]
-
-    if request.date_from:
-        query += " AND date >= %s"
-        params.append(request.date_from)
-    if request.date_to:
-        query += " AND date <= %s"
-        params.append(request.date_to)
-
-    if request.type:
-        if request.type not in ["humidity", "temperature", "wind"]:
-            raise HTTPException(status_code=400, detail="Invalid sensor type.")
-        query += " AND type = %s"
-        params.append(request.type)
-
-    if request.sort in ["date", "type"]:
-        query += f" ORDER BY {request.sort}"
-    else:
-        raise HTTPException(status_code=400, detail="Invalid sort parameter.")
-
-    offset = (request.page - 1) * request.limit
-    query += " LIMIT %s OFFSET %s"
-    params.extend([request.limit, offset])
+    if request.type and request.type not in SENSOR_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid sensor type.")
 
-    return query, params
+    values = {
+        "date_from": request.date_from or None,
+        "date_to": request.date_to or None,
+        "type": request.type or None,
+    }
+    return STATION_DATA_QUERY.build([station_code], values, request.sort, "ASC", request.page, request.limit)
 
 
 def get_station_data_summary_or_paginated(station_code: int, request):
@@ -103,38 +101,35 @@ def get_station_data_summary_or_paginated(station_code: int, request):
 
 
 
-# def validate_sorting_parameters(sort: str, sort_order: str):
-#     """
-#     Validate the sorting parameters.
-#     """
-#     allowed_sort_columns = ["code", "installation_date"]
-#     if sort not in allowed_sort_columns:
-#         sort = "code"
+def validate_sorting_parameters(sort: str, sort_order: str):
+    """
+    Validate the sorting parameters.
+    """
+    if sort not in STATIONS_QUERY.sort_keys:
+        sort = "code"
 
-#     if sort_order not in ["ASC", "DESC"]:
-#         sort_order = "ASC"
+    if sort_order not in ["ASC", "DESC"]:
+        sort_order = "ASC"
 
-#     return sort, sort_order
+    return sort, sort_order
 
 
-def build_stations_query(city: str, page: int, limit: int, sort: str, sort_order: str):
+def page_stations(stations: List[dict], city: str, page: int, limit: int, sort: str, sort_order: str) -> List[dict]:
     """
-    Build the SQL query for retrieving stations based on filters and pagination.
+    Filter, sort and paginate the cached station catalog the same way build_stations_query does
+    in SQL. Cities are compared case-insensitively, like the collation of the city column.
     """
-    filter_condition = ""
-    params = []
-
     if city:
-        filter_condition = "WHERE city = %s"
-        params.append(city)
+        city = city.casefold()
+        stations = [station for station in stations if station["city"].casefold() == city]
 
+    stations = sorted(stations, key=lambda station: (station[sort], station["code"]), reverse=sort_order == "DESC")
     offset = (page - 1) * limit
-    params.extend([limit, offset])
+    return stations[offset:offset + limit]
 
-    final_query = f"""
-        SELECT * FROM stations {filter_condition}
-        ORDER BY {sort} {sort_order}
-        LIMIT %s OFFSET %s;
-    """
 
-    return final_query, params
+def build_stations_query(city: str, page: int, limit: int, sort: str, sort_order: str):
+    """
+    Build the SQL query for retrieving stations based on filters and pagination.
+    """
+    return STATIONS_QUERY.build([], {"city": city or None}, sort, sort_order, page, limit)
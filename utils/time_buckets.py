@@ -0,0 +1,15 @@
+from datetime import datetime, timedelta
+
+# Buckets are aligned on the Unix epoch, so every aggregate cuts time at the same boundaries
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(date: datetime, bucket_seconds: int) -> datetime:
+    """Start of the bucket a reading falls in"""
+    seconds = int((date.replace(tzinfo=None) - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % bucket_seconds)
+
+
+def bucket_end(date: datetime, bucket_seconds: int) -> datetime:
+    """End of the bucket a reading falls in, which is the start of the next one"""
+    return bucket_start(date, bucket_seconds) + timedelta(seconds=bucket_seconds)
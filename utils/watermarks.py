@@ -0,0 +1,156 @@
+# utils/watermarks.py
+import os
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import tempfile
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+import database.database as database
+
+# Version counters live in a small memory-mapped file so that every worker process
+# on the host sees the same watermarks. Slot 0 holds the station catalog version,
+# the other slots hold per-station data versions (station codes are hashed into slots;
+# a collision only causes an extra refetch).
+WATERMARK_FILE = os.getenv("WATERMARK_FILE", os.path.join(tempfile.gettempdir(), "meteo_watermarks"))
+WATERMARK_SLOTS = 4096
+
+_TOKEN = struct.Struct("16s")
+_SLOT = struct.Struct("qq")  # version, modified time in milliseconds
+_SIZE = _TOKEN.size + _SLOT.size * WATERMARK_SLOTS
+
+_fd = None
+_map = None
+_token = None
+
+
+def _open():
+    """Open (and on first use, create) the shared watermark file"""
+    global _fd, _map, _token
+    if _map is not None:
+        return
+    fd = os.open(WATERMARK_FILE, os.O_RDWR | os.O_CREAT, 0o600)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        if os.fstat(fd).st_size < _SIZE:
+            # A fresh token invalidates every ETag issued against a previous file
+            now = int(time.time() * 1000)
+            os.ftruncate(fd, _SIZE)
+            os.pwrite(fd, _TOKEN.pack(os.urandom(8).hex().encode()) + _SLOT.pack(0, now) * WATERMARK_SLOTS, 0)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    _fd = fd
+    _map = mmap.mmap(fd, _SIZE)
+    _token = _TOKEN.unpack_from(_map, 0)[0].decode()[:8]
+
+
+def _offset(slot: int) -> int:
+    return _TOKEN.size + _SLOT.size * slot
+
+
+def _station_slot(station_code: int) -> int:
+    return 1 + int(station_code) % (WATERMARK_SLOTS - 1)
+
+
+def _read(slot: int):
+    _open()
+    return _SLOT.unpack_from(_map, _offset(slot))
+
+
+def _bump(slot: int):
+    _open()
+    fcntl.flock(_fd, fcntl.LOCK_EX)
+    try:
+        version, _ = _SLOT.unpack_from(_map, _offset(slot))
+        _SLOT.pack_into(_map, _offset(slot), version + 1, int(time.time() * 1000))
+    finally:
+        fcntl.flock(_fd, fcntl.LOCK_UN)
+
+
+def bump_catalog():
+    """Record a change to the station catalog (station create, update or delete)"""
+    _bump(0)
+
+
+def bump_station_data(station_code: int):
+    """Record new sensor data or forecasts for a station"""
+    _bump(_station_slot(station_code))
+
+
+def catalog_watermark():
+    """Current (version, modified ms) of the station catalog"""
+    return _read(0)
+
+
+def station_data_watermark(station_code: int):
+    """Current (version, modified ms) of a station's data"""
+    return _read(_station_slot(station_code))
+
+
+def build_etag(scope: str, watermark, variant: str = "") -> str:
+    """
+    Build a weak ETag from a watermark. The variant (query string or request body) is hashed in,
+    so different pages of the same resource get different tags.
+    """
+    version, _ = watermark
+    digest = hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+    return f'W/"{_token}-{scope}-{version}-{digest}"'
+
+
+def _last_modified(watermark) -> str:
+    _, modified = watermark
+    return formatdate(modified / 1000, usegmt=True)
+
+
+def is_settled(watermark) -> bool:
+    """
+    Reads may be served by a lagging replica. A change is only known to be visible on every
+    server once it is older than the replica lag limit; until then validators are skipped, so a
+    tag is never attached to a response that predates the change it names, and nothing is cached.
+    """
+    if not database.replicas:
+        return True
+    _, modified = watermark
+    return time.time() - modified / 1000 > database.REPLICA_MAX_LAG_SECONDS
+
+
+def check_not_modified(request: Request, etag: str, watermark) -> Optional[Response]:
+    """
+    Return a 304 response when the client's validators still match, without touching the database.
+    """
+    if not is_settled(watermark):
+        return None
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        matched = "*" in tags or etag in tags or etag[2:] in tags
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None:
+            return None
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return None
+        matched = watermark[1] // 1000 <= since
+
+    if not matched:
+        return None
+    return Response(status_code=304, headers={"ETag": etag, "Last-Modified": _last_modified(watermark)})
+
+
+def set_validators(response: Response, etag: str, watermark):
+    """
+    Attach ETag and Last-Modified headers to a response.
+    """
+    response.headers["Cache-Control"] = "no-cache"
+    if is_settled(watermark):
+        response.headers["ETag"] = etag
+        # Last-Modified has one second resolution: only send it once the change is a full second old,
+        # so a later change can never share the second a client revalidates with
+        if time.time() - watermark[1] / 1000 >= 1:
+            response.headers["Last-Modified"] = _last_modified(watermark)